@@ -0,0 +1,114 @@
+from typing import Tuple
+import math
+import numpy as np
+
+from instrumentation import metrics
+
+
+def band_limits(n: int, m: int, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First and last column of each row of a Sakoe-Chiba band.
+
+    The band follows the straight line from (0, 0) to (n - 1, m - 1), so
+    sequences of different lengths are still aligned end to end. The radius
+    is widened where needed for every row's band to reach the next one.
+    """
+    if n > 1:
+        slope = (m - 1) / (n - 1)
+        centre = np.rint(np.arange(n) * slope).astype(int)
+    else:
+        slope, centre = 0.0, np.zeros(1, dtype=int)
+    radius = max(radius, math.ceil(slope))
+    return np.maximum(centre - radius, 0), np.minimum(centre + radius, m - 1)
+
+
+@metrics.timed('dtw')
+def banded_dtw(reference: np.ndarray, compare: np.ndarray, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dynamic time warping path between two feature matrices (features x frames).
+
+    Frames are compared by Euclidean distance, only within `radius` frames
+    of the band's centre line, so time and memory are O(frames * radius)
+    rather than quadratic. The band's costs are computed in one vectorized
+    gather. Each row of the accumulated cost is then solved with array
+    operations: the step from the left is a running minimum over prefix
+    sums, so only the loop over rows stays in Python.
+
+    Returns the reference and compare frame indices along the path, from
+    the first frame pair to the last.
+    """
+    n, m = reference.shape[1], compare.shape[1]
+    if n == 0 or m == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    lo, hi = band_limits(n, m, radius)
+    width = int((hi - lo).max()) + 1
+
+    # Cost of every cell in the band, stored row by row from each row's first column
+    columns = lo[:, np.newaxis] + np.arange(width)
+    inside = columns <= hi[:, np.newaxis]
+    gathered = compare.T[np.minimum(columns, m - 1)]
+    cost = np.sqrt(np.sum((gathered - reference.T[:, np.newaxis, :]) ** 2, axis=-1))
+    cost[~inside] = np.inf
+
+    accumulated = np.full((n, width), np.inf)
+    entry = np.full(width, np.inf)
+    entry[0] = cost[0, 0]
+    accumulated[0] = _row(entry, cost[0])
+    for i in range(1, n):
+        shift = lo[i] - lo[i - 1]
+        previous = accumulated[i - 1]
+        # Cells of the previous row directly above and diagonally up-left of each cell
+        up = _shifted(previous, shift)
+        diagonal = _shifted(previous, shift - 1)
+        accumulated[i] = _row(cost[i] + np.minimum(up, diagonal), cost[i])
+
+    return _backtrack(accumulated, lo, n, m)
+
+
+def _shifted(row: np.ndarray, shift: int) -> np.ndarray:
+    """`row` re-indexed so position k holds its entry for column k + shift."""
+    out = np.full_like(row, np.inf)
+    if shift >= 0:
+        out[:len(row) - shift] = row[shift:]
+    else:
+        out[-shift:] = row[:len(row) + shift]
+    return out
+
+
+def _row(entry: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """
+    Accumulated cost of one row given the cost of entering each cell from above.
+
+    D[j] = min(entry[j], D[j - 1] + cost[j]) unrolls to
+    S[j] + min over k <= j of (entry[k] - S[k]), with S the prefix sum of cost.
+    """
+    finite = np.where(np.isinf(cost), 0.0, cost)
+    prefix = np.cumsum(finite)
+    with np.errstate(invalid='ignore'):
+        row = np.minimum.accumulate(entry - prefix) + prefix
+    row[np.isinf(cost)] = np.inf
+    return row
+
+
+def _backtrack(accumulated: np.ndarray, lo: np.ndarray, n: int, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    width = accumulated.shape[1]
+
+    def at(i, j):
+        k = j - lo[i]
+        return accumulated[i, k] if 0 <= k < width else np.inf
+
+    i, j = n - 1, m - 1
+    path = [(i, j)]
+    while i > 0 or j > 0:
+        if i == 0:
+            j -= 1
+        elif j == 0:
+            i -= 1
+        else:
+            # Prefer the diagonal step on ties
+            steps = ((at(i - 1, j - 1), i - 1, j - 1), (at(i - 1, j), i - 1, j), (at(i, j - 1), i, j - 1))
+            _, i, j = min(steps, key=lambda step: step[0])
+        path.append((i, j))
+    path.reverse()
+    indices = np.array(path)
+    return indices[:, 0], indices[:, 1]
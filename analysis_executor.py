@@ -0,0 +1,538 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from contextlib import contextmanager
+from threading import Event, Lock, Thread, current_thread, main_thread
+import queue
+import multiprocessing
+import logging
+import math
+import os
+import signal
+import time
+import weakref
+import numpy as np
+
+from speech_analysis import AudioLoadError, AudioSource, SpeechAnalysis, SpeechFeatures
+from audio_ingest import LONG_RECORDING_POLICIES, RESAMPLE_TYPES, RecordingTooLong, decoded_audio, ingest
+from instrumentation import STAGE_SECONDS, metrics, profile_call
+from reference_store import ReferenceFeatureStore, DEFAULT_CACHE_DIR
+from analysis_profiles import AnalysisProfile
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisJob(NamedTuple):
+    sound_id: str
+    reference_path: str
+    reference_stat: os.stat_result
+    # The patient recording: a file path, or the uploaded bytes to decode in memory
+    recording: Union[str, bytes]
+    # Analysis settings; None scores with the executor's sample rate and defaults
+    profile: Optional[AnalysisProfile] = None
+
+
+class ExecutorBusy(Exception):
+    """Raised when the analysis queue is full."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Analysis queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class WorkerLost(ExecutorBusy):
+    """Raised when a job's worker process died; the request can be retried."""
+    def __init__(self, retry_after: int = 1):
+        Exception.__init__(self, "Analysis worker exited unexpectedly")
+        self.retry_after = retry_after
+
+
+class AnalysisTimeout(Exception):
+    """Raised when a job does not finish within the executor timeout."""
+
+
+class _DeadlineExceeded(BaseException):
+    # Not an Exception, so the metric methods' broad handlers cannot swallow it
+    pass
+
+
+# Per-worker state, created once by _init_worker
+_worker_store: Optional[ReferenceFeatureStore] = None
+# Reference stores by (sample_rate, n_fft, hop_length), one per profile in use
+_worker_profile_stores: Dict[Tuple, ReferenceFeatureStore] = {}
+_worker_events = None
+_worker_ingest: Dict = {}
+
+
+def _init_worker(
+    cache_dir: str,
+    sample_rate: int,
+    sample_duration: float,
+    resample: str = 'high',
+    long_recordings: str = 'truncate',
+    events=None
+):
+    """Load the analysis stack once per worker and warm librosa's compiled paths."""
+    global _worker_store, _worker_events, _worker_ingest
+    if _worker_store is not None:
+        return
+    _worker_events = events
+    _worker_ingest = {'resample': resample, 'long_recordings': long_recordings}
+    # Timings recorded in a worker travel back to the web process with each job
+    metrics.forward_to_parent()
+    # Decoded uploads travel back too, so /transcribe can reuse them
+    decoded_audio.forward_to_parent()
+    _worker_store = ReferenceFeatureStore(cache_dir, sample_rate, sample_duration)
+    SpeechFeatures(np.zeros(sample_rate, dtype=np.float32), sample_rate).to_arrays()
+
+
+def _store_for(profile: Optional[AnalysisProfile]) -> ReferenceFeatureStore:
+    """The worker's reference features computed with a profile's settings."""
+    if profile is None:
+        return _worker_store
+    key = (profile.sample_rate, profile.n_fft, profile.hop_length)
+    if key == (_worker_store.sample_rate, _worker_store.n_fft, _worker_store.hop_length):
+        return _worker_store
+    store = _worker_profile_stores.get(key)
+    if store is None:
+        store = _worker_profile_stores[key] = ReferenceFeatureStore(
+            _worker_store.cache_dir, profile.sample_rate, _worker_store.sample_duration,
+            n_fft=profile.n_fft, hop_length=profile.hop_length
+        )
+    return store
+
+
+def _decode(job: AnalysisJob) -> Tuple[AudioSource, Optional[Dict]]:
+    """The job's recording, decoded if it was uploaded, and how it was decoded."""
+    if not isinstance(job.recording, bytes):
+        return job.recording, None
+    store = _store_for(job.profile)
+    options = dict(_worker_ingest)
+    if job.profile is not None and job.profile.resample:
+        options['resample'] = job.profile.resample
+    try:
+        return ingest(job.recording, store.sample_rate, store.sample_duration, **options)
+    except RecordingTooLong:
+        raise
+    except Exception as e:
+        logger.warning(f"Could not decode the recording for {job.sound_id}: {str(e)}")
+        # SpeechAnalysis applies its usual fallback for undecodable audio
+        return job.recording, None
+
+
+def _analyzer_for(job: AnalysisJob, recording: AudioSource) -> SpeechAnalysis:
+    store = _store_for(job.profile)
+    return SpeechAnalysis(
+        reference_path=job.reference_path,
+        compare_path=recording,
+        sample_duration=store.sample_duration,
+        verbose=True,
+        reference_features=store.get(job.sound_id, job.reference_path, job.reference_stat),
+        strict=True,
+        **(job.profile.analysis_kwargs() if job.profile is not None else {'sample_rate': store.sample_rate})
+    )
+
+
+def _report(job_id: Optional[str], event: str, *data):
+    if job_id is not None and _worker_events is not None:
+        _worker_events.put((job_id, event) + data)
+
+
+def assess(job: AnalysisJob, job_id: Optional[str] = None, profile: bool = False) -> Dict:
+    """
+    Run a full clinical assessment for one recording, reporting progress for `job_id`.
+
+    The recording is decoded and checked for speech before anything is
+    scored; an unusable one raises AudioLoadError (SilentRecording when it
+    holds no speech). With `profile` set the assessment runs under cProfile
+    and the report is returned as 'profile'.
+    """
+    _report(job_id, 'started')
+    recording, decoded = _decode(job)
+    analyzer = _analyzer_for(job, recording)
+    voiced_seconds = analyzer.compare_features.voiced_seconds
+    progress = lambda metric, score: _report(job_id, 'metric', metric, float(score))
+    if profile:
+        results, report = profile_call(analyzer.clinical_speech_assessment, progress=progress)
+    else:
+        results, report = analyzer.clinical_speech_assessment(progress=progress), None
+    assessment = {
+        'results': results,
+        'suggestions': analyzer.get_improvement_suggestions(results),
+        'decode': decoded,
+        'voiced_seconds': voiced_seconds,
+        'analysis_profile': job.profile.name if job.profile is not None else None
+    }
+    if report is not None:
+        assessment['profile'] = report
+    return assessment
+
+
+def assess_batch(jobs: List[AnalysisJob]) -> List[Dict]:
+    """
+    Run SpeechAnalysis.batch_assessment over several recordings.
+
+    A recording that is too long, undecodable or silent gets {'error': exception}
+    in place of its assessment; the others are still scored.
+    """
+    assessments: List[Optional[Dict]] = [None] * len(jobs)
+    analyzers, positions, decodes = [], [], []
+    for position, job in enumerate(jobs):
+        try:
+            recording, decoded = _decode(job)
+            analyzer = _analyzer_for(job, recording)
+            # Decode and trim now, so an unusable take is rejected before scoring
+            analyzer.compare_features
+        except (RecordingTooLong, AudioLoadError) as e:
+            assessments[position] = {'error': e}
+            continue
+        analyzers.append(analyzer)
+        positions.append(position)
+        decodes.append(decoded)
+    batch = SpeechAnalysis.batch_assessment(analyzers) if analyzers else []
+    for position, analyzer, decoded, results in zip(positions, analyzers, decodes, batch):
+        profile = jobs[position].profile
+        assessments[position] = {
+            'results': results,
+            'suggestions': analyzer.get_improvement_suggestions(results),
+            'decode': decoded,
+            'voiced_seconds': analyzer.compare_features.voiced_seconds,
+            'analysis_profile': profile.name if profile is not None else None
+        }
+    return assessments
+
+
+@contextmanager
+def _deadline(seconds: Optional[float]):
+    """Interrupt the enclosed block after `seconds`; only possible in a process's main thread."""
+    if not seconds or current_thread() is not main_thread() or not hasattr(signal, 'setitimer'):
+        yield
+        return
+
+    def expired(signum, frame):
+        raise _DeadlineExceeded()
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    except _DeadlineExceeded:
+        raise AnalysisTimeout(f"Analysis did not finish within {seconds}s") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _timed(fn: Callable, timeout: Optional[float], *args):
+    started = time.time()
+    with _deadline(timeout):
+        result = fn(*args)
+    return started, time.time(), result, metrics.drain(), decoded_audio.drain()
+
+
+def _noop():
+    return None
+
+
+class AnalysisExecutor:
+    """
+    Runs SpeechAnalysis jobs off the request thread.
+
+    The 'process' backend uses a spawn-based process pool whose workers load
+    the analysis stack and reference store once; the 'thread' backend runs the
+    same jobs in-process and is meant for development. At most `max_pending`
+    jobs may be queued or running; beyond that submit() raises ExecutorBusy
+    with a Retry-After estimate.
+
+    Each job gets `timeout` seconds of run time. Process workers enforce it
+    themselves and fail the job with AnalysisTimeout; a worker that is still
+    busy well past its deadline (stuck in native code) is killed and the pool
+    is replaced. A job's queue slot is only freed, and its `release` callback
+    only called, once the worker has actually let go of it.
+
+    Jobs given a job id report 'started' and per-metric events back to the
+    parent, where they are passed to the `on_event` callback.
+
+    Uploaded recordings are decoded in the worker by audio_ingest, using the
+    `resample` quality tier and the `long_recordings` policy.
+    """
+    def __init__(
+        self,
+        workers: int = 2,
+        max_pending: int = 16,
+        timeout: float = 30.0,
+        backend: str = 'process',
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        sample_rate: int = 16000,
+        sample_duration: float = 5.0,
+        kill_grace: float = 5.0,
+        resample: str = 'high',
+        long_recordings: str = 'truncate'
+    ):
+        if backend not in ('process', 'thread'):
+            raise ValueError(f"Unknown analysis executor backend: {backend}")
+        if resample not in RESAMPLE_TYPES:
+            raise ValueError(f"Unknown resampling quality: {resample}")
+        if long_recordings not in LONG_RECORDING_POLICIES:
+            raise ValueError(f"Unknown long recording policy: {long_recordings}")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.backend = backend
+        self.kill_grace = kill_grace
+        self.on_event: Optional[Callable] = None
+        self._initargs = (cache_dir, sample_rate, sample_duration, resample, long_recordings)
+        if backend == 'process':
+            self._context = multiprocessing.get_context('spawn')
+            self._events = self._context.Queue()
+        else:
+            self._events = queue.Queue()
+        self._lock = Lock()
+        self._pool = self._new_pool()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._recycled = 0
+        self._waits = deque(maxlen=256)
+        self._durations = deque(maxlen=256)
+        self._expired = weakref.WeakSet()
+        # Running futures and their kill deadlines, watched by the process backend
+        self._watched: Dict[Future, List] = {}
+        self._stopped = Event()
+        self._event_thread = Thread(target=self._dispatch_events, daemon=True)
+        self._event_thread.start()
+        if backend == 'process':
+            Thread(target=self._watch, daemon=True).start()
+
+    def _new_pool(self):
+        if self.backend == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=self._initargs + (self._events,)
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=self._initargs + (self._events,)
+        )
+
+    def _dispatch_events(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            if self.on_event is None:
+                continue
+            try:
+                self.on_event(*event)
+            except Exception as e:
+                logger.error(f"Error handling analysis event {event[1]}: {str(e)}")
+
+    def warm_up(self):
+        """Start every worker now instead of on the first request."""
+        for future in [self._pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def _reserve(self, slots: int):
+        with self._lock:
+            if self._pending + slots > self.max_pending:
+                self._rejected += 1
+                raise ExecutorBusy(self.retry_after())
+            self._pending += slots
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        release: Optional[Callable] = None
+    ) -> Future:
+        """
+        Queue `fn(*args)` with `timeout` seconds of run time (default: the executor timeout).
+
+        `release` is called exactly once, when the job no longer needs its
+        inputs: after the worker is done with it, or straight away if the job
+        is rejected with ExecutorBusy.
+        """
+        try:
+            self._reserve(1)
+        except ExecutorBusy:
+            self._release(release)
+            raise
+        return self._submit(fn, args, timeout or self.timeout, release)
+
+    def submit_many(self, fn: Callable, calls: List[Tuple]) -> List[Future]:
+        """
+        Queue `fn` once per `(args, timeout, release)` in `calls`.
+
+        The calls' queue slots are reserved together, so either all of them
+        are queued or ExecutorBusy is raised and every `release` is called.
+        """
+        try:
+            self._reserve(len(calls))
+        except ExecutorBusy:
+            for _, _, release in calls:
+                self._release(release)
+            raise
+        futures = []
+        for position, (args, timeout, release) in enumerate(calls):
+            try:
+                futures.append(self._submit(fn, args, timeout or self.timeout, release))
+            except Exception:
+                for _, _, unsubmitted in calls[position + 1:]:
+                    self._free_slot()
+                    self._release(unsubmitted)
+                raise
+        return futures
+
+    def _submit(self, fn: Callable, args, timeout: float, release: Optional[Callable]) -> Future:
+        submitted = time.time()
+        for attempt in range(2):
+            pool = self._pool
+            try:
+                future = pool.submit(_timed, fn, timeout, *args)
+                break
+            except BrokenProcessPool:
+                self._recycle(pool)
+            except Exception:
+                self._free_slot()
+                self._release(release)
+                raise
+        else:
+            self._free_slot()
+            self._release(release)
+            raise WorkerLost()
+        if self.backend == 'process':
+            # A running future may still sit in the pool's call queue behind one
+            # job, so allow two job deadlines before treating the worker as stuck
+            with self._lock:
+                self._watched[future] = [pool, None, 2 * timeout + self.kill_grace]
+        future.add_done_callback(lambda done: self._finished(done, submitted, release))
+        return future
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None, release: Optional[Callable] = None):
+        """Submit a job and wait for its result."""
+        timeout = timeout or self.timeout
+        return self.result(self.submit(fn, *args, timeout=timeout, release=release), timeout)
+
+    def result(self, future: Future, timeout: Optional[float] = None):
+        """Wait for a submitted job, translating pool failures into AnalysisTimeout or WorkerLost."""
+        timeout = timeout or self.timeout
+        try:
+            _, _, result, _, _ = future.result(timeout=timeout + self.kill_grace)
+        except FutureTimeout:
+            future.cancel()
+            raise AnalysisTimeout(f"Analysis did not finish within {timeout}s")
+        except (BrokenProcessPool, CancelledError):
+            # The pool was replaced under this job, either because of it or alongside it
+            if future in self._expired:
+                raise AnalysisTimeout(f"Analysis did not finish within {timeout}s")
+            raise WorkerLost()
+        return result
+
+    def _finished(self, future: Future, submitted: float, release: Optional[Callable]):
+        self._release(release)
+        pool = None
+        with self._lock:
+            self._pending -= 1
+            watched = self._watched.pop(future, None)
+            if watched is not None:
+                pool = watched[0]
+            error = None if future.cancelled() else future.exception()
+            if isinstance(error, AnalysisTimeout) or future in self._expired:
+                self._timed_out += 1
+            observations, decodes = [], []
+            if not future.cancelled() and error is None:
+                started, finished, _, observations, decodes = future.result()
+                self._completed += 1
+                self._waits.append(max(0.0, started - submitted))
+                self._durations.append(finished - started)
+        metrics.merge(observations)
+        decoded_audio.merge(decodes)
+        if error is not None or future.cancelled():
+            metrics.increment('speech_errors_total', stage='executor')
+        else:
+            metrics.observe(STAGE_SECONDS, max(0.0, started - submitted), stage='queue_wait')
+        if isinstance(error, BrokenProcessPool) and pool is not None:
+            # A worker died; replace the pool so later jobs are not refused
+            self._recycle(pool)
+
+    def _free_slot(self):
+        with self._lock:
+            self._pending -= 1
+
+    @staticmethod
+    def _release(release: Optional[Callable]):
+        if release is None:
+            return
+        try:
+            release()
+        except Exception as e:
+            logger.warning(f"Error releasing analysis job inputs: {str(e)}")
+
+    def _watch(self):
+        while not self._stopped.wait(1.0):
+            now = time.time()
+            stuck = []
+            with self._lock:
+                for future, watched in self._watched.items():
+                    pool, running_since, limit = watched
+                    if not future.running():
+                        continue
+                    if running_since is None:
+                        watched[1] = now
+                    elif now - running_since > limit:
+                        stuck.append((future, pool))
+            for future, pool in stuck:
+                logger.error(f"Analysis worker exceeded {self.timeout}s deadline; restarting the pool")
+                self._expired.add(future)
+                self._recycle(pool)
+
+    def _recycle(self, broken):
+        """Replace `broken` with a fresh pool and kill its workers."""
+        with self._lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+            self._recycled += 1
+        # Start the replacement workers now rather than on the next request
+        for _ in range(self.workers):
+            self._pool.submit(_noop)
+        for process in list((getattr(broken, '_processes', None) or {}).values()):
+            process.terminate()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        durations = list(self._durations)
+        average = sum(durations) / len(durations) if durations else 1.0
+        return max(1, math.ceil(average * max(self._pending, 1) / self.workers))
+
+    def stats(self) -> Dict:
+        """Queue depth and timing figures for sizing the pool."""
+        with self._lock:
+            waits = sorted(self._waits)
+            durations = list(self._durations)
+            return {
+                'backend': self.backend,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'queue_depth': self._pending,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'recycled': self._recycled,
+                'wait_avg': sum(waits) / len(waits) if waits else 0.0,
+                # Nearest-rank percentile
+                'wait_p95': waits[math.ceil(0.95 * len(waits)) - 1] if waits else 0.0,
+                'run_avg': sum(durations) / len(durations) if durations else 0.0
+            }
+
+    def shutdown(self):
+        self._stopped.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._events.put(None)
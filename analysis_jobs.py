@@ -0,0 +1,136 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+from threading import Condition
+import time
+import uuid
+
+from speech_analysis import METRIC_FEATURES
+
+
+class AnalysisJobStore:
+    """
+    State of asynchronous analysis jobs.
+
+    Each job moves from 'queued' to 'running' to 'success' or 'error' and
+    collects per-metric scores as they arrive. Finished jobs are kept for
+    `ttl` seconds, and the store never holds more than `max_jobs` entries;
+    the oldest are dropped first. Jobs still running `timeout` seconds after
+    a worker picked them up are reported as timed out; time spent queued
+    does not count, since the executor already bounds the queue.
+    """
+    def __init__(self, ttl: float = 300.0, max_jobs: int = 1000, timeout: float = 120.0):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._changed = Condition()
+
+    def create(self, sound_id: str, total_metrics: int = len(METRIC_FEATURES)) -> str:
+        """Add a queued job that will score `total_metrics` metrics, as its profile asks."""
+        job_id = uuid.uuid4().hex
+        with self._changed:
+            self._expire()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'sound_id': sound_id,
+                'status': 'queued',
+                'progress': {},
+                'total_metrics': total_metrics,
+                'created': time.time(),
+                'started': None,
+                'finished': None,
+                'version': 0
+            }
+        return job_id
+
+    def _expire(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and now - job['finished'] > self.ttl]:
+            del self._jobs[job_id]
+        while len(self._jobs) >= self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def _lookup(self, job_id: str) -> Optional[Dict]:
+        # Called with the lock held; applies the TTL and run timeout to one job
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        now = time.time()
+        if job['finished'] is not None and now - job['finished'] > self.ttl:
+            del self._jobs[job_id]
+            return None
+        if job['finished'] is None and job['started'] is not None and now - job['started'] > self.timeout:
+            job.update(status='error', message='Speech analysis took too long', finished=now)
+            job['version'] += 1
+            self._changed.notify_all()
+        return job
+
+    def _update(self, job_id: str, **fields):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None or job['finished'] is not None:
+                return
+            job.update(fields)
+            job['version'] += 1
+            self._changed.notify_all()
+
+    def started(self, job_id: str):
+        self._update(job_id, status='running', started=time.time())
+
+    def metric_done(self, job_id: str, metric: str, score: float):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None or job['finished'] is not None:
+                return
+            job['status'] = 'running'
+            if job['started'] is None:
+                job['started'] = time.time()
+            job['progress'][metric] = score
+            job['version'] += 1
+            self._changed.notify_all()
+
+    def succeed(self, job_id: str, payload: Dict):
+        # Metric events may still be in flight; the final results are authoritative
+        # and only hold the metrics the job's profile scored
+        progress = {metric: score for metric, score in payload['results'].items() if metric in METRIC_FEATURES}
+        self._update(
+            job_id, status='success', payload=payload, progress=progress,
+            total_metrics=len(progress), finished=time.time()
+        )
+
+    def fail(self, job_id: str, message: str):
+        self._update(job_id, status='error', message=message, finished=time.time())
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job in its public form, or None if unknown or expired."""
+        with self._changed:
+            job = self._lookup(job_id)
+            return self._public(job) if job is not None else None
+
+    def wait(self, job_id: str, version: int, timeout: float) -> Optional[Dict]:
+        """Block until the job changes past `version` or `timeout` elapses."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self._lookup(job_id) is None or self._jobs[job_id]['version'] > version,
+                timeout=timeout
+            )
+            job = self._lookup(job_id)
+            return self._public(job) if job is not None else None
+
+    @staticmethod
+    def _public(job: Dict) -> Dict:
+        snapshot = {
+            'job_id': job['job_id'],
+            'sound_id': job['sound_id'],
+            'status': job['status'],
+            'progress': dict(job['progress']),
+            'completed_metrics': len(job['progress']),
+            'total_metrics': job['total_metrics'],
+            'version': job['version']
+        }
+        if job['status'] == 'success':
+            snapshot.update(job['payload'])
+        elif job['status'] == 'error':
+            snapshot['message'] = job.get('message', 'Error analyzing speech')
+        return snapshot
@@ -0,0 +1,101 @@
+from typing import Dict, NamedTuple, Optional, Tuple
+import json
+import logging
+import os
+
+from speech_analysis import METRIC_FEATURES, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH
+
+DEFAULT_PROFILE = 'standard'
+
+# Latency and agreement figures written by `benchmark.py --publish-profiles`
+DEFAULT_FIGURES_PATH = os.path.join('cache', 'analysis_profiles.json')
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisProfile(NamedTuple):
+    """
+    Everything that trades scoring latency against precision, under one name.
+
+    `resample` is a tier from audio_ingest.RESAMPLE_TYPES, or None for the
+    deployment's ANALYSIS_RESAMPLE setting.
+    """
+    name: str
+    sample_rate: int
+    n_fft: int
+    hop_length: int
+    metrics: Tuple[str, ...] = tuple(METRIC_FEATURES)
+    resample: Optional[str] = None
+    align: bool = True
+    description: str = ''
+
+    def analysis_kwargs(self) -> Dict:
+        """SpeechAnalysis arguments for this profile."""
+        return {
+            'sample_rate': self.sample_rate,
+            'n_fft': self.n_fft,
+            'hop_length': self.hop_length,
+            'metrics': self.metrics,
+            'align': self.align
+        }
+
+    def params(self) -> Dict:
+        """The settings that change a score, for result cache keys."""
+        return {key: value for key, value in self._asdict().items() if key != 'description'}
+
+
+PROFILES = {
+    # Whole-frame hops and cheap resampling: half the frames of 'standard'
+    # for low-power kiosks. Every metric is kept, since dropping any of them
+    # moves the overall score much further from 'clinical' than coarser frames do
+    'fast': AnalysisProfile(
+        'fast', 16000, 1024, 1024, resample='fast',
+        description="Coarse frames and fast resampling for quick feedback on low-power devices"
+    ),
+    'standard': AnalysisProfile(
+        'standard', 16000, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH,
+        description="The default analysis used for practice sessions"
+    ),
+    # A wider band and 4x overlapping frames, for offline review of sessions
+    'clinical': AnalysisProfile(
+        'clinical', 22050, 2048, 256, resample='precise',
+        description="Finest time resolution and best resampling, for offline clinical review"
+    )
+}
+
+
+def get_profile(name: Optional[str]) -> AnalysisProfile:
+    """The named profile, or the default for an empty name; raises ValueError for an unknown one."""
+    profile = PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown analysis profile {name!r}; expected one of {', '.join(PROFILES)}")
+    return profile
+
+
+def parse_profile_map(spec: str) -> Dict[str, str]:
+    """
+    Parse an 'exercise=profile,...' setting, e.g. 'tongue=fast,sentence=clinical'.
+
+    Raises ValueError for a malformed entry or an unknown profile.
+    """
+    mapping = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        exercise_type, sep, name = item.partition('=')
+        if not sep or not exercise_type.strip():
+            raise ValueError(f"Expected exercise=profile, got {item!r}")
+        mapping[exercise_type.strip()] = get_profile(name.strip()).name
+    return mapping
+
+
+def load_figures(path: str = DEFAULT_FIGURES_PATH) -> Dict[str, Dict]:
+    """Published benchmark figures by profile name; empty when none have been published."""
+    try:
+        with open(path) as file:
+            return json.load(file)['profiles']
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not read analysis profile figures from {path}: {str(e)}")
+        return {}
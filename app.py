@@ -1,12 +1,27 @@
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
-from utils import AudioHandler, ExerciseManager
-from speech_analysis import SpeechAnalysis
+import time
+_startup_started = time.perf_counter()
+from flask import Blueprint, Flask, Response, current_app, g, render_template, request, jsonify, send_file, send_from_directory
+from utils import AudioHandler, ExerciseManager, log_timing, whisper_models
+from analysis_executor import AnalysisExecutor, AnalysisJob, AnalysisTimeout, ExecutorBusy, assess, assess_batch
+from reference_store import ReferenceFeatureStore
+from reference_catalog import ReferenceCatalog
+from analysis_jobs import AnalysisJobStore
+from transcription import TranscriptionEngine, TranscriptionTimeout
+from streaming_analysis import StreamingScorer
+from audio_ingest import RecordingTooLong, decoded_audio
+from speech_analysis import AudioLoadError, SilentRecording, DEFAULT_WEIGHTS, FEATURE_VERSION, METRIC_FEATURES
+from result_cache import AnalysisResultCache
+from prompt_audio import PromptAudioCache, prompt_texts
+from intent_matcher import IntentMatcher
+from upload_store import UploadStore, UploadTooLarge
+from progress_store import ProgressStore
+from analysis_profiles import PROFILES, get_profile, load_figures, parse_profile_map
+from instrumentation import metrics
+import atexit
 import os
 import json
 import random
-import tempfile
-from datetime import datetime
-from werkzeug.utils import secure_filename
+import numpy as np
 import logging
 import sys
 import warnings
@@ -15,97 +30,319 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+log_timing('import', time.perf_counter() - _startup_started)
+
+# Services are created by create_app(); analysis workers import this module
+# without building any of them
+audio_handler = None
+exercise_manager = None
+reference_catalog = None
+reference_store = None
+analysis_executor = None
+analysis_jobs = None
+result_cache = None
+prompt_audio = None
+upload_store = None
+progress_store = None
+analysis_params = None
+transcription_engine = None
+intent_matcher = None
 
-if getattr(sys, 'frozen', False):
-    template_folder = os.path.join(sys._MEIPASS, 'templates')
-    static_folder = os.path.join(sys._MEIPASS, 'static')
-    app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
-else:
-    app = Flask(__name__)
-
-# Add configuration to prevent frequent reloading
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-
-# Disable file watcher for specific directories
-extra_dirs = ['templates/', 'static/']
-extra_files = extra_dirs[:]
-for extra_dir in extra_dirs:
-    for dirname, dirs, files in os.walk(extra_dir):
-        for filename in files:
-            filename = os.path.join(dirname, filename)
-            if os.path.isfile(filename):
-                extra_files.append(filename)
-
-audio_handler = AudioHandler()
-exercise_manager = ExerciseManager()
-
-# Ensure directories exist
 UPLOAD_FOLDER = 'static/uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs('static/articulation_audio', exist_ok=True)
-os.makedirs('static/temp', exist_ok=True)
 
-# Load intents from JSON file
-def load_intents():
-    with open('intents.json', 'r') as file:
-        return json.load(file)
+routes = Blueprint('routes', __name__)
 
-intents = load_intents()
+def create_app():
+    """Build the Flask app and the services its routes use"""
+    global audio_handler, exercise_manager, reference_catalog, reference_store
+    global analysis_executor, analysis_jobs, transcription_engine, intent_matcher, result_cache, analysis_params
+    global prompt_audio, upload_store, progress_store
+    
+    if getattr(sys, 'frozen', False):
+        template_folder = os.path.join(sys._MEIPASS, 'templates')
+        static_folder = os.path.join(sys._MEIPASS, 'static')
+        app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
+    else:
+        app = Flask(__name__)
+    
+    # Add configuration to prevent frequent reloading
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    
+    # Speech analysis runs in a worker pool; size it per deployment
+    app.config['ANALYSIS_BACKEND'] = os.environ.get('ANALYSIS_BACKEND', 'process')
+    app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 2))
+    app.config['ANALYSIS_MAX_PENDING'] = int(os.environ.get('ANALYSIS_MAX_PENDING', 16))
+    app.config['ANALYSIS_TIMEOUT'] = float(os.environ.get('ANALYSIS_TIMEOUT', 30))
+    # Whisper is loaded on first transcription; set WHISPER_WARMUP=1 to load it in the background at startup
+    app.config['WHISPER_MODEL'] = os.environ.get('WHISPER_MODEL', 'base')
+    app.config['WHISPER_WARMUP'] = os.environ.get('WHISPER_WARMUP', '').lower() in ('1', 'true', 'yes')
+    # Seconds a finished async analysis result stays retrievable
+    app.config['ANALYSIS_JOB_TTL'] = float(os.environ.get('ANALYSIS_JOB_TTL', 300))
+    # Resampling tier for uploads ('fast' or 'high') and what to do with takes
+    # longer than the analysis window ('truncate' or 'reject')
+    app.config['ANALYSIS_RESAMPLE'] = os.environ.get('ANALYSIS_RESAMPLE', 'high')
+    app.config['ANALYSIS_LONG_RECORDINGS'] = os.environ.get('ANALYSIS_LONG_RECORDINGS', 'truncate')
+    # Repeat submissions of the same take are answered from a result cache;
+    # set RESULT_CACHE_DIR to keep results on disk across restarts
+    app.config['RESULT_CACHE_ENTRIES'] = int(os.environ.get('RESULT_CACHE_ENTRIES', 256))
+    app.config['RESULT_CACHE_TTL'] = float(os.environ.get('RESULT_CACHE_TTL', 3600))
+    app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR') or None
+    # Decoded uploads shared between scoring and /transcribe, in megabytes; 0 turns it off
+    app.config['DECODED_AUDIO_CACHE_MB'] = float(os.environ.get('DECODED_AUDIO_CACHE_MB', 32))
+    # /transcribe batches chunks from concurrent requests into one Whisper forward pass
+    app.config['WHISPER_THREADS'] = int(os.environ.get('WHISPER_THREADS', 0)) or None
+    app.config['WHISPER_LANGUAGE'] = os.environ.get('WHISPER_LANGUAGE', 'en') or None
+    app.config['TRANSCRIBE_MAX_BATCH'] = int(os.environ.get('TRANSCRIBE_MAX_BATCH', 8))
+    app.config['TRANSCRIBE_BATCH_WINDOW'] = float(os.environ.get('TRANSCRIBE_BATCH_WINDOW', 0.05))
+    app.config['TRANSCRIBE_TIMEOUT'] = float(os.environ.get('TRANSCRIBE_TIMEOUT', 120))
+    # Requests carrying an X-Debug-Profile header get a cProfile report back; keep this off in production
+    app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS', '').lower() in ('1', 'true', 'yes')
+    # Fixed assistant prompts are synthesized once in the background and served as audio files
+    app.config['PROMPT_AUDIO_DIR'] = os.environ.get('PROMPT_AUDIO_DIR', os.path.join('cache', 'prompt_audio'))
+    app.config['PROMPT_AUDIO_PRERENDER'] = os.environ.get('PROMPT_AUDIO_PRERENDER', '1').lower() in ('1', 'true', 'yes')
+    # Seconds between checks of intents.json for edits; 0 disables hot reloading
+    app.config['INTENTS_RELOAD_INTERVAL'] = float(os.environ.get('INTENTS_RELOAD_INTERVAL', 2))
+    # Takes saved by /submit_audio: largest accepted file, total size and age
+    # kept before the oldest are deleted (0 keeps them regardless)
+    app.config['UPLOAD_MAX_BYTES'] = int(os.environ.get('UPLOAD_MAX_BYTES', 20 * 1024 * 1024))
+    app.config['UPLOAD_QUOTA_BYTES'] = int(os.environ.get('UPLOAD_QUOTA_BYTES', 1024 * 1024 * 1024))
+    app.config['UPLOAD_RETENTION_DAYS'] = float(os.environ.get('UPLOAD_RETENTION_DAYS', 30))
+    # Every assessment is kept per patient for trend views; writes are batched off the request path
+    app.config['PROGRESS_DB'] = os.environ.get('PROGRESS_DB', os.path.join('cache', 'progress.sqlite3'))
+    app.config['PROGRESS_BATCH_SIZE'] = int(os.environ.get('PROGRESS_BATCH_SIZE', 256))
+    # Analysis profile ('fast', 'standard' or 'clinical') used unless a request
+    # names one, optionally per exercise type, e.g. 'tongue=fast,sentence=clinical'
+    app.config['ANALYSIS_PROFILE'] = get_profile(os.environ.get('ANALYSIS_PROFILE')).name
+    app.config['ANALYSIS_PROFILE_BY_EXERCISE'] = parse_profile_map(os.environ.get('ANALYSIS_PROFILE_BY_EXERCISE', ''))
+    app.config['ANALYSIS_PROFILE_FIGURES'] = os.environ.get('ANALYSIS_PROFILE_FIGURES', os.path.join('cache', 'analysis_profiles.json'))
+    
+    audio_handler = AudioHandler(model_name=app.config['WHISPER_MODEL'])
+    if app.config['WHISPER_WARMUP']:
+        whisper_models.warm_up(app.config['WHISPER_MODEL'])
+    exercise_manager = ExerciseManager()
+    reference_catalog = ReferenceCatalog()
+    reference_catalog.start_polling()
+    reference_store = ReferenceFeatureStore()
+    analysis_executor = AnalysisExecutor(
+        workers=app.config['ANALYSIS_WORKERS'],
+        max_pending=app.config['ANALYSIS_MAX_PENDING'],
+        timeout=app.config['ANALYSIS_TIMEOUT'],
+        backend=app.config['ANALYSIS_BACKEND'],
+        resample=app.config['ANALYSIS_RESAMPLE'],
+        long_recordings=app.config['ANALYSIS_LONG_RECORDINGS']
+    )
+    # The executor fails jobs at their deadline; the store's timeout is only a
+    # backstop in case that result never arrives
+    analysis_jobs = AnalysisJobStore(
+        ttl=app.config['ANALYSIS_JOB_TTL'],
+        timeout=2 * analysis_executor.timeout + analysis_executor.kill_grace
+    )
+    analysis_executor.on_event = record_analysis_event
+    result_cache = AnalysisResultCache(
+        max_entries=app.config['RESULT_CACHE_ENTRIES'],
+        ttl=app.config['RESULT_CACHE_TTL'],
+        cache_dir=app.config['RESULT_CACHE_DIR']
+    )
+    # Everything besides the recording and the reference that changes a result
+    analysis_params = {
+        'sample_rate': reference_store.sample_rate,
+        'sample_duration': reference_store.sample_duration,
+        'weights': DEFAULT_WEIGHTS,
+        'feature_version': FEATURE_VERSION,
+        'resample': app.config['ANALYSIS_RESAMPLE'],
+        'long_recordings': app.config['ANALYSIS_LONG_RECORDINGS']
+    }
+    decoded_audio.max_bytes = int(app.config['DECODED_AUDIO_CACHE_MB'] * 1024 * 1024)
+    progress_store = ProgressStore(app.config['PROGRESS_DB'], batch_size=app.config['PROGRESS_BATCH_SIZE'])
+    # Write out assessments still queued when the process exits
+    atexit.register(progress_store.close)
+    transcription_engine = TranscriptionEngine(
+        model_name=app.config['WHISPER_MODEL'],
+        threads=app.config['WHISPER_THREADS'],
+        language=app.config['WHISPER_LANGUAGE'],
+        max_batch=app.config['TRANSCRIBE_MAX_BATCH'],
+        batch_window=app.config['TRANSCRIBE_BATCH_WINDOW']
+    )
+    
+    # Ensure directories exist
+    upload_store = UploadStore(
+        UPLOAD_FOLDER,
+        max_file_bytes=app.config['UPLOAD_MAX_BYTES'],
+        quota_bytes=app.config['UPLOAD_QUOTA_BYTES'] or None,
+        retention=app.config['UPLOAD_RETENTION_DAYS'] * 24 * 3600 or None
+    )
+    os.makedirs('static/articulation_audio', exist_ok=True)
+    os.makedirs('static/temp', exist_ok=True)
+    
+    intent_matcher = IntentMatcher('intents.json', exercise_manager.get_exercise_types())
+    if app.config['INTENTS_RELOAD_INTERVAL'] > 0:
+        intent_matcher.start_polling(app.config['INTENTS_RELOAD_INTERVAL'])
+    prompt_audio = PromptAudioCache(audio_handler.render_to_file, cache_dir=app.config['PROMPT_AUDIO_DIR'])
+    if app.config['PROMPT_AUDIO_PRERENDER']:
+        prerender_prompts(intent_matcher.intents)
+        # Only responses added by an edit are new; the rest are already on disk
+        intent_matcher.on_reload = prerender_prompts
+    
+    app.register_blueprint(routes)
+    register_live_scoring(app)
+    log_timing('app_ready', time.perf_counter() - _startup_started)
+    return app
+
+def register_live_scoring(app):
+    """Serve /stream over WebSocket when flask-sock is installed"""
+    try:
+        from flask_sock import Sock
+    except ImportError:
+        logger.info("flask-sock is not installed; live scoring on /stream is disabled")
+        return
+    Sock(app).route('/stream')(live_scoring)
+
+def watched_files():
+    """Template and static files the development reloader should watch"""
+    extra_dirs = ['templates/', 'static/']
+    extra_files = extra_dirs[:]
+    for extra_dir in extra_dirs:
+        for dirname, dirs, files in os.walk(extra_dir):
+            for filename in files:
+                filename = os.path.join(dirname, filename)
+                if os.path.isfile(filename):
+                    extra_files.append(filename)
+    return extra_files
+
+# Upper bound on recordings accepted by /analyze_speech_batch and /transcribe
+MAX_BATCH_ITEMS = 20
+
+# Optional parts of an assessment passed through to the response when present
+ASSESSMENT_DETAILS = ('decode', 'voiced_seconds', 'cached', 'analysis_profile')
+
+# Scores reported for an assessment, when its profile scored them
+PAYLOAD_METRICS = (
+    'pitch_stability',
+    'articulation_clarity',
+    'rhythm_timing',
+    'volume_consistency',
+    'phonation_quality'
+)
+
+def analysis_payload(assessment):
+    """Build the response body for one assessed recording"""
+    results = assessment['results']
+    # Handle NaN values and ensure consistent structure; metrics a profile
+    # skipped are left out rather than reported as 0
+    sanitized_results = {
+        metric: float(results.get(metric, 0) or 0)
+        for metric in PAYLOAD_METRICS
+        if metric in results
+    }
+    sanitized_results['overall_assessment'] = float(results.get('overall_assessment', 0) or 0)
+    
+    # Generate feedback based on overall score
+    overall_score = sanitized_results['overall_assessment']
+    if overall_score >= 0.9:
+        feedback = "Excellent pronunciation! Keep up the great work!"
+    elif overall_score >= 0.7:
+        feedback = "Good pronunciation. Minor improvements possible."
+    elif overall_score >= 0.5:
+        feedback = "Fair pronunciation. Try focusing on clarity and consistency."
+    else:
+        feedback = "Keep practicing! Focus on matching the reference audio more closely."
+    
+    payload = {
+        'status': 'success',
+        'results': sanitized_results,
+        'feedback': feedback,
+        'suggestions': assessment['suggestions']
+    }
+    for detail in ASSESSMENT_DETAILS:
+        if assessment.get(detail) is not None:
+            payload[detail] = assessment[detail]
+    return payload
 
-@app.route('/')
+@routes.route('/')
 def home():
     """Render the landing page"""
     return render_template('home.html')
 
-@app.route('/speech_therapy')
+@routes.route('/speech_therapy')
 def speech_therapy():
     """Render the speech therapy assistant page with chatbot"""
     return render_template('speech_therapy.html')
 
-@app.route('/get_audio/<filename>')
+@routes.route('/get_audio/<filename>')
 def get_audio(filename):
-    return send_file(f"{UPLOAD_FOLDER}/{filename}")
+    """Serve a stored take, honouring Range and If-None-Match so playback can seek without re-downloading"""
+    path = upload_store.path(filename)
+    if path is None:
+        # Takes saved before the store used content-addressed names
+        return send_from_directory(upload_store.root, filename, conditional=True)
+    if not os.path.exists(path):
+        return jsonify({'error': 'No such recording'}), 404
+    # The name is the content's hash, so the file behind a URL never changes
+    response = send_file(path, mimetype='audio/wav', conditional=True, etag=filename.split('-')[0], max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
 
-@app.route('/chatbot', methods=['POST'])
+EXERCISE_MENU_RESPONSE = "I can help you with the following types of exercises. Please choose one:"
+
+def exercise_type_response(exercise_type):
+    return f"Here are the available {exercise_type} exercises:"
+
+def chatbot_prompts():
+    """Fixed chatbot replies that don't come from intents.json"""
+    return [EXERCISE_MENU_RESPONSE] + [
+        exercise_type_response(exercise_type) for exercise_type in exercise_manager.get_exercise_types()
+    ]
+
+def prerender_prompts(intents):
+    """Render audio for every fixed prompt in the background"""
+    prompt_audio.start_prerender(prompt_texts(exercise_manager, intents, chatbot_prompts()))
+
+def chatbot_reply(response, exercises):
+    """Chatbot response body, with the URL of the reply's pre-rendered audio when there is one"""
+    reply = {
+        'response': response,
+        'exercises': exercises
+    }
+    audio_url = prompt_audio.url(response)
+    if audio_url:
+        reply['audio_url'] = audio_url
+    return jsonify(reply)
+
+@routes.route('/chatbot', methods=['POST'])
 def chatbot():
     user_message = request.json.get('message', '').lower()
     
-    # Check for exercise-related queries
-    if any(word in user_message for word in ["exercises", "exercise", "what can you do"]):
-        exercise_list = exercise_manager.get_exercise_types()
-        response = "I can help you with the following types of exercises. Please choose one:"
-        return jsonify({
-            'response': response,
-            'exercises': exercise_list
-        })
+    # Exercise keywords, then exercise types, then intents; the first that matches wins
+    match = intent_matcher.match(user_message)
+    if match is None:
+        return chatbot_reply(random.choice(intent_matcher.fallback()['responses']), [])
     
-    # Check for specific exercise type queries
-    for exercise_type in exercise_manager.get_exercise_types():
-        if exercise_type.lower() in user_message:
-            exercises = exercise_manager.get_exercises_for_type(exercise_type)
-            return jsonify({
-                'response': f"Here are the available {exercise_type} exercises:",
-                'exercises': [exercise_type]
-            })
-    
-    # Check other intents
-    for intent in intents['intents']:
-        if intent['intent'] in user_message:
-            response = random.choice(intent['responses'])
-            exercises = intent.get('exercises', [])
-            return jsonify({
-                'response': response,
-                'exercises': exercises
-            })
-            
+    kind, target = match
+    if kind == 'menu':
+        return chatbot_reply(EXERCISE_MENU_RESPONSE, intent_matcher.exercise_types)
+    if kind == 'exercise_type':
+        return chatbot_reply(exercise_type_response(target), [target])
+    return chatbot_reply(random.choice(target['responses']), target.get('exercises', []))
+
+@routes.route('/prompt_audio')
+def prompt_audio_index():
+    """URLs of every pre-rendered prompt, keyed by prompt text"""
+    urls = {text: prompt_audio.url(text) for text in prompt_texts(exercise_manager, intent_matcher.intents, chatbot_prompts())}
     return jsonify({
-        'response': random.choice(intents['intents'][-1]['responses']),
-        'exercises': []
+        'prompts': {text: url for text, url in urls.items() if url},
+        'stats': prompt_audio.stats()
     })
 
-@app.route('/submit_audio', methods=['POST'])
+@routes.route('/prompt_audio/<name>')
+def prompt_audio_file(name):
+    """Serve a pre-rendered prompt; names change with the text, so browsers may cache them"""
+    return send_from_directory(prompt_audio.cache_dir, name, mimetype='audio/wav', max_age=86400)
+
+@routes.route('/submit_audio', methods=['POST'])
 def submit_audio():
+    # Stop reading an oversized body early instead of spooling all of it first
+    request.max_content_length = current_app.config['UPLOAD_MAX_BYTES'] + 64 * 1024
     if 'audio' not in request.files:
         return jsonify({'error': 'No audio file'}), 400
     
@@ -113,19 +350,19 @@ def submit_audio():
     word = request.form.get('word', 'unknown')
     
     if audio_file:
-        filename = secure_filename(f"{word}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav")
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        audio_file.save(filepath)
+        try:
+            filename = upload_store.save(audio_file.stream, word)
+        except UploadTooLarge as e:
+            logger.warning(f"Rejecting upload: {str(e)}")
+            return jsonify({'error': 'Recording is too large'}), 413
         return jsonify({'success': True, 'filename': filename}), 200
     
     return jsonify({'error': 'Invalid audio file'}), 400
 
-@app.route('/analyze_speech', methods=['POST'])
+@routes.route('/analyze_speech', methods=['POST'])
 def analyze_speech():
     """Handle speech analysis requests"""
     logger.info("Received speech analysis request")
-    temp_file = None
-    
     try:
         if 'audio' not in request.files:
             logger.error("No audio file in request")
@@ -144,167 +381,534 @@ def analyze_speech():
                 'message': 'No sound ID provided'
             }), 400
 
-        # Create temporary file with proper cleanup
-        temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_path = temp_file.name
-        temp_file.close()
-
+        # The recording is decoded from memory by the worker, never written to disk here
+        with metrics.span('upload_read'):
+            recording = audio_file.read()
+        logger.info(f"Read {len(recording)} bytes of uploaded audio")
+        
+        # Get reference audio from the catalog index
+        with metrics.span('reference_lookup'):
+            reference = reference_catalog.lookup(sound_id)
+        
+        if not reference:
+            logger.error(f"Reference audio not found for sound_id: {sound_id}")
+            return jsonify({
+                'status': 'error',
+                'message': 'Reference audio not found'
+            }), 404
+        
         try:
-            # Save the audio file
-            audio_file.save(temp_path)
-            logger.info(f"Saved uploaded audio to temporary file: {temp_path}")
-            
-            # Get reference audio path based on sound_id
-            reference_path = None
-            for folder in ['speech_audio', 'sentence_audio', 'tongue_audio', 'articulation_audio']:
-                possible_path = os.path.join('static', folder, f'{sound_id}.mp3')
-                if os.path.exists(possible_path):
-                    reference_path = possible_path
-                    break
+            analysis_profile = analysis_profile_for(reference)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        job = AnalysisJob(reference.sound_id, reference.path, reference.stat, recording, analysis_profile)
+        cache_key = result_cache.key(recording, reference.sound_id, reference.stat, profile_params(analysis_profile))
+        profile = profiling_requested()
+        # A profiling request always runs the analysis
+        cached = None if profile else result_cache.get(cache_key)
+        
+        patient = patient_context()
+        
+        if request.values.get('async', '').lower() in ('1', 'true', 'yes'):
+            job_id = start_analysis_job(job, cache_key, cached, patient)
+            return jsonify({
+                'status': 'accepted',
+                'job_id': job_id,
+                'poll_url': f'/analysis/{job_id}',
+                'events_url': f'/analysis/{job_id}/events'
+            }), 202
+        
+        if cached is not None:
+            return jsonify(record_progress(patient, job.sound_id, analysis_payload(dict(cached, cached=True))))
+        
+        # Perform analysis in the worker pool
+        with metrics.span('analysis'):
+            assessment = analysis_executor.run(assess, job, None, profile)
+        remember_assessment(cache_key, assessment)
+        payload = record_progress(patient, job.sound_id, analysis_payload(assessment))
+        if profile:
+            payload['profile'] = assessment.get('profile')
+        return jsonify(payload)
             
-            if not reference_path:
+    except ExecutorBusy as e:
+        return analysis_busy(e)
+    except AnalysisTimeout as e:
+        return analysis_timed_out(e)
+    except (RecordingTooLong, AudioLoadError) as e:
+        return recording_rejected(e)
+    except Exception as e:
+        logger.error(f"Error in speech analysis: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': 'Error analyzing speech'
+        }), 500
+
+@routes.route('/analyze_speech_batch', methods=['POST'])
+def analyze_speech_batch():
+    """Score several recordings in one request; `audio` and `sound_id` are paired by position"""
+    audio_files = request.files.getlist('audio')
+    sound_ids = request.form.getlist('sound_id')
+    logger.info(f"Received batch speech analysis request with {len(audio_files)} recordings")
+    
+    if not audio_files:
+        return jsonify({
+            'status': 'error',
+            'message': 'No audio files provided'
+        }), 400
+    
+    if len(audio_files) != len(sound_ids):
+        return jsonify({
+            'status': 'error',
+            'message': 'Each audio file needs a matching sound ID'
+        }), 400
+    
+    if len(audio_files) > MAX_BATCH_ITEMS:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {MAX_BATCH_ITEMS} recordings per batch'
+        }), 413
+    
+    try:
+        requested_profile = request.values.get('analysis_profile')
+        if requested_profile:
+            get_profile(requested_profile)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    try:
+        patient = patient_context()
+        items = [None] * len(audio_files)
+        groups = {}
+        cache_keys = {}
+        
+        for position, (audio_file, sound_id) in enumerate(zip(audio_files, sound_ids)):
+            reference = reference_catalog.lookup(sound_id)
+            if not reference:
                 logger.error(f"Reference audio not found for sound_id: {sound_id}")
-                return jsonify({
+                items[position] = {
                     'status': 'error',
+                    'sound_id': sound_id,
                     'message': 'Reference audio not found'
-                }), 404
+                }
+                continue
             
-            # Initialize speech analysis
-            analyzer = SpeechAnalysis(
-                reference_path=reference_path,
-                compare_path=temp_path,
-                verbose=True
-            )
-            
-            # Perform analysis
-            results = analyzer.clinical_speech_assessment()
-            suggestions = analyzer.get_improvement_suggestions(results)
-            
-            # Handle NaN values and ensure consistent structure
-            sanitized_results = {
-                'pitch_stability': float(results.get('pitch_stability', 0) or 0),
-                'articulation_clarity': float(results.get('articulation_clarity', 0) or 0),
-                'rhythm_timing': float(results.get('rhythm_timing', 0) or 0),
-                'volume_consistency': float(results.get('volume_consistency', 0) or 0),
-                'phonation_quality': float(results.get('phonation_quality', 0) or 0),
-                'overall_assessment': float(results.get('overall_assessment', 0) or 0)
-            }
+            with metrics.span('upload_read'):
+                recording = audio_file.read()
             
-            # Generate feedback based on overall score
-            overall_score = sanitized_results['overall_assessment']
-            if overall_score >= 0.9:
-                feedback = "Excellent pronunciation! Keep up the great work!"
-            elif overall_score >= 0.7:
-                feedback = "Good pronunciation. Minor improvements possible."
-            elif overall_score >= 0.5:
-                feedback = "Fair pronunciation. Try focusing on clarity and consistency."
-            else:
-                feedback = "Keep practicing! Focus on matching the reference audio more closely."
-            
-            return jsonify({
-                'status': 'success',
-                'results': sanitized_results,
-                'feedback': feedback,
-                'suggestions': suggestions
-            })
+            analysis_profile = analysis_profile_for(reference)
+            cache_keys[position] = result_cache.key(
+                recording, reference.sound_id, reference.stat, profile_params(analysis_profile)
+            )
+            cached = result_cache.get(cache_keys[position])
+            if cached is not None:
+                payload = record_progress(patient, reference.sound_id, analysis_payload(dict(cached, cached=True)))
+                items[position] = dict(payload, sound_id=sound_id)
+                continue
             
-        finally:
-            # Clean up temporary file
+            job = AnalysisJob(reference.sound_id, reference.path, reference.stat, recording, analysis_profile)
+            groups.setdefault(reference.sound_id, []).append((position, job))
+        
+        # One worker job per prompt: items practising the same prompt share its
+        # cached reference features, and each job gets the single-recording
+        # timeout once per item it scores
+        groups = list(groups.values())
+        calls = [
+            (([job for _, job in group],), analysis_executor.timeout * len(group), None)
+            for group in groups
+        ]
+        futures = analysis_executor.submit_many(assess_batch, calls) if calls else []
+        
+        for group, (_, timeout, _), future in zip(groups, calls, futures):
             try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            except Exception as e:
-                logger.warning(f"Error cleaning up temporary file: {str(e)}")
+                with metrics.span('analysis'):
+                    assessments = analysis_executor.result(future, timeout)
+            except AnalysisTimeout as e:
+                logger.error(f"Batch speech analysis timed out: {str(e)}")
+                assessments = [None] * len(group)
+                message = 'Speech analysis took too long'
+            except ExecutorBusy as e:
+                logger.warning(f"Batch speech analysis worker lost: {str(e)}")
+                assessments = [None] * len(group)
+                message = 'Speech analysis is busy, please try again shortly'
             
+            for (position, _), assessment in zip(group, assessments):
+                if assessment is None or 'error' in assessment:
+                    items[position] = {
+                        'status': 'error',
+                        'sound_id': sound_ids[position],
+                        'message': message if assessment is None else rejection_message(assessment['error'])
+                    }
+                else:
+                    remember_assessment(cache_keys[position], assessment)
+                    payload = record_progress(patient, group[0][1].sound_id, analysis_payload(assessment))
+                    items[position] = dict(payload, sound_id=sound_ids[position])
+        
+        return jsonify({
+            'status': 'success',
+            'items': items
+        })
+    
+    except ExecutorBusy as e:
+        return analysis_busy(e)
     except Exception as e:
-        logger.error(f"Error in speech analysis: {str(e)}", exc_info=True)
+        logger.error(f"Error in batch speech analysis: {str(e)}", exc_info=True)
         return jsonify({
             'status': 'error',
             'message': 'Error analyzing speech'
         }), 500
 
-@app.route('/articulation')
+def analysis_profile_for(reference):
+    """
+    The analysis profile for a prompt: the request's `analysis_profile`, else
+    the one configured for the prompt's exercise type, else the default.
+    Raises ValueError for an unknown name.
+    """
+    return get_profile(
+        request.values.get('analysis_profile')
+        or current_app.config['ANALYSIS_PROFILE_BY_EXERCISE'].get(reference.exercise_type)
+        or current_app.config['ANALYSIS_PROFILE']
+    )
+
+def profile_params(analysis_profile):
+    """Result cache parameters for an analysis under a profile"""
+    return dict(analysis_params, profile=analysis_profile.params())
+
+def patient_context():
+    """Patient and session ids sent with an analysis request, recorded with its scores"""
+    return request.values.get('patient_id', ''), request.values.get('session_id') or None
+
+def record_progress(patient, sound_id, payload):
+    """Queue an assessment's scores for the patient's history and return the payload"""
+    patient_id, session_id = patient
+    # Anonymous practice takes have no history to join
+    if patient_id:
+        progress_store.record(patient_id, session_id, sound_id, payload['results'])
+    return payload
+
+def start_analysis_job(job, cache_key, cached=None, patient=('', None)):
+    """Queue an analysis in the background and return its job id"""
+    job_id = analysis_jobs.create(job.sound_id, len(job.profile.metrics) if job.profile else len(METRIC_FEATURES))
+    if cached is not None:
+        # Already scored: the job is finished before the client first polls it
+        analysis_jobs.succeed(job_id, record_progress(patient, job.sound_id, analysis_payload(dict(cached, cached=True))))
+        return job_id
+    try:
+        future = analysis_executor.submit(assess, job, job_id)
+    except ExecutorBusy:
+        analysis_jobs.fail(job_id, 'Speech analysis is busy, please try again shortly')
+        raise
+    future.add_done_callback(lambda done: finish_analysis_job(job_id, done, cache_key, patient, job.sound_id))
+    logger.info(f"Queued speech analysis job {job_id}")
+    return job_id
+
+def remember_assessment(cache_key, assessment):
+    """Cache a successful assessment for resubmissions of the same take"""
+    result_cache.put(cache_key, {key: value for key, value in assessment.items() if key != 'profile'})
+
+def finish_analysis_job(job_id, future, cache_key, patient=('', None), sound_id=None):
+    try:
+        assessment = analysis_executor.result(future)
+    except AnalysisTimeout:
+        analysis_jobs.fail(job_id, 'Speech analysis took too long')
+    except ExecutorBusy:
+        analysis_jobs.fail(job_id, 'Speech analysis is busy, please try again shortly')
+    except (RecordingTooLong, AudioLoadError) as e:
+        analysis_jobs.fail(job_id, rejection_message(e))
+    except Exception as e:
+        logger.error(f"Error in speech analysis job {job_id}: {str(e)}")
+        analysis_jobs.fail(job_id, 'Error analyzing speech')
+    else:
+        remember_assessment(cache_key, assessment)
+        analysis_jobs.succeed(job_id, record_progress(patient, sound_id, analysis_payload(assessment)))
+
+def record_analysis_event(job_id, event, *data):
+    """Apply progress reported by an analysis worker to its job"""
+    if event == 'started':
+        analysis_jobs.started(job_id)
+    elif event == 'metric':
+        analysis_jobs.metric_done(job_id, *data)
+
+@routes.route('/analysis/<job_id>')
+def analysis_status(job_id):
+    """Poll the state of an async speech analysis"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Unknown or expired analysis job'
+        }), 404
+    return jsonify(job)
+
+@routes.route('/analysis/<job_id>/events')
+def analysis_events(job_id):
+    """Stream progress of an async speech analysis as Server-Sent Events"""
+    def stream():
+        version = -1
+        while True:
+            job = analysis_jobs.wait(job_id, version, timeout=15)
+            if job is None:
+                yield 'event: result\ndata: {"status": "error", "message": "Unknown or expired analysis job"}\n\n'
+                return
+            if job['version'] == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = job['version']
+            finished = job['status'] in ('success', 'error')
+            yield f"event: {'result' if finished else 'progress'}\ndata: {json.dumps(job)}\n\n"
+            if finished:
+                return
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def analysis_busy(error):
+    logger.warning(f"Rejecting speech analysis request: {str(error)}")
+    return jsonify({
+        'status': 'error',
+        'message': 'Speech analysis is busy, please try again shortly'
+    }), 503, {'Retry-After': str(error.retry_after)}
+
+def rejection_message(error):
+    """What to tell the client about a recording that could not be scored"""
+    if isinstance(error, SilentRecording):
+        return 'No speech detected in the recording'
+    if isinstance(error, AudioLoadError):
+        return 'Could not decode the recording'
+    return str(error)
+
+def recording_rejected(error):
+    logger.warning(f"Rejecting speech analysis request: {str(error)}")
+    return jsonify({
+        'status': 'error',
+        'message': rejection_message(error)
+    }), 413 if isinstance(error, RecordingTooLong) else 422
+
+def analysis_timed_out(error):
+    logger.error(f"Speech analysis timed out: {str(error)}")
+    return jsonify({
+        'status': 'error',
+        'message': 'Speech analysis took too long'
+    }), 504
+
+def live_scoring(ws):
+    """
+    Score a recording over a WebSocket while the patient speaks.
+    
+    The client opens with a JSON message {"sound_id": ..., "sample_rate": 16000},
+    optionally with "patient_id" and "session_id", then sends mono float32 little-endian PCM as binary messages and finally
+    {"event": "end"}. The server answers with "ready", periodic "partial"
+    scores and one "result" carrying the same payload as /analyze_speech.
+    """
+    from simple_websocket import ConnectionClosed
+    
+    def send(event, **body):
+        ws.send(json.dumps(dict(body, event=event)))
+    
+    try:
+        start = json.loads(ws.receive(timeout=10) or '{}')
+        reference = reference_catalog.lookup(start.get('sound_id', ''))
+        if not reference:
+            send('error', status='error', message='Reference audio not found')
+            return
+        if int(start.get('sample_rate', 0)) != reference_store.sample_rate:
+            send('error', status='error', message=f'Audio must be sent at {reference_store.sample_rate} Hz')
+            return
+        
+        scorer = StreamingScorer(
+            reference_store.get(reference.sound_id, reference.path, reference.stat),
+            reference.path,
+            sample_rate=reference_store.sample_rate,
+            sample_duration=reference_store.sample_duration
+        )
+        send('ready')
+        
+        while True:
+            message = ws.receive()
+            if isinstance(message, str):
+                if json.loads(message).get('event') == 'end':
+                    break
+                continue
+            scores = scorer.append(np.frombuffer(message[:len(message) - len(message) % 4], dtype='<f4'))
+            if scores is not None:
+                send('partial', seconds=scorer.seconds, results=scores)
+        
+        try:
+            assessment = scorer.finish(strict=True)
+        except AudioLoadError as e:
+            send('error', status='error', message=rejection_message(e))
+            return
+        patient = (start.get('patient_id', ''), start.get('session_id'))
+        send('result', **record_progress(patient, reference.sound_id, analysis_payload(assessment)))
+    
+    except ConnectionClosed:
+        logger.info("Live scoring client disconnected")
+    except Exception as e:
+        logger.error(f"Error in live scoring: {str(e)}", exc_info=True)
+        send('error', status='error', message='Error analyzing speech')
+
+@routes.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@routes.after_app_request
+def record_request_metrics(response):
+    """Count every request and time it by route"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.increment('speech_requests_total', route=route, status=str(response.status_code))
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe('speech_request_seconds', time.perf_counter() - started, route=route)
+    return response
+
+def profiling_requested():
+    """Whether this request asked for a profile and profiling is enabled"""
+    return current_app.config['PROFILE_REQUESTS'] and 'X-Debug-Profile' in request.headers
+
+@routes.route('/patients/<patient_id>/history')
+def patient_history(patient_id):
+    """A patient's most recent assessments, optionally for one sound_id and the last `days` days"""
+    days = request.args.get('days', type=float)
+    return jsonify({
+        'patient_id': patient_id,
+        'assessments': progress_store.history(
+            patient_id,
+            sound_id=request.args.get('sound_id'),
+            since=time.time() - days * 86400 if days else None,
+            limit=min(request.args.get('limit', 100, type=int), 1000)
+        )
+    })
+
+@routes.route('/patients/<patient_id>/trend')
+def patient_trend(patient_id):
+    """Daily aggregates of one metric over the last `days` days, e.g. ?metric=articulation_clarity&days=30"""
+    try:
+        trend = progress_store.trend(
+            patient_id,
+            request.args.get('metric', 'overall_assessment'),
+            days=request.args.get('days', 30, type=int),
+            sound_id=request.args.get('sound_id')
+        )
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    return jsonify(trend)
+
+@routes.route('/metrics')
+def metrics_endpoint():
+    """Stage latencies and error counters in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@routes.route('/analysis_profiles')
+def analysis_profiles():
+    """Available analysis profiles with their settings and published latency and agreement figures"""
+    figures = load_figures(current_app.config['ANALYSIS_PROFILE_FIGURES'])
+    return jsonify({
+        'default': current_app.config['ANALYSIS_PROFILE'],
+        'by_exercise': current_app.config['ANALYSIS_PROFILE_BY_EXERCISE'],
+        'profiles': {
+            name: dict(profile._asdict(), metrics=list(profile.metrics), measured=figures.get(name))
+            for name, profile in PROFILES.items()
+        }
+    })
+
+@routes.route('/analysis_executor')
+def analysis_executor_stats():
+    """Queue depth and wait times of the analysis worker pool"""
+    return jsonify(dict(analysis_executor.stats(), result_cache=result_cache.stats()))
+
+@routes.route('/transcribe', methods=['POST'])
+def transcribe():
+    """Transcribe one or more recordings sent as `audio` files"""
+    audio_files = request.files.getlist('audio')
+    logger.info(f"Received transcription request with {len(audio_files)} recordings")
+    
+    if not audio_files:
+        return jsonify({
+            'status': 'error',
+            'message': 'No audio file provided'
+        }), 400
+    
+    if len(audio_files) > MAX_BATCH_ITEMS:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {MAX_BATCH_ITEMS} recordings per batch'
+        }), 413
+    
+    try:
+        transcripts = transcription_engine.transcribe_many(
+            [audio_file.read() for audio_file in audio_files],
+            timeout=current_app.config['TRANSCRIBE_TIMEOUT']
+        )
+    except TranscriptionTimeout as e:
+        logger.error(f"Transcription timed out: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Transcription took too long'
+        }), 504
+    except Exception as e:
+        logger.error(f"Error in transcription: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': 'Error transcribing audio'
+        }), 500
+    
+    if len(transcripts) == 1:
+        return jsonify(dict(transcripts[0], status='success'))
+    return jsonify({
+        'status': 'success',
+        'items': transcripts
+    })
+
+@routes.route('/articulation')
 def articulation():
     return render_template('articulation.html')
 
-@app.route('/sentence')
+@routes.route('/sentence')
 def sentence():
     return render_template('sentence.html')
 
-@app.route('/tongue')
+@routes.route('/tongue')
 def tongue():
     return render_template('tongue.html')
 
-@app.route('/load_exercise/<exercise_type>')
+@routes.route('/load_exercise/<exercise_type>')
 def load_exercise(exercise_type):
     """Load specific exercise content"""
     return render_template(f'{exercise_type}.html')
 
-@app.route('/static/js/<path:filename>')
+@routes.route('/static/js/<path:filename>')
 def serve_static_js(filename):
     return send_from_directory('static/js', filename)
 
-@app.route('/verify_audio')
+@routes.route('/verify_audio')
 def verify_audio():
     """Verify all audio files exist and are accessible"""
-    audio_files = {
-        'speech_audio': [
-            's_sun.mp3',
-            's_snake.mp3',
-            'r_red.mp3',
-            'th_think.mp3'
-        ],
-        'sentence_audio': [
-            'sentence1.mp3',
-            'sentence2.mp3'
-        ],
-        'tongue_audio': [
-            'peter_piper.mp3',
-            'seashells.mp3'
-        ],
-        'articulation_audio': [
-            'p_pat.mp3',
-            'b_ball.mp3',
-            's_sun.mp3',
-            's_snake.mp3',
-            'r_red.mp3',
-            'th_think.mp3'
-        ]
-    }
-    
-    results = []
-    for folder, files in audio_files.items():
-        for file in files:
-            path = os.path.join('static', folder, file)
-            exists = os.path.exists(path)
-            results.append({
-                'folder': folder,
-                'file': file,
-                'exists': exists,
-                'path': path
-            })
-    
-    return render_template('verify_audio.html', results=results)
-
-@app.route('/verify_files')
+    return render_template('verify_audio.html', results=reference_catalog.verify())
+
+@routes.route('/verify_files')
 def verify_files():
     """Verify all required audio files exist"""
-    missing_files = []
-    for folder, files in audio_files.items():
-        for file in files:
-            path = os.path.join('static', folder, file)
-            if not os.path.exists(path):
-                missing_files.append(f"{folder}/{file}")
+    missing_files = reference_catalog.missing()
     
     if missing_files:
         return jsonify({
             'status': 'error',
-            'missing_files': missing_files
+            'missing_files': missing_files,
+            'catalog': reference_catalog.health()
         })
     
     return jsonify({
         'status': 'success',
-        'message': 'All audio files present'
+        'message': 'All audio files present',
+        'catalog': reference_catalog.health()
     })
 
 def check_audio_directories():
@@ -324,10 +928,16 @@ def check_audio_directories():
 
 # Call this function when the app starts
 if __name__ == '__main__':
-    check_audio_directories()
+    app = create_app()
+    # The reloader's watcher process only restarts the server; skip warm-up there
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        check_audio_directories()
+        reference_catalog.refresh()
+        reference_store.build(reference_catalog)
+        analysis_executor.warm_up()
     app.run(
         debug=True,
-        extra_files=extra_files,
+        extra_files=watched_files(),
         use_reloader=True,
         reloader_type='stat'
     )
\ No newline at end of file
@@ -0,0 +1,353 @@
+from typing import Callable, Dict, Iterator, List, Optional, Union
+from collections import deque
+from threading import Event, Thread
+import logging
+import time
+
+import numpy as np
+
+from speech_analysis import MIN_VOICED_SECONDS
+
+# Samples per callback block: 20 ms at 16 kHz, short enough for prompt endpointing
+DEFAULT_BLOCK_SIZE = 320
+
+# Frames quieter than this, in dB below full scale, never count as speech
+SPEECH_FLOOR_DB = -50.0
+# Speech must also be this far above the tracked background level
+NOISE_MARGIN_DB = 12.0
+
+logger = logging.getLogger(__name__)
+
+# sounddevice's stream callback: (indata of shape (frames, channels), frames, time, status)
+Callback = Callable[[np.ndarray, int, object, object], None]
+
+
+class RingBuffer:
+    """
+    A fixed-size single-producer, single-consumer sample queue without locks.
+
+    The producer (the audio callback) only ever advances `_written` and the
+    consumer only `_read`; both count samples since the start and only grow.
+    Samples are copied in before `_written` moves past them, and rebinding an
+    int is atomic, so the consumer never sees a half-written block. The
+    callback never waits: samples that don't fit are dropped and counted in
+    `overruns`.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._written = 0
+        self._read = 0
+        self.overruns = 0
+
+    def __len__(self) -> int:
+        return self._written - self._read
+
+    def write(self, samples: np.ndarray) -> int:
+        """Append samples from the producer; returns how many fit."""
+        free = self.capacity - (self._written - self._read)
+        if len(samples) > free:
+            self.overruns += len(samples) - free
+            samples = samples[:free]
+        count = len(samples)
+        start = self._written % self.capacity
+        first = min(count, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:count - first] = samples[first:]
+        self._written += count
+        return count
+
+    def read(self, max_samples: Optional[int] = None) -> np.ndarray:
+        """Take up to `max_samples` of the oldest samples, as a new array, from the consumer."""
+        count = self._written - self._read
+        if max_samples is not None:
+            count = min(count, max_samples)
+        start = self._read % self.capacity
+        first = min(count, self.capacity - start)
+        samples = np.concatenate([self._data[start:start + first], self._data[:count - first]])
+        self._read += count
+        return samples
+
+
+class Endpointer:
+    """
+    Splits a continuous signal into utterances by frame energy.
+
+    An utterance starts once `onset` seconds of consecutive frames are
+    speech, and ends after `hangover` seconds of silence, or when it reaches
+    `max_seconds`, the most the analysis would read anyway. `pre_roll`
+    seconds before the onset are kept so soft initial consonants survive;
+    SpeechAnalysis trims the surrounding silence as it does for uploads.
+
+    Live audio has no known peak to measure against, so a frame is speech
+    when its RMS is above both SPEECH_FLOOR_DB and the background level plus
+    NOISE_MARGIN_DB. The background level is the quietest frame of the last
+    `noise_window` seconds outside utterances, so a fan or room hum never
+    opens one, and it is held while an utterance lasts, so a long sustained
+    vowel doesn't become the background.
+    """
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_length: int = DEFAULT_BLOCK_SIZE,
+        onset: float = MIN_VOICED_SECONDS,
+        hangover: float = 0.6,
+        pre_roll: float = 0.25,
+        max_seconds: float = 5.0,
+        floor_db: float = SPEECH_FLOOR_DB,
+        margin_db: float = NOISE_MARGIN_DB,
+        noise_window: float = 3.0
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        frames = lambda seconds: max(1, int(round(seconds * sample_rate / frame_length)))
+        self.onset_frames = frames(onset)
+        self.hangover_frames = frames(hangover)
+        self.max_frames = frames(max_seconds)
+        self.floor_db = floor_db
+        self.margin_db = margin_db
+        self._background: deque = deque(maxlen=frames(noise_window))
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._pre_roll: deque = deque(maxlen=frames(pre_roll) + self.onset_frames)
+        self._utterance: Optional[List[np.ndarray]] = None
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    @property
+    def in_utterance(self) -> bool:
+        return self._utterance is not None
+
+    def process(self, samples: np.ndarray) -> List[np.ndarray]:
+        """Feed captured samples; returns the utterances they complete, in order."""
+        samples = np.concatenate([self._pending, np.asarray(samples, dtype=np.float32)])
+        count = len(samples) // self.frame_length
+        self._pending = samples[count * self.frame_length:]
+        if count == 0:
+            return []
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+        levels = 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-12)
+
+        finished = []
+        for frame, level in zip(frames, levels):
+            if self._utterance is None:
+                self._background.append(level)
+            speech = level > max(self.floor_db, min(self._background) + self.margin_db)
+            if self._utterance is None:
+                self._pre_roll.append(frame)
+                if speech:
+                    self._voiced_run += 1
+                    if self._voiced_run >= self.onset_frames:
+                        self._utterance = list(self._pre_roll)
+                        self._pre_roll.clear()
+                        self._silent_run = 0
+                else:
+                    self._voiced_run = 0
+                continue
+            self._utterance.append(frame)
+            self._silent_run = 0 if speech else self._silent_run + 1
+            if self._silent_run >= self.hangover_frames or len(self._utterance) >= self.max_frames:
+                finished.append(self._close())
+        return finished
+
+    def flush(self) -> Optional[np.ndarray]:
+        """The utterance in progress when the input ends, if any."""
+        if self._utterance is None:
+            return None
+        if self._pending.size:
+            self._utterance.append(self._pending)
+            self._pending = np.zeros(0, dtype=np.float32)
+        return self._close()
+
+    def _close(self) -> np.ndarray:
+        utterance = np.concatenate(self._utterance)
+        self._utterance = None
+        self._voiced_run = 0
+        self._silent_run = 0
+        return utterance
+
+
+class SoundDeviceInput:
+    """The server's microphone, through a sounddevice callback stream."""
+    finished = None
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        device: Optional[Union[int, str]] = None,
+        latency: Union[str, float] = 'low'
+    ):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.device = device
+        self.latency = latency
+        self._stream = None
+
+    def start(self, callback: Callback):
+        import sounddevice as sd
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            device=self.device,
+            channels=1,
+            dtype='float32',
+            latency=self.latency,
+            callback=callback
+        )
+        self._stream.start()
+
+    def stop(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
+
+class FakeInputDevice:
+    """
+    Plays an array or an audio file through the same callback as a microphone.
+
+    Blocks are delivered from a thread at the pace of real time, or as fast
+    as the consumer keeps up with `realtime=False`, and `finished` is set
+    after the last one. Used to run capture without audio hardware.
+    """
+    def __init__(
+        self,
+        source: Union[np.ndarray, str],
+        sample_rate: int = 16000,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        realtime: bool = True
+    ):
+        if isinstance(source, str):
+            import librosa
+            source, _ = librosa.load(source, sr=sample_rate, mono=True)
+        self.samples = np.asarray(source, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.realtime = realtime
+        self.finished = Event()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self, callback: Callback):
+        self.finished.clear()
+        self._stop.clear()
+        self._thread = Thread(target=self._play, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def _play(self, callback: Callback):
+        started = time.monotonic()
+        try:
+            for start in range(0, len(self.samples), self.block_size):
+                if self._stop.is_set():
+                    break
+                block = self.samples[start:start + self.block_size]
+                callback(block[:, np.newaxis], len(block), None, None)
+                if self.realtime:
+                    delay = started + (start + len(block)) / self.sample_rate - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+        finally:
+            self.finished.set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class LiveCapture:
+    """
+    Continuous capture split into utterances, each handed over as samples.
+
+    The input device's callback only copies each block into a RingBuffer.
+    Reading it, endpointing and everything after run on the consumer's
+    thread, so a slow analysis can never stall the audio stream; if the
+    consumer falls more than `buffer_seconds` behind, the newest audio is
+    dropped and counted. Utterances are float32 arrays at `sample_rate`,
+    ready to pass to SpeechAnalysis as `compare_path` without a WAV file.
+    """
+    def __init__(
+        self,
+        device,
+        sample_rate: int = 16000,
+        buffer_seconds: float = 10.0,
+        endpointer: Optional[Endpointer] = None,
+        poll_interval: float = 0.01
+    ):
+        self.device = device
+        self.sample_rate = sample_rate
+        self.ring = RingBuffer(int(buffer_seconds * sample_rate))
+        self.endpointer = endpointer or Endpointer(sample_rate)
+        self.poll_interval = poll_interval
+        self.status_errors = 0
+        self.utterance_count = 0
+        # Utterances ended but not yet handed out, kept across calls to utterances()
+        self._ready: deque = deque()
+        self._running = False
+
+    def __enter__(self) -> 'LiveCapture':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._running = True
+        self.device.start(self._callback)
+        logger.info(f"Capturing audio at {self.sample_rate} Hz")
+
+    def stop(self):
+        self._running = False
+        self.device.stop()
+
+    def _callback(self, indata: np.ndarray, frames: int, time_info, status):
+        # Runs on the audio thread: no allocation beyond the copy, no locks, no logging
+        if status:
+            self.status_errors += 1
+        self.ring.write(indata[:, 0])
+
+    def utterances(self, timeout: Optional[float] = None) -> Iterator[np.ndarray]:
+        """
+        Yield utterances as they end.
+
+        Stops when the capture is stopped or its input runs out, after
+        yielding the utterance in progress, or once `timeout` seconds pass
+        without a new utterance.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._ready:
+                self.utterance_count += 1
+                yield self._ready.popleft()
+                deadline = None if timeout is None else time.monotonic() + timeout
+                continue
+            # Checked before reading, so the last blocks are read after the input ends
+            ended = not self._running or (self.device.finished is not None and self.device.finished.is_set())
+            samples = self.ring.read()
+            if len(samples):
+                self._ready.extend(self.endpointer.process(samples))
+                continue
+            if ended:
+                utterance = self.endpointer.flush()
+                if utterance is None:
+                    return
+                self._ready.append(utterance)
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(self.poll_interval)
+
+    def next_utterance(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """The next complete utterance, or None if none ends within `timeout` seconds."""
+        return next(self.utterances(timeout), None)
+
+    def stats(self) -> Dict:
+        return {
+            'buffered_seconds': len(self.ring) / self.sample_rate,
+            'dropped_samples': self.ring.overruns,
+            'status_errors': self.status_errors,
+            'utterances': self.utterance_count
+        }
@@ -0,0 +1,301 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import librosa
+import numpy as np
+import soundfile as sf
+
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+# librosa resamplers behind each quality tier; 'high' is librosa.load's default
+RESAMPLE_TYPES = {
+    'fast': 'soxr_lq',
+    'high': 'soxr_hq',
+    'precise': 'soxr_vhq'
+}
+
+# ffmpeg resamplers for the same tiers: its own swr for speed, libsoxr at
+# matching precisions otherwise. A build without libsoxr fails the decode, and
+# the recording falls through to audioread, which honours the tier itself
+FFMPEG_RESAMPLERS = {
+    'fast': 'resampler=swr',
+    'high': 'resampler=soxr:precision=20',
+    'precise': 'resampler=soxr:precision=28'
+}
+
+# What to do with a recording longer than the analysis window
+LONG_RECORDING_POLICIES = ('truncate', 'reject')
+
+# Recordings whose peak stays below this (about -80 dBFS) are treated as silence
+SILENCE_PEAK = 1e-4
+
+# Containers libsndfile parses straight from a memory buffer
+SOUNDFILE_FORMATS = ('wav', 'flac', 'ogg/vorbis', 'ogg/opus', 'mp3')
+
+
+class RecordingTooLong(Exception):
+    """Raised when a recording exceeds the analysis window and the policy is 'reject'."""
+
+
+def audio_digest(data: bytes) -> str:
+    """Content hash identifying an uploaded recording."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DecodedAudioCache:
+    """
+    Recently decoded uploads, keyed by content hash, sample rate and resampling tier.
+
+    Scoring and transcription both decode the same take; whichever runs
+    second reuses the samples. An entry records whether it holds the whole
+    recording or only the start an analysis window needed, which can still
+    serve another analysis with a window no longer than that. Samples are
+    stored read-only and shared, and the least recently used entries are
+    dropped beyond `max_bytes`.
+
+    Analysis worker processes call forward_to_parent(); the complete
+    recordings they decode are then also returned with each job by drain()
+    and merged into the web process's cache, as MetricsRegistry does.
+    """
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[np.ndarray, bool, Dict]]" = OrderedDict()
+        self._bytes = 0
+        self._pending: List[Tuple] = []
+        self._forward = False
+        self._lock = Lock()
+
+    def forward_to_parent(self):
+        """Also buffer complete recordings for drain()."""
+        if multiprocessing.parent_process() is not None:
+            self._forward = True
+
+    def get(self, key: Tuple) -> Optional[Tuple[np.ndarray, bool, Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, audio: np.ndarray, complete: bool, info: Dict):
+        if audio.nbytes > self.max_bytes:
+            return
+        audio.flags.writeable = False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[0].nbytes
+            self._entries[key] = (audio, complete, info)
+            self._bytes += audio.nbytes
+            while self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+            if self._forward and complete:
+                self._pending.append((key, audio, complete, info))
+
+    def drain(self) -> List[Tuple]:
+        """Complete recordings decoded since the last drain."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def merge(self, entries: List[Tuple]):
+        """Add recordings drained in another process."""
+        for entry in entries:
+            self.put(*entry)
+
+
+decoded_audio = DecodedAudioCache()
+
+
+def sniff_format(data: bytes) -> str:
+    """
+    Identify a recording's container, and for Ogg its codec, from its magic bytes.
+
+    Returns one of 'wav', 'flac', 'ogg/vorbis', 'ogg/opus', 'ogg', 'webm',
+    'matroska', 'mp4', 'mp3' or 'unknown'. Browsers label MediaRecorder
+    output as they please, so the bytes are the only reliable source.
+    """
+    header = bytes(data[:64])
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'OggS':
+        # The first page carries the codec's identification header
+        if b'OpusHead' in header:
+            return 'ogg/opus'
+        if b'\x01vorbis' in header:
+            return 'ogg/vorbis'
+        return 'ogg'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        # EBML; the DocType element tells WebM from other Matroska files
+        return 'webm' if b'webm' in header else 'matroska'
+    if header[4:8] == b'ftyp':
+        return 'mp4'
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return 'unknown'
+
+
+def ingest(
+    data: bytes,
+    sample_rate: int,
+    max_duration: Optional[float] = None,
+    resample: str = 'high',
+    long_recordings: str = 'truncate',
+    digest: Optional[str] = None
+) -> Tuple[np.ndarray, Dict]:
+    """
+    Decode an uploaded recording held in memory to mono float32 at `sample_rate`.
+
+    The container is sniffed first and the fastest decoder that handles it
+    is used: soundfile reading from the buffer, then an ffmpeg pipe when
+    ffmpeg is installed, then librosa's audioread fallback through a
+    temporary file. Only the first `max_duration` seconds are decoded; with
+    `long_recordings='reject'` a longer recording raises RecordingTooLong
+    instead. `resample` picks a quality tier from RESAMPLE_TYPES, which every
+    decoder honours and the report records.
+
+    A take already in `decoded_audio` at the same rate and tier is not
+    decoded again; pass `digest` if the upload's hash is already known.
+
+    Returns the samples and a report of how they were decoded.
+    """
+    res_type = RESAMPLE_TYPES[resample]
+    reject = long_recordings == 'reject'
+    key = (digest or audio_digest(data), sample_rate, resample)
+    result = _from_cache(key, sample_rate, max_duration, reject)
+    if result is not None:
+        metrics.increment('speech_decodes_total', format=result[1]['format'], decoder='cache')
+        return result
+
+    info = {'format': sniff_format(data), 'resample': resample}
+
+    if info['format'] in SOUNDFILE_FORMATS or info['format'] == 'unknown':
+        try:
+            result = _soundfile_decode(data, sample_rate, max_duration, res_type, reject, info)
+        except RecordingTooLong:
+            raise
+        except Exception as e:
+            logger.debug(f"soundfile could not decode {info['format']} audio: {str(e)}")
+
+    if result is None and shutil.which('ffmpeg'):
+        try:
+            result = _ffmpeg_decode(data, sample_rate, max_duration, resample, reject, info)
+        except RecordingTooLong:
+            raise
+        except Exception as e:
+            logger.debug(f"ffmpeg could not decode {info['format']} audio: {str(e)}")
+
+    if result is None:
+        result = _audioread_decode(data, sample_rate, max_duration, res_type, reject, info)
+    metrics.increment('speech_decodes_total', format=info['format'], decoder=result[1]['decoder'])
+    decoded_audio.put(key, result[0], not result[1]['truncated'], result[1])
+    return result
+
+
+def _from_cache(key, sample_rate, max_duration, reject):
+    """A cached decode that covers `max_duration`, with the long-recording policy applied."""
+    entry = decoded_audio.get(key)
+    if entry is None:
+        return None
+    audio, complete, info = entry
+    info = dict(info, decoder='cache')
+    if complete:
+        return _limit(audio, sample_rate, max_duration, reject, info)
+    # Only the start was kept, so the recording is longer than any window it covers
+    if max_duration is None or len(audio) < int(max_duration * sample_rate):
+        return None
+    if reject:
+        raise RecordingTooLong(f"Recording is longer than the {max_duration:g}s limit")
+    return audio[:int(max_duration * sample_rate)], dict(info, truncated=True)
+
+
+def decode_bytes(
+    data: bytes,
+    sample_rate: int,
+    duration: Optional[float] = None,
+    digest: Optional[str] = None
+) -> np.ndarray:
+    """Decode an uploaded recording to mono float32, keeping at most `duration` seconds."""
+    return ingest(data, sample_rate, duration, digest=digest)[0]
+
+
+def _too_long(seconds: float, max_duration: Optional[float]) -> bool:
+    # Allow a millisecond of slack for rounding in container headers
+    return max_duration is not None and seconds > max_duration + 1e-3
+
+
+def _soundfile_decode(data, sample_rate, max_duration, res_type, reject, info):
+    sound = sf.SoundFile(io.BytesIO(data))
+    seconds = sound.frames / sound.samplerate
+    if reject and _too_long(seconds, max_duration):
+        sound.close()
+        raise RecordingTooLong(f"Recording is {seconds:.1f}s long; the limit is {max_duration:g}s")
+    info.update(
+        decoder='soundfile',
+        native_rate=sound.samplerate,
+        resampled=sound.samplerate != sample_rate,
+        truncated=_too_long(seconds, max_duration)
+    )
+    # librosa reads from the open file, only as many frames as the window needs
+    audio, _ = librosa.load(sound, sr=sample_rate, duration=max_duration, res_type=res_type)
+    return audio, info
+
+
+def _ffmpeg_command(sample_rate, max_duration, resample):
+    command = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0']
+    if max_duration is not None:
+        # Decode slightly past the window so an over-long recording can be detected
+        command += ['-t', f"{max_duration + 0.1:g}"]
+    command += [
+        '-ac', '1',
+        '-af', f"aresample={sample_rate}:{FFMPEG_RESAMPLERS[resample]}",
+        '-ar', str(sample_rate),
+        '-f', 'f32le', 'pipe:1'
+    ]
+    return command
+
+
+def _ffmpeg_decode(data, sample_rate, max_duration, resample, reject, info):
+    command = _ffmpeg_command(sample_rate, max_duration, resample)
+    output = subprocess.run(command, input=data, capture_output=True, check=True).stdout
+    audio = np.frombuffer(output, dtype='<f4')
+    if len(audio) == 0:
+        raise ValueError("ffmpeg produced no audio")
+    return _limit(audio, sample_rate, max_duration, reject, dict(info, decoder='ffmpeg', resampled=True))
+
+
+def _audioread_decode(data, sample_rate, max_duration, res_type, reject, info):
+    # audioread needs a path, so this last resort goes through a temporary file
+    temp_file = tempfile.NamedTemporaryFile(suffix='.audio', delete=False)
+    try:
+        temp_file.write(data)
+        temp_file.close()
+        duration = max_duration + 0.1 if max_duration is not None else None
+        audio, _ = librosa.load(temp_file.name, sr=sample_rate, duration=duration, res_type=res_type)
+    finally:
+        os.unlink(temp_file.name)
+    return _limit(audio, sample_rate, max_duration, reject, dict(info, decoder='audioread'))
+
+
+def _limit(audio, sample_rate, max_duration, reject, info):
+    """Apply the long-recording policy to audio decoded slightly past the window."""
+    seconds = len(audio) / sample_rate
+    if reject and _too_long(seconds, max_duration):
+        raise RecordingTooLong(f"Recording is longer than the {max_duration:g}s limit")
+    info['truncated'] = _too_long(seconds, max_duration)
+    if max_duration is not None:
+        audio = audio[:int(max_duration * sample_rate)]
+    return audio, info
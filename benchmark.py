@@ -0,0 +1,409 @@
+from typing import Callable, Dict, List, Tuple
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import soundfile as sf
+
+from speech_analysis import AudioLoadError, SpeechAnalysis, SpeechFeatures, METRIC_FEATURES
+from analysis_profiles import PROFILES
+from audio_ingest import ingest
+from intent_matcher import IntentMatcher, MENU_KEYWORDS
+from utils import ExerciseManager
+
+SAMPLE_RATE = 16000
+SIGNALS = ('tone', 'chirp', 'noise', 'silence', 'clipped')
+DEFAULT_DURATIONS = (1.0, 2.5, 5.0)
+DEFAULT_INTENT_COUNTS = (100, 3000)
+
+logger = logging.getLogger(__name__)
+
+
+def synthesize(kind: str, duration: float, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Deterministic test signal of the given kind and length."""
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    rng = np.random.default_rng(0)
+    if kind == 'tone':
+        audio = 0.5 * np.sin(2 * np.pi * 220 * t)
+    elif kind == 'chirp':
+        audio = 0.3 * np.sin(2 * np.pi * (150 + 150 * t / max(duration, 1e-9)) * t)
+    elif kind == 'noise':
+        # Quarter-second noise bursts separated by silence
+        bursts = (t % 0.5) < 0.25
+        audio = np.clip(0.3 * rng.standard_normal(len(t)), -1.0, 1.0) * bursts
+    elif kind == 'silence':
+        audio = np.zeros(len(t))
+    elif kind == 'clipped':
+        audio = np.clip(4.0 * np.sin(2 * np.pi * 180 * t), -1.0, 1.0)
+    else:
+        raise ValueError(f"Unknown signal kind: {kind}")
+    return audio.astype(np.float32)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def measure(fn: Callable, repeat: int) -> Dict[str, float]:
+    """Time `fn` `repeat` times, then run it once more under tracemalloc."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50': percentile(timings, 0.5),
+        'p95': percentile(timings, 0.95),
+        'mean': sum(timings) / len(timings),
+        'alloc_peak_kb': peak / 1024
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def bench_analysis(workdir: str, durations, repeat: int, sample_duration: float = 5.0) -> Dict[str, Dict]:
+    """Time preprocessing, each metric and the full assessment for every test signal."""
+    reference_path = os.path.join(workdir, 'reference.wav')
+    sf.write(reference_path, synthesize('chirp', sample_duration), SAMPLE_RATE)
+    reference = SpeechAnalysis(reference_path, reference_path, verbose=False, sample_duration=sample_duration)
+    # The app serves reference features from the store, so they are precomputed here too
+    reference_features = reference.reference_features
+    reference_features.to_arrays()
+
+    results: Dict[str, Dict] = {}
+    for kind in SIGNALS:
+        for duration in durations:
+            name = f"{kind}_{duration:g}s"
+            path = os.path.join(workdir, f"{name}.wav")
+            sf.write(path, synthesize(kind, duration), SAMPLE_RATE)
+
+            def analyzer(**kwargs) -> SpeechAnalysis:
+                return SpeechAnalysis(
+                    reference_path, path, verbose=False, sample_duration=sample_duration,
+                    reference_features=reference_features, **kwargs
+                )
+
+            audio = analyzer().load_and_preprocess(path)
+            stages = {
+                'load_and_preprocess': lambda: analyzer().load_and_preprocess(path),
+                'features': lambda: SpeechFeatures(audio, SAMPLE_RATE).to_arrays(),
+                'clinical_speech_assessment': lambda: analyzer().clinical_speech_assessment()
+            }
+            for metric in METRIC_FEATURES:
+                # Each metric pays for its own feature extraction, shared STFT included
+                stages[metric] = lambda metric=metric: getattr(
+                    analyzer(compare_features=SpeechFeatures(audio, SAMPLE_RATE)), metric
+                )()
+
+            for stage, fn in stages.items():
+                results.setdefault(stage, {})[name] = measure(fn, repeat)
+            logger.info(f"Benchmarked {name}")
+    return results
+
+
+def bench_profiles(workdir: str, durations, repeat: int, sample_duration: float = 5.0) -> Tuple[Dict[str, Dict], Dict]:
+    """
+    Time a full assessment under every analysis profile, and score its agreement with 'clinical'.
+
+    Each case is decoded from WAV bytes at the profile's rate and
+    resampling tier, as an upload would be, and scored against reference
+    features precomputed with the same profile. Silent takes are left out,
+    since the app rejects them before scoring. Returns the timings and a
+    summary per profile.
+    """
+    reference_path = os.path.join(workdir, 'profile_reference.wav')
+    sf.write(reference_path, synthesize('chirp', sample_duration), SAMPLE_RATE)
+    cases = {}
+    for kind in SIGNALS:
+        if kind == 'silence':
+            continue
+        for duration in durations:
+            buffer = io.BytesIO()
+            sf.write(buffer, synthesize(kind, duration), SAMPLE_RATE, format='WAV')
+            cases[f"{kind}_{duration:g}s"] = buffer.getvalue()
+
+    results: Dict[str, Dict] = {}
+    overall: Dict[str, Dict[str, float]] = {}
+    for name, profile in PROFILES.items():
+        kwargs = profile.analysis_kwargs()
+        resample = profile.resample or 'high'
+        reference_features = SpeechAnalysis(
+            reference_path, reference_path, verbose=False, sample_duration=sample_duration, **kwargs
+        ).reference_features
+        reference_features.to_arrays()
+
+        def assess(data: bytes) -> Dict[str, float]:
+            audio, _ = ingest(data, profile.sample_rate, sample_duration, resample=resample)
+            return SpeechAnalysis(
+                reference_path, audio, verbose=False, sample_duration=sample_duration,
+                reference_features=reference_features, strict=True, **kwargs
+            ).clinical_speech_assessment()
+
+        for case, data in cases.items():
+            try:
+                overall.setdefault(name, {})[case] = assess(data)['overall_assessment']
+            except AudioLoadError:
+                continue
+            results.setdefault(f"profile_{name}", {})[case] = measure(lambda: assess(data), repeat)
+        logger.info(f"Benchmarked the {name} analysis profile")
+    return results, profile_summary(results, overall)
+
+
+def profile_summary(results: Dict[str, Dict], overall: Dict[str, Dict[str, float]], baseline: str = 'clinical') -> Dict:
+    """Per profile: median and worst case latency, and how far its overall scores are from `baseline`'s."""
+    summary = {}
+    for name, scores in overall.items():
+        timings = results.get(f"profile_{name}", {})
+        differences = [
+            abs(score - overall[baseline][case]) for case, score in scores.items() if case in overall.get(baseline, {})
+        ]
+        summary[name] = {
+            'p50_ms': percentile([figures['p50'] for figures in timings.values()], 0.5) * 1000 if timings else None,
+            'max_p95_ms': max(figures['p95'] for figures in timings.values()) * 1000 if timings else None,
+            'agreement_mean_abs_diff': sum(differences) / len(differences) if differences else None,
+            'agreement_max_abs_diff': max(differences) if differences else None,
+            'cases': len(scores)
+        }
+    return summary
+
+
+def bench_route(workdir: str, durations, repeat: int) -> Dict[str, Dict]:
+    """Time POST /analyze_speech through the Flask test client, in-process."""
+    os.environ.setdefault('ANALYSIS_BACKEND', 'thread')
+    # Every repeat posts the same take; the result cache would answer all but the first
+    os.environ.setdefault('RESULT_CACHE_ENTRIES', '0')
+    # nor should its decode come from the decoded-audio cache
+    os.environ.setdefault('DECODED_AUDIO_CACHE_MB', '0')
+    # Rendering prompt audio in the background would compete with the timed requests
+    os.environ.setdefault('PROMPT_AUDIO_PRERENDER', '0')
+    # Synthetic takes must not end up in the real patients' history
+    os.environ.setdefault('PROGRESS_DB', os.path.join(workdir, 'progress.sqlite3'))
+    from app import create_app
+    import app as app_module
+
+    app = create_app()
+    entries = app_module.reference_catalog.entries()
+    if not entries:
+        logger.warning("No reference prompts found; skipping the route benchmark")
+        return {}
+    sound_id = entries[0].sound_id
+    client = app.test_client()
+
+    results: Dict[str, Dict] = {}
+    for kind in SIGNALS:
+        for duration in durations:
+            name = f"{kind}_{duration:g}s"
+            path = os.path.join(workdir, f"route_{name}.wav")
+            sf.write(path, synthesize(kind, duration), SAMPLE_RATE)
+            with open(path, 'rb') as file:
+                data = file.read()
+
+            # Silent takes are rejected before any scoring; that rejection is timed too
+            expected = 422 if kind == 'silence' else 200
+
+            def post():
+                response = client.post(
+                    '/analyze_speech',
+                    data={'audio': (io.BytesIO(data), 'take.wav'), 'sound_id': sound_id},
+                    content_type='multipart/form-data'
+                )
+                if response.status_code != expected:
+                    raise RuntimeError(f"/analyze_speech returned {response.status_code}")
+
+            results.setdefault('route_analyze_speech', {})[name] = measure(post, repeat)
+    app_module.analysis_executor.shutdown()
+    app_module.reference_catalog.stop_polling()
+    app_module.intent_matcher.stop_polling()
+    return results
+
+
+def linear_match(message: str, exercise_types: List[str], intents: Dict):
+    """The chatbot's original matching: three substring scans in priority order."""
+    if any(word in message for word in MENU_KEYWORDS):
+        return ('menu', None)
+    for exercise_type in exercise_types:
+        if exercise_type.lower() in message:
+            return ('exercise_type', exercise_type)
+    for intent in intents['intents']:
+        if intent['intent'] in message:
+            return ('intent', intent)
+    return None
+
+
+def bench_intents(workdir: str, counts, repeat: int) -> Dict[str, Dict]:
+    """Time matching a batch of chat messages against `counts` intents, compiled and linear."""
+    exercise_types = ExerciseManager().get_exercise_types()
+    with open('intents.json') as file:
+        base = json.load(file)['intents']
+    rng = np.random.default_rng(0)
+    results: Dict[str, Dict] = {}
+    for count in counts:
+        # Made-up intent names after the real ones, with the real fallback last
+        generated = [{'intent': f"topic{i}x{rng.integers(1 << 30):x}", 'responses': ['ok']} for i in range(count)]
+        intents = {'intents': base[:-1] + generated + base[-1:]}
+        path = os.path.join(workdir, f"intents_{count}.json")
+        with open(path, 'w') as file:
+            json.dump(intents, file)
+        matcher = IntentMatcher(path, exercise_types)
+
+        # Mostly misses, which scan every intent, plus hits late in the file
+        messages = [
+            "hello there, i would like some help with my speech today please",
+            "can you tell me something i have not asked before",
+            f"tell me about {generated[-1]['intent']} please",
+            f"what about {generated[count // 2]['intent']}",
+            "hey",
+            "show me the breathing exercises"
+        ] * 50
+        for message in messages:
+            if matcher.match(message) != linear_match(message, exercise_types, intents):
+                raise RuntimeError(f"Compiled and linear matching disagree on {message!r}")
+
+        for name, match in (
+            ('compiled', matcher.match),
+            ('linear', lambda message: linear_match(message, exercise_types, intents))
+        ):
+            figures = measure(lambda: [match(message) for message in messages], repeat)
+            figures['messages_per_s'] = len(messages) / figures['p50']
+            results.setdefault('intent_matching', {})[f"{name}_{count}"] = figures
+        logger.info(f"Benchmarked intent matching with {count} intents")
+    return results
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Regressions of `current` against `baseline`.
+
+    A case regresses when its median time or its allocation peak grows by
+    more than `threshold` (0.25 means 25%). Cases missing from either side
+    are ignored.
+    """
+    regressions = []
+    for stage, cases in current['results'].items():
+        for name, figures in cases.items():
+            before = baseline['results'].get(stage, {}).get(name)
+            if before is None:
+                continue
+            for key in ('p50', 'alloc_peak_kb'):
+                if before[key] > 0 and figures[key] > before[key] * (1 + threshold):
+                    regressions.append(
+                        f"{stage}/{name} {key}: {before[key]:.4g} -> {figures[key]:.4g} "
+                        f"(+{(figures[key] / before[key] - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def run(
+    durations=DEFAULT_DURATIONS,
+    repeat: int = 10,
+    route: bool = True,
+    intent_counts=DEFAULT_INTENT_COUNTS,
+    profiles: bool = True
+) -> Dict:
+    """Run the whole suite and return JSON-serializable results."""
+    summary = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_analysis(workdir, durations, repeat)
+        if profiles:
+            profile_results, summary = bench_profiles(workdir, durations, repeat)
+            results.update(profile_results)
+        if route:
+            results.update(bench_route(workdir, durations, repeat))
+        if intent_counts:
+            results.update(bench_intents(workdir, intent_counts, repeat))
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'durations': list(durations),
+            'intent_counts': list(intent_counts),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'profiles': summary,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the speech analysis hot path")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--durations', type=float, nargs='+', default=list(DEFAULT_DURATIONS))
+    parser.add_argument('--no-route', action='store_true', help="Skip the Flask route benchmark")
+    parser.add_argument('--intent-counts', type=int, nargs='*', default=list(DEFAULT_INTENT_COUNTS),
+                        help="Intent counts for the chatbot matching benchmark; none skips it")
+    parser.add_argument('--no-profiles', action='store_true', help="Skip the analysis profile comparison")
+    parser.add_argument('--publish-profiles', metavar='PATH',
+                        help="Write each profile's latency and agreement to PATH, served by /analysis_profiles")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against this JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results to --baseline")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    current = run(
+        args.durations, args.repeat, route=not args.no_route, intent_counts=args.intent_counts,
+        profiles=not args.no_profiles
+    )
+
+    for stage, cases in current['results'].items():
+        for name, figures in cases.items():
+            print(f"{stage:28s} {name:14s} p50 {figures['p50'] * 1000:8.2f} ms  "
+                  f"p95 {figures['p95'] * 1000:8.2f} ms  alloc {figures['alloc_peak_kb']:9.0f} KiB"
+                  + (f"  {figures['messages_per_s']:9.0f} msg/s" if 'messages_per_s' in figures else ''))
+    for name, figures in current['profiles'].items():
+        print(f"profile {name:10s} p50 {figures['p50_ms']:8.2f} ms  worst p95 {figures['max_p95_ms']:8.2f} ms  "
+              f"|overall - clinical| mean {figures['agreement_mean_abs_diff']:.3f} max {figures['agreement_max_abs_diff']:.3f}")
+    print(f"peak RSS {current['peak_rss_mb']:.1f} MiB")
+
+    if args.publish_profiles and current['profiles']:
+        os.makedirs(os.path.dirname(args.publish_profiles) or '.', exist_ok=True)
+        with open(args.publish_profiles, 'w') as file:
+            json.dump({'meta': current['meta'], 'profiles': current['profiles']}, file, indent=2)
+        print(f"Published analysis profile figures to {args.publish_profiles}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(current, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+from typing import Callable, Dict, List, Tuple
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+import bisect
+import cProfile
+import io
+import multiprocessing
+import pstats
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = 'speech_stage_seconds'
+
+HELP = {
+    STAGE_SECONDS: 'Time spent in each stage of speech analysis and its requests',
+    'speech_errors_total': 'Errors caught while analyzing speech, by stage',
+    'speech_nan_fallbacks_total': 'Metric scores that came out NaN, by metric',
+    'speech_zero_fill_total': 'Recordings replaced by silence because they could not be decoded',
+    'speech_decodes_total': 'Uploaded recordings decoded, by sniffed format and decoder',
+    'speech_result_cache_total': 'Analysis result cache lookups, by hit or miss',
+    'speech_requests_total': 'HTTP requests by route and response status',
+    'speech_request_seconds': 'HTTP request latency by route'
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    Process-wide latency histograms and counters in Prometheus text format.
+
+    Analysis worker processes call forward_to_parent(); their observations
+    are then buffered, returned with each job by drain(), and merged into
+    the web process's registry so /metrics covers the whole pool.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, Labels], List] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._pending: List[Tuple] = []
+        self._forward = False
+        self._lock = Lock()
+
+    def forward_to_parent(self):
+        """Buffer observations for drain() instead of recording them here."""
+        if multiprocessing.parent_process() is not None:
+            self._forward = True
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if self._forward:
+                self._pending.append(('histogram', key, seconds))
+                return
+            self._observe(key, seconds)
+
+    def increment(self, name: str, amount: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if self._forward:
+                self._pending.append(('counter', key, amount))
+                return
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def _observe(self, key, seconds: float):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            # Per-bucket counts plus an overflow bucket, then the sum and the count
+            histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+    @contextmanager
+    def span(self, stage: str):
+        """Record how long the enclosed block takes under `stage`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - started, stage=stage)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator recording each call of a function under `stage`."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def drain(self) -> List[Tuple]:
+        """Observations buffered since the last drain."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def merge(self, observations: List[Tuple]):
+        """Record observations drained in another process."""
+        with self._lock:
+            for kind, key, value in observations:
+                if kind == 'histogram':
+                    self._observe(key, value)
+                else:
+                    self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def profile_call(fn: Callable, *args, limit: int = 30, **kwargs) -> Tuple[object, str]:
+    """Run `fn` under cProfile; returns its result and the top functions by cumulative time."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return result, output.getvalue()
+
+
+metrics = MetricsRegistry()
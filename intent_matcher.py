@@ -0,0 +1,169 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from threading import Event, Thread
+import json
+import logging
+import os
+
+# Messages containing any of these get the list of exercise types
+MENU_KEYWORDS = ("exercises", "exercise", "what can you do")
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton answering "which keyword occurs first in priority order".
+
+    Keywords are matched as substrings, like `keyword in text`, and a
+    keyword's priority is its position in the list. Every state stores the
+    best priority among the keywords ending there, including those reached
+    through its failure links, so a scan is a single pass over the text
+    whatever the number of keywords.
+    """
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[int]] = [None]
+        for priority, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                state = self._goto[state].get(char) or self._add_state(state, char)
+            self._best[state] = _better(self._best[state], priority)
+        self._link()
+
+    def _add_state(self, parent: int, char: str) -> int:
+        self._goto.append({})
+        self._fail.append(0)
+        self._best.append(None)
+        self._goto[parent][char] = len(self._goto) - 1
+        return len(self._goto) - 1
+
+    def _link(self):
+        """Breadth-first pass setting failure links and folding in their priorities."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._best[child] = _better(self._best[child], self._best[self._fail[child]])
+                queue.append(child)
+
+    def first(self, text: str) -> Optional[int]:
+        """Priority of the highest-priority keyword occurring in `text`, or None."""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] is not None and (found is None or best[state] < found):
+                found = best[state]
+                if found == 0:
+                    break
+        return found
+
+
+def _better(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    return a if b is None else min(a, b)
+
+
+class IntentMatcher:
+    """
+    Chatbot intents compiled into one keyword automaton.
+
+    The menu keywords, the exercise types and the intents in intents.json
+    are matched in that order of priority, exactly as the chatbot's
+    separate scans did: the first menu keyword, exercise type or intent name
+    found anywhere in the message wins. intents.json is re-read when its
+    mtime changes, either through `reload()` or by polling.
+    """
+    def __init__(
+        self,
+        path: str = 'intents.json',
+        exercise_types: Sequence[str] = (),
+        menu_keywords: Sequence[str] = MENU_KEYWORDS
+    ):
+        self.path = path
+        self.exercise_types = list(exercise_types)
+        self.menu_keywords = list(menu_keywords)
+        self.intents: Dict = {'intents': []}
+        self.on_reload = None
+        self._compiled: Tuple[KeywordAutomaton, List[Tuple[str, object]]] = (KeywordAutomaton([]), [])
+        self._mtime_ns: Optional[int] = None
+        self._stop = Event()
+        self._poller: Optional[Thread] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Recompile if intents.json changed; returns whether it did. A broken file keeps the old intents."""
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Could not load intents from {self.path}: {str(e)}")
+            return False
+        if mtime_ns == self._mtime_ns:
+            return False
+        # Remember the version even if it is broken, so the error is logged once rather than every poll
+        self._mtime_ns = mtime_ns
+        try:
+            with open(self.path, 'r') as file:
+                intents = json.load(file)
+            compiled = self._compile(intents)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Could not load intents from {self.path}: {str(e)}")
+            return False
+        # match() reads the automaton and its targets as one attribute, so a
+        # concurrent request sees either the old or the new intents, never a mix
+        self.intents, self._compiled = intents, compiled
+        logger.info(f"Compiled {len(compiled[1])} chatbot keywords from {self.path}")
+        if self.on_reload is not None:
+            self.on_reload(intents)
+        return True
+
+    def _compile(self, intents: Dict) -> Tuple[KeywordAutomaton, List[Tuple[str, object]]]:
+        targets = [('menu', None) for _ in self.menu_keywords]
+        keywords = list(self.menu_keywords)
+        for exercise_type in self.exercise_types:
+            keywords.append(exercise_type.lower())
+            targets.append(('exercise_type', exercise_type))
+        for intent in intents['intents']:
+            keywords.append(intent['intent'])
+            targets.append(('intent', intent))
+        return KeywordAutomaton(keywords), targets
+
+    def match(self, message: str) -> Optional[Tuple[str, object]]:
+        """
+        What a lowercased message asks for, or None.
+
+        Returns ('menu', None), ('exercise_type', type) or ('intent', intent).
+        """
+        automaton, targets = self._compiled
+        priority = automaton.first(message)
+        return None if priority is None else targets[priority]
+
+    def fallback(self) -> Dict:
+        """The intent answering messages nothing else matches: the last one in the file."""
+        return self.intents['intents'][-1]
+
+    def start_polling(self, interval: float = 2.0):
+        """Reload intents.json in a background thread when it changes."""
+        if self._poller is not None and self._poller.is_alive():
+            return
+        self._stop.clear()
+        self._poller = Thread(target=self._poll, args=(interval,), daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        self._stop.set()
+
+    def _poll(self, interval: float):
+        while not self._stop.wait(interval):
+            self.reload()
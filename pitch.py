@@ -0,0 +1,139 @@
+from typing import Tuple
+import math
+import librosa
+import numpy as np
+import scipy.fft
+
+from instrumentation import metrics
+
+# Speaking fundamental frequency range, from low adult voices to children
+DEFAULT_FMIN = 60.0
+DEFAULT_FMAX = 500.0
+
+# Frames whose normalized difference never dips below this are unvoiced
+YIN_THRESHOLD = 0.15
+
+# Frames processed per FFT batch, bounding the scratch memory of long signals
+BLOCK_FRAMES = 32
+
+
+def yin_frames(
+    frames: np.ndarray,
+    sample_rate: int,
+    window: int,
+    fmin: float = DEFAULT_FMIN,
+    fmax: float = DEFAULT_FMAX,
+    threshold: float = YIN_THRESHOLD
+) -> np.ndarray:
+    """
+    Fundamental frequency of each column of a (samples, frames) matrix, by YIN.
+
+    Each column is compared with itself shifted by up to one `fmin` period
+    over its first `window` samples, so columns need at least that many
+    samples plus the longest period. The difference function of every frame
+    is built from an FFT autocorrelation and running energy sums, for a
+    whole block of frames at once. A frame is voiced when its cumulative
+    mean normalized difference has a trough below `threshold` between the
+    lags of `fmax` and `fmin`; the first such trough, refined by parabolic
+    interpolation, gives its period. Unvoiced frames get 0 Hz.
+    """
+    n_frames = frames.shape[1]
+    tau_min, tau_max = lag_range(sample_rate, window, fmin, fmax)
+    # Later samples never enter the difference function
+    frames = frames[:window + tau_max + 1]
+    if frames.shape[0] < window + tau_max + 1:
+        raise ValueError(f"Frames need {window + tau_max + 1} samples for a {window}-sample window at {fmin:g} Hz")
+    fft_size = scipy.fft.next_fast_len(frames.shape[0] + window, real=True)
+
+    f0 = np.zeros(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        # One row per frame, so every FFT runs over contiguous samples. Single
+        # precision halves the scratch; periods are refined to well under a sample anyway
+        block = np.ascontiguousarray(frames[:, start:start + BLOCK_FRAMES].T, dtype=np.float32)
+
+        # r(tau) = sum over j < window of x[j] * x[j + tau], as one convolution with the reversed head
+        spectrum = scipy.fft.rfft(block, fft_size) * scipy.fft.rfft(block[:, window - 1::-1], fft_size)
+        autocorrelation = scipy.fft.irfft(spectrum, fft_size)[:, window - 1:window + tau_max]
+        energy = np.zeros((len(block), block.shape[1] + 1))
+        np.cumsum(block ** 2, axis=1, out=energy[:, 1:])
+        shifted_energy = energy[:, window:window + tau_max + 1] - energy[:, :tau_max + 1]
+        difference = np.maximum(shifted_energy[:, :1] + shifted_energy - 2 * autocorrelation, 0.0)
+
+        lags = np.arange(1, tau_max + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = difference[:, 1:] * lags / np.cumsum(difference[:, 1:], axis=1)
+        # Column k now holds lag k + 1; keep the searchable lags
+        normalized = normalized[:, tau_min - 1:]
+
+        middle = normalized[:, 1:-1]
+        troughs = (middle <= normalized[:, :-2]) & (middle < normalized[:, 2:]) & (middle < threshold)
+        voiced = troughs.any(axis=1)
+        first = np.argmax(troughs, axis=1) + 1
+
+        rows = np.arange(len(block))
+        before, at, after = normalized[rows, first - 1], normalized[rows, first], normalized[rows, first + 1]
+        curvature = before - 2 * at + after
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(curvature > 0, 0.5 * (before - after) / curvature, 0.0)
+        period = tau_min + first + np.clip(shift, -1.0, 1.0)
+        f0[start:start + len(block)] = np.where(voiced, sample_rate / period, 0.0)
+    return f0
+
+
+@metrics.timed('f0')
+def f0_contour(
+    audio: np.ndarray,
+    sample_rate: int,
+    frame_length: int = 2048,
+    hop_length: int = 512,
+    fmin: float = DEFAULT_FMIN,
+    fmax: float = DEFAULT_FMAX,
+    threshold: float = YIN_THRESHOLD
+) -> np.ndarray:
+    """
+    One fundamental frequency per frame, 0 Hz where unvoiced.
+
+    Frames are laid out like the centred STFT's, so the contour has exactly
+    as many frames as the spectral features and can be paired with them.
+    YIN looks at half a frame around each frame's centre, plus the longest
+    period after it, so short frames still cover `fmin`.
+    """
+    window = frame_length // 2
+    _, tau_max = lag_range(sample_rate, window, fmin, fmax)
+    # Frame t's window starts half a window before sample t * hop_length, the
+    # centre of STFT frame t, and is followed by the longest period it is compared over
+    audio = np.asarray(audio)
+    n_frames = 1 + len(audio) // hop_length
+    span = window + tau_max + 1
+    padded = np.zeros((n_frames - 1) * hop_length + span, dtype=audio.dtype)
+    head = audio[:len(padded) - window // 2]
+    padded[window // 2:window // 2 + len(head)] = head
+    frames = librosa.util.frame(padded, frame_length=span, hop_length=hop_length)
+    return yin_frames(frames, sample_rate, window, fmin, fmax, threshold)
+
+
+def lag_range(sample_rate: int, window: int, fmin: float = DEFAULT_FMIN, fmax: float = DEFAULT_FMAX) -> Tuple[int, int]:
+    """Shortest and longest period YIN searches, in samples, for a `window`-sample window."""
+    return max(1, int(sample_rate // fmax)), min(window - 1, int(math.ceil(sample_rate / fmin)))
+
+
+def centred_window(frames: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    The part of STFT-sized frames YIN analyses, and its window length.
+
+    A half-frame window starting a quarter into each frame is centred on
+    the frame's centre, so the pitch at a frame lines up with its spectrum.
+    """
+    frame_length = frames.shape[0]
+    return frames[frame_length // 4:], frame_length // 2
+
+
+def voiced_semitones(reference: np.ndarray, compare: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two paired contours in semitones, kept only where both are voiced.
+
+    On a log scale a contour's shape doesn't depend on the speaker's
+    register, so a child following an adult's intonation still matches.
+    """
+    both = (reference > 0) & (compare > 0)
+    return 12 * np.log2(reference[both]), 12 * np.log2(compare[both])
@@ -0,0 +1,269 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from queue import Empty, Full, Queue
+from threading import Lock, Thread, local
+import logging
+import os
+import sqlite3
+import time
+
+from speech_analysis import DEFAULT_WEIGHTS
+
+# Scores stored per assessment, one column each
+METRICS = tuple(DEFAULT_WEIGHTS) + ('overall_assessment',)
+
+# sound_id under which daily aggregates over every prompt are kept
+ALL_SOUNDS = '*'
+
+DEFAULT_PATH = os.path.join('cache', 'progress.sqlite3')
+
+SECONDS_PER_DAY = 86400
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS assessments (
+        id INTEGER PRIMARY KEY,
+        patient_id TEXT NOT NULL,
+        session_id TEXT,
+        sound_id TEXT NOT NULL,
+        recorded_at REAL NOT NULL,
+        {', '.join(f'{metric} REAL' for metric in METRICS)}
+    )""",
+    "CREATE INDEX IF NOT EXISTS assessments_patient_sound_time ON assessments (patient_id, sound_id, recorded_at)",
+    "CREATE INDEX IF NOT EXISTS assessments_patient_time ON assessments (patient_id, recorded_at)",
+    # One row per patient, metric, prompt and UTC day, kept up to date on every insert
+    """CREATE TABLE IF NOT EXISTS daily_metrics (
+        patient_id TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        sound_id TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        minimum REAL NOT NULL,
+        maximum REAL NOT NULL,
+        PRIMARY KEY (patient_id, metric, sound_id, day)
+    ) WITHOUT ROWID"""
+]
+
+UPSERT_DAILY = """
+    INSERT INTO daily_metrics (patient_id, metric, sound_id, day, count, total, minimum, maximum)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (patient_id, metric, sound_id, day) DO UPDATE SET
+        count = count + excluded.count,
+        total = total + excluded.total,
+        minimum = min(minimum, excluded.minimum),
+        maximum = max(maximum, excluded.maximum)
+"""
+
+
+class ProgressStore:
+    """
+    Every assessment's scores, per patient, in an embedded SQLite database.
+
+    `record()` only queues the row: a writer thread inserts queued rows in
+    batches of up to `batch_size`, one transaction per batch, so scoring
+    requests never wait on the disk. If the queue is full the row is
+    dropped and counted rather than blocking the request.
+
+    Alongside the raw rows, each batch updates per-day count, sum, min and
+    max for every metric, per prompt and over all prompts. A trend over N
+    days therefore reads N rows from the primary key, however many
+    assessments the patient has.
+    """
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        max_pending: int = 10000
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Queue = Queue(maxsize=max_pending)
+        self._readers = local()
+        self._lock = Lock()
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+        connection.close()
+        self._writer = Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection; WAL lets reads run alongside the writer."""
+        connection = getattr(self._readers, 'connection', None)
+        if connection is None:
+            connection = self._readers.connection = self._connect()
+            connection.row_factory = sqlite3.Row
+        return connection
+
+    def record(
+        self,
+        patient_id: str,
+        session_id: Optional[str],
+        sound_id: str,
+        results: Dict,
+        recorded_at: Optional[float] = None
+    ) -> bool:
+        """Queue one assessment for writing; returns False if it had to be dropped."""
+        row = (patient_id or '', session_id, sound_id, recorded_at or time.time()) + tuple(
+            None if results.get(metric) is None else float(results[metric]) for metric in METRICS
+        )
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning(f"Progress store queue is full; dropped an assessment for {patient_id!r}")
+            return False
+
+    def flush(self):
+        """Wait until every queued assessment has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer."""
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        connection = self._connect()
+        running = True
+        while running:
+            row = self._queue.get()
+            if row is None:
+                self._queue.task_done()
+                break
+            batch = [row]
+            # Gather whatever else arrives shortly after, up to a full batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+                if row is None:
+                    self._queue.task_done()
+                    running = False
+                    break
+                batch.append(row)
+            try:
+                self._write(connection, batch)
+                with self._lock:
+                    self._written += len(batch)
+            except sqlite3.Error as e:
+                with self._lock:
+                    self._failed += len(batch)
+                logger.error(f"Could not write {len(batch)} assessments to {self.path}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    def _write(self, connection: sqlite3.Connection, batch: List[tuple]):
+        # Fold the batch into per-day aggregates first, so each day is upserted once
+        daily: Dict[tuple, list] = {}
+        for patient_id, _, sound_id, recorded_at, *scores in batch:
+            day = int(recorded_at // SECONDS_PER_DAY)
+            for metric, score in zip(METRICS, scores):
+                if score is None:
+                    continue
+                for sound in (sound_id, ALL_SOUNDS):
+                    aggregate = daily.get((patient_id, metric, sound, day))
+                    if aggregate is None:
+                        daily[(patient_id, metric, sound, day)] = [1, score, score, score]
+                    else:
+                        aggregate[0] += 1
+                        aggregate[1] += score
+                        aggregate[2] = min(aggregate[2], score)
+                        aggregate[3] = max(aggregate[3], score)
+        with connection:
+            connection.executemany(
+                f"INSERT INTO assessments (patient_id, session_id, sound_id, recorded_at, {', '.join(METRICS)}) "
+                f"VALUES ({', '.join('?' * (4 + len(METRICS)))})",
+                batch
+            )
+            connection.executemany(UPSERT_DAILY, [key + tuple(values) for key, values in daily.items()])
+
+    def history(
+        self,
+        patient_id: str,
+        sound_id: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100
+    ) -> List[Dict]:
+        """A patient's most recent assessments, newest first, optionally for one prompt."""
+        query = f"SELECT session_id, sound_id, recorded_at, {', '.join(METRICS)} FROM assessments WHERE patient_id = ?"
+        params: list = [patient_id]
+        if sound_id:
+            query += " AND sound_id = ?"
+            params.append(sound_id)
+        if since is not None:
+            query += " AND recorded_at >= ?"
+            params.append(since)
+        query += " ORDER BY recorded_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._reader().execute(query, params)]
+
+    def trend(
+        self,
+        patient_id: str,
+        metric: str,
+        days: int = 30,
+        sound_id: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> Dict:
+        """Daily count, mean, min and max of one metric over the last `days` days, plus the window's totals."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}")
+        today = int((now or time.time()) // SECONDS_PER_DAY)
+        rows = self._reader().execute(
+            "SELECT day, count, total, minimum, maximum FROM daily_metrics "
+            "WHERE patient_id = ? AND metric = ? AND sound_id = ? AND day > ? ORDER BY day",
+            (patient_id, metric, sound_id or ALL_SOUNDS, today - days)
+        ).fetchall()
+        count = sum(row['count'] for row in rows)
+        return {
+            'patient_id': patient_id,
+            'metric': metric,
+            'sound_id': sound_id,
+            'days': days,
+            'count': count,
+            'mean': sum(row['total'] for row in rows) / count if count else None,
+            'min': min((row['minimum'] for row in rows), default=None),
+            'max': max((row['maximum'] for row in rows), default=None),
+            'daily': [
+                {
+                    'date': datetime.fromtimestamp(row['day'] * SECONDS_PER_DAY, timezone.utc).strftime('%Y-%m-%d'),
+                    'count': row['count'],
+                    'mean': row['total'] / row['count'],
+                    'min': row['minimum'],
+                    'max': row['maximum']
+                }
+                for row in rows
+            ]
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'written': self._written,
+                'dropped': self._dropped,
+                'failed': self._failed
+            }
@@ -0,0 +1,121 @@
+from typing import Callable, Dict, Iterable, List, Optional
+from threading import Lock, Thread, get_ident
+import hashlib
+import logging
+import os
+import time
+
+from utils import TTS_RATE, TTS_VOLUME, log_timing
+
+DEFAULT_CACHE_DIR = os.path.join('cache', 'prompt_audio')
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_texts(exercise_manager, intents: Dict, extra: Iterable[str] = ()) -> List[str]:
+    """Every fixed sentence the assistant says: exercise instructions, intent responses and `extra`"""
+    texts = list(extra)
+    for exercise_type in exercise_manager.get_exercise_types():
+        for exercise in exercise_manager.get_exercises_for_type(exercise_type):
+            texts.append(exercise['instruction'])
+    for intent in intents['intents']:
+        texts.extend(intent.get('responses', []))
+    return list(dict.fromkeys(text for text in texts if text))
+
+
+class PromptAudioCache:
+    """
+    Pre-rendered speech for the assistant's fixed prompts.
+
+    Each prompt is synthesized once with `render(text, path)` and stored as
+    a WAV file named by a hash of the text and the voice settings, so the
+    browser can play it from a URL and no synthesis happens at request
+    time. Files already on disk are reused across restarts; changing a
+    prompt or the voice produces a new name rather than a stale recording.
+    """
+    def __init__(self, render: Callable[[str, str], object], cache_dir: str = DEFAULT_CACHE_DIR):
+        self.render = render
+        self.cache_dir = os.path.abspath(cache_dir)
+        self._ready = set()
+        self._lock = Lock()
+        self.rendered = 0
+        self.failed = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def name(text: str) -> str:
+        """File name of a prompt's audio."""
+        digest = hashlib.sha1(f"{TTS_RATE}|{TTS_VOLUME}|{text}".encode('utf-8')).hexdigest()[:16]
+        return f"{digest}.wav"
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def url(self, text: str) -> Optional[str]:
+        """URL of a prompt's audio, or None if it hasn't been rendered."""
+        name = self.name(text)
+        with self._lock:
+            ready = name in self._ready
+        return f"/prompt_audio/{name}" if ready else None
+
+    def prerender(self, texts: Iterable[str]) -> Dict:
+        """
+        Render every prompt not already on disk.
+
+        Stops early when no speech engine is installed. Returns counts of
+        prompts rendered, reused from disk and failed.
+        """
+        started = time.perf_counter()
+        counts = {'rendered': 0, 'cached': 0, 'failed': 0}
+        for text in texts:
+            name = self.name(text)
+            path = self.path(name)
+            if os.path.exists(path):
+                counts['cached'] += 1
+            else:
+                try:
+                    self._render(text, path)
+                    counts['rendered'] += 1
+                except ImportError as e:
+                    logger.info(f"No speech engine available; prompts will not be pre-rendered: {str(e)}")
+                    counts['failed'] += 1
+                    break
+                except Exception as e:
+                    logger.warning(f"Could not render prompt {name}: {str(e)}")
+                    counts['failed'] += 1
+                    continue
+            with self._lock:
+                self._ready.add(name)
+        with self._lock:
+            self.rendered += counts['rendered']
+            self.failed += counts['failed']
+        log_timing('prompt_prerender', time.perf_counter() - started, **counts)
+        return counts
+
+    def start_prerender(self, texts: Iterable[str]) -> Thread:
+        """Render prompts in a background thread so startup doesn't wait"""
+        thread = Thread(target=self.prerender, args=(list(texts),), daemon=True)
+        thread.start()
+        return thread
+
+    def _render(self, text: str, path: str):
+        # Render beside the final name and move it into place, so a
+        # half-written file is never served
+        tmp_path = f"{path[:-len('.wav')]}.{os.getpid()}-{get_ident()}.tmp.wav"
+        try:
+            self.render(text, tmp_path)
+            if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+                raise RuntimeError("speech engine produced no audio")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'ready': len(self._ready),
+                'rendered': self.rendered,
+                'failed': self.failed,
+                'cache_dir': self.cache_dir
+            }
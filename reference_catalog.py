@@ -0,0 +1,205 @@
+from typing import Dict, List, NamedTuple, Optional
+from threading import Event, Lock, Thread
+from datetime import datetime
+import logging
+import os
+
+REFERENCE_FOLDERS = ['speech_audio', 'sentence_audio', 'tongue_audio', 'articulation_audio']
+
+# Prompts the exercise pages expect to find, by folder
+EXPECTED_REFERENCE_AUDIO = {
+    'speech_audio': [
+        's_sun.mp3',
+        's_snake.mp3',
+        'r_red.mp3',
+        'th_think.mp3'
+    ],
+    'sentence_audio': [
+        'sentence1.mp3',
+        'sentence2.mp3'
+    ],
+    'tongue_audio': [
+        'peter_piper.mp3',
+        'seashells.mp3'
+    ],
+    'articulation_audio': [
+        'p_pat.mp3',
+        'b_ball.mp3',
+        's_sun.mp3',
+        's_snake.mp3',
+        'r_red.mp3',
+        'th_think.mp3'
+    ]
+}
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceEntry(NamedTuple):
+    sound_id: str
+    folder: str
+    filename: str
+    path: str
+    stat: os.stat_result
+
+    @property
+    def exercise_type(self) -> str:
+        """The exercise the prompt belongs to, from its folder: 'tongue_audio' is 'tongue'."""
+        return self.folder[:-len('_audio')] if self.folder.endswith('_audio') else self.folder
+
+
+class ReferenceCatalog:
+    """
+    In-memory index of the reference prompts under the static audio folders.
+
+    The folders are scanned once and then refreshed by polling: a folder is
+    re-listed only when its own mtime changes, and known files are re-stat'ed to
+    pick up in-place edits. Lookups read the index only and never touch the
+    filesystem. When a sound_id exists in several folders, the first folder in
+    REFERENCE_FOLDERS wins, matching the order analyze_speech has always used.
+    """
+    def __init__(
+        self,
+        static_dir: str = 'static',
+        folders: Optional[List[str]] = None,
+        expected: Optional[Dict[str, List[str]]] = None
+    ):
+        self.static_dir = static_dir
+        self.folders = folders or REFERENCE_FOLDERS
+        self.expected = expected if expected is not None else EXPECTED_REFERENCE_AUDIO
+        self._files: Dict[str, Dict[str, ReferenceEntry]] = {}
+        self._folder_mtimes: Dict[str, Optional[int]] = {}
+        self._index: Dict[str, ReferenceEntry] = {}
+        self._duplicates: Dict[str, List[str]] = {}
+        self._last_refresh: Optional[datetime] = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._poller: Optional[Thread] = None
+        self.refresh()
+
+    def lookup(self, sound_id: str) -> Optional[ReferenceEntry]:
+        """Return the reference entry for a sound_id without touching the filesystem."""
+        return self._index.get(sound_id)
+
+    def entries(self) -> List[ReferenceEntry]:
+        """All indexed reference entries, one per sound_id."""
+        return list(self._index.values())
+
+    def paths(self) -> Dict[str, str]:
+        """Map every indexed sound_id to its reference path."""
+        return {sound_id: entry.path for sound_id, entry in self._index.items()}
+
+    def refresh(self) -> bool:
+        """Pick up added, removed and edited prompts; returns True if anything changed."""
+        with self._lock:
+            changed = False
+            for folder in self.folders:
+                folder_path = os.path.join(self.static_dir, folder)
+                try:
+                    folder_mtime = os.stat(folder_path).st_mtime_ns
+                except OSError:
+                    folder_mtime = None
+
+                if folder not in self._folder_mtimes or folder_mtime != self._folder_mtimes[folder]:
+                    files = self._scan_folder(folder, folder_path) if folder_mtime is not None else {}
+                    self._folder_mtimes[folder] = folder_mtime
+                else:
+                    files = self._restat_folder(folder, folder_path)
+
+                if files != self._files.get(folder):
+                    self._files[folder] = files
+                    changed = True
+
+            if changed or self._last_refresh is None:
+                self._rebuild_index()
+            self._last_refresh = datetime.now()
+            return changed
+
+    def _scan_folder(self, folder: str, folder_path: str) -> Dict[str, ReferenceEntry]:
+        files = {}
+        try:
+            filenames = sorted(os.listdir(folder_path))
+        except OSError as e:
+            logger.warning(f"Could not list reference folder {folder_path}: {str(e)}")
+            return files
+        for filename in filenames:
+            sound_id, ext = os.path.splitext(filename)
+            if ext.lower() != '.mp3':
+                continue
+            path = os.path.join(folder_path, filename)
+            try:
+                files[filename] = ReferenceEntry(sound_id, folder, filename, path, os.stat(path))
+            except OSError:
+                continue
+        return files
+
+    def _restat_folder(self, folder: str, folder_path: str) -> Dict[str, ReferenceEntry]:
+        files = {}
+        for filename, entry in self._files.get(folder, {}).items():
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                continue
+            if stat.st_mtime_ns == entry.stat.st_mtime_ns and stat.st_size == entry.stat.st_size:
+                files[filename] = entry
+            else:
+                files[filename] = entry._replace(stat=stat)
+        return files
+
+    def _rebuild_index(self):
+        index: Dict[str, ReferenceEntry] = {}
+        locations: Dict[str, List[str]] = {}
+        for folder in self.folders:
+            for entry in self._files.get(folder, {}).values():
+                locations.setdefault(entry.sound_id, []).append(entry.path)
+                index.setdefault(entry.sound_id, entry)
+        self._index = index
+        self._duplicates = {sound_id: paths for sound_id, paths in locations.items() if len(paths) > 1}
+        logger.info(f"Reference catalog indexed {len(index)} prompts")
+
+    def start_polling(self, interval: float = 5.0):
+        """Refresh the index in a background thread every `interval` seconds."""
+        if self._poller is not None and self._poller.is_alive():
+            return
+        self._stop.clear()
+        self._poller = Thread(target=self._poll, args=(interval,), daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        self._stop.set()
+
+    def _poll(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing reference catalog: {str(e)}")
+
+    def verify(self) -> List[Dict]:
+        """Check the expected prompts against the index."""
+        results = []
+        for folder, files in self.expected.items():
+            present = self._files.get(folder, {})
+            for file in files:
+                results.append({
+                    'folder': folder,
+                    'file': file,
+                    'exists': file in present,
+                    'path': os.path.join(self.static_dir, folder, file)
+                })
+        return results
+
+    def missing(self) -> List[str]:
+        return [f"{result['folder']}/{result['file']}" for result in self.verify() if not result['exists']]
+
+    def health(self) -> Dict:
+        """JSON-serializable summary of the index."""
+        missing = self.missing()
+        return {
+            'status': 'ok' if not missing else 'degraded',
+            'sound_ids': len(self._index),
+            'folders': {folder: len(self._files.get(folder, {})) for folder in self.folders},
+            'duplicates': self._duplicates,
+            'missing': missing,
+            'last_refresh': self._last_refresh.isoformat() if self._last_refresh else None
+        }
@@ -0,0 +1,146 @@
+from typing import Optional, Tuple
+from collections import OrderedDict
+from threading import Lock, get_ident
+import argparse
+import hashlib
+import logging
+import os
+import numpy as np
+
+from speech_analysis import (
+    SpeechAnalysis, SpeechFeatures, AudioLoadError, FEATURE_NAMES, FEATURE_VERSION, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH
+)
+from reference_catalog import ReferenceCatalog
+
+DEFAULT_CACHE_DIR = os.path.join('cache', 'reference_features')
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceFeatureStore:
+    """
+    Precomputed features for the static reference prompts.
+
+    Entries are keyed by sound_id, the reference file's mtime and size, the
+    analysis parameters and FEATURE_VERSION, so an edited prompt, a different
+    sample rate or changed feature code never reuses stale features. Features
+    are persisted as compressed .npz files and held in a bounded in-memory LRU.
+    A prompt that fails to decode raises AudioLoadError and is never cached.
+    """
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        sample_rate: int = 16000,
+        sample_duration: float = 5.0,
+        max_entries: int = 32,
+        n_fft: int = DEFAULT_N_FFT,
+        hop_length: int = DEFAULT_HOP_LENGTH
+    ):
+        self.cache_dir = cache_dir
+        self.sample_rate = sample_rate
+        self.sample_duration = sample_duration
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, SpeechFeatures]" = OrderedDict()
+        self._lock = Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, sound_id: str, path: str, stat: Optional[os.stat_result] = None) -> Tuple:
+        """Cache key for a reference file at its current version."""
+        stat = stat or os.stat(path)
+        return (
+            sound_id, stat.st_mtime_ns, stat.st_size,
+            self.sample_rate, self.sample_duration, self.n_fft, self.hop_length, FEATURE_VERSION
+        )
+
+    def _npz_path(self, key: Tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key[0]}-{digest}.npz")
+
+    def get(self, sound_id: str, path: str, stat: Optional[os.stat_result] = None) -> SpeechFeatures:
+        """Return reference features, loading or computing them on a miss."""
+        key = self.key(sound_id, path, stat)
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                return features
+
+        features = self._load(key)
+        if features is None:
+            features = self._compute(key, path)
+        self._remember(key, features)
+        return features
+
+    def build(self, catalog: ReferenceCatalog) -> int:
+        """Precompute features for every decodable prompt in the catalog; returns the count."""
+        built = 0
+        for entry in catalog.entries():
+            try:
+                self.get(entry.sound_id, entry.path, entry.stat)
+                built += 1
+            except AudioLoadError as e:
+                logger.error(f"Skipping reference prompt {entry.sound_id}: {str(e)}")
+        logger.info(f"Reference feature store ready with {built} prompts")
+        return built
+
+    def _remember(self, key: Tuple, features: SpeechFeatures):
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: Tuple) -> Optional[SpeechFeatures]:
+        npz_path = self._npz_path(key)
+        if not os.path.exists(npz_path):
+            return None
+        try:
+            with np.load(npz_path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in FEATURE_NAMES}
+            return SpeechFeatures.from_arrays(arrays, self.sample_rate, self.n_fft, self.hop_length)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable reference features {npz_path}: {str(e)}")
+            return None
+
+    def _compute(self, key: Tuple, path: str) -> SpeechFeatures:
+        analyzer = SpeechAnalysis(
+            reference_path=path,
+            compare_path=path,
+            sample_rate=self.sample_rate,
+            sample_duration=self.sample_duration,
+            verbose=False
+        )
+        # A strict load keeps a failed decode from being cached as silence
+        audio = analyzer.load_and_preprocess(path, strict=True)
+        arrays = SpeechFeatures(audio, self.sample_rate, self.n_fft, self.hop_length).to_arrays()
+        npz_path = self._npz_path(key)
+        tmp_path = f"{npz_path}.{os.getpid()}-{get_ident()}.tmp.npz"
+        try:
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, npz_path)
+        except OSError as e:
+            logger.warning(f"Could not persist reference features for {key[0]}: {str(e)}")
+        return SpeechFeatures.from_arrays(arrays, self.sample_rate, self.n_fft, self.hop_length)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute reference features for the exercise prompts")
+    parser.add_argument('--static-dir', default='static')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    parser.add_argument('--sample-duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = ReferenceFeatureStore(
+        cache_dir=args.cache_dir,
+        sample_rate=args.sample_rate,
+        sample_duration=args.sample_duration
+    )
+    store.build(ReferenceCatalog(args.static_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+
+from analysis_executor import AnalysisJob, _init_worker, assess
+from analysis_profiles import PROFILES, get_profile
+from audio_ingest import LONG_RECORDING_POLICIES, RESAMPLE_TYPES, RecordingTooLong
+from instrumentation import metrics
+from progress_store import METRICS
+from reference_catalog import ReferenceCatalog
+from reference_store import DEFAULT_CACHE_DIR
+from speech_analysis import AudioLoadError
+from upload_store import stored_word
+
+# Recordings picked up when walking a directory
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3', '.webm', '.m4a')
+
+# Output columns, in order
+COLUMNS = ('take', 'sound_id', 'status', 'message') + METRICS + ('voiced_seconds', 'analysis_profile', 'seconds')
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+logger = logging.getLogger(__name__)
+
+
+class Take(NamedTuple):
+    # Stable id of the take in the output and the checkpoint: its path relative to the source
+    take: str
+    path: str
+    sound_id: Optional[str]
+
+
+def find_takes(source: str) -> Iterator[Take]:
+    """
+    Takes under a directory, or listed in a .csv or .jsonl manifest.
+
+    In a directory the prompt is read from each file's name, as the upload
+    store saved it. A manifest has a `path` per take, relative to the
+    manifest, and optionally its `sound_id` and a `take` id.
+    """
+    if os.path.isdir(source):
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.startswith('.') or not filename.lower().endswith(AUDIO_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, filename)
+                yield Take(os.path.relpath(path, source), path, stored_word(filename))
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline='') as file:
+        if source.endswith('.csv'):
+            rows: Iterable[Dict] = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for row in rows:
+            path = os.path.join(base, row['path'])
+            yield Take(
+                row.get('take') or row['path'],
+                path,
+                row.get('sound_id') or stored_word(os.path.basename(path))
+            )
+
+
+class Checkpoint:
+    """
+    Ids of the takes whose rows are already in the output, one per line.
+
+    Ids are appended only after their rows were flushed to the output, so
+    every id listed is safely written. A line cut short by a crash is ignored.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as file:
+                self.done = {line[:-1] for line in file if line.endswith('\n')}
+        self._file = open(path, 'a')
+
+    def add(self, takes: List[str]):
+        self._file.writelines(f"{take}\n" for take in takes)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class RowWriter:
+    """Appends rows to a CSV or JSONL file, which survives being reopened to resume a run."""
+    def __init__(self, path: str, output_format: str):
+        self.output_format = output_format
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='')
+        if output_format == 'csv':
+            self._csv = csv.DictWriter(self._file, COLUMNS, extrasaction='ignore')
+            if new:
+                self._csv.writeheader()
+
+    def write(self, rows: List[Dict]):
+        if self.output_format == 'csv':
+            self._csv.writerows(rows)
+        else:
+            self._file.writelines(json.dumps({column: row.get(column) for column in COLUMNS}) + '\n' for row in rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetPartWriter:
+    """Writes each batch of rows as one more part file of a Parquet dataset directory."""
+    def __init__(self, path: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("Parquet output needs pyarrow; install it or use --format csv/jsonl") from e
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._parts = sum(1 for name in os.listdir(path) if name.endswith('.parquet'))
+
+    def write(self, rows: List[Dict]):
+        table = self._pa.Table.from_pylist([{column: row.get(column) for column in COLUMNS} for row in rows])
+        part_path = os.path.join(self.path, f"part-{self._parts:05d}.parquet")
+        # Moved into place once complete, so a reader never sees half a part
+        self._pq.write_table(table, f"{part_path}.tmp")
+        os.replace(f"{part_path}.tmp", part_path)
+        self._parts += 1
+
+    def close(self):
+        pass
+
+
+def open_writer(path: str, output_format: str):
+    if output_format == 'parquet':
+        return ParquetPartWriter(path)
+    return RowWriter(path, output_format)
+
+
+def rescore_take(task: Tuple[Take, Optional[AnalysisJob]]) -> Dict:
+    """Score one take in a worker, turning a rejected or failed take into its row."""
+    take, job = task
+    started = time.perf_counter()
+    row = {'take': take.take, 'sound_id': take.sound_id}
+    if job is None:
+        row.update(status='unmatched', message='No reference prompt for this take')
+        return row
+    try:
+        with open(take.path, 'rb') as file:
+            # Decoded from memory exactly as an upload to /analyze_speech is
+            assessment = assess(job._replace(recording=file.read()))
+    except (RecordingTooLong, AudioLoadError) as e:
+        row.update(status='rejected', message=str(e))
+    except Exception as e:
+        logger.error(f"Could not score {take.path}: {str(e)}")
+        row.update(status='error', message=str(e))
+    else:
+        row.update(
+            assessment['results'],
+            status='ok',
+            voiced_seconds=assessment['voiced_seconds'],
+            analysis_profile=assessment['analysis_profile']
+        )
+    row['seconds'] = time.perf_counter() - started
+    # Nothing collects stage timings in a batch run; don't let them pile up
+    metrics.drain()
+    return row
+
+
+def rescore(
+    takes: Iterable[Take],
+    writer,
+    checkpoint: Checkpoint,
+    catalog: ReferenceCatalog,
+    workers: int = 0,
+    profile: Optional[str] = None,
+    initargs: Tuple = (DEFAULT_CACHE_DIR, 16000, 5.0),
+    commit_every: int = 100,
+    log_every: float = 10.0
+) -> Dict:
+    """
+    Score every take not already in the checkpoint and write a row for each.
+
+    Takes are spread over `workers` processes, each of which loads the
+    analysis stack and its reference features once; 0 scores in this
+    process. Rows arrive in completion order and are written and
+    checkpointed every `commit_every` rows, and on the way out if the run
+    is interrupted, so a rerun picks up where this one stopped. A crash
+    between writing rows and checkpointing them scores those takes again,
+    so their rows can appear twice.
+    """
+    analysis_profile = get_profile(profile) if profile else None
+    counts = {'ok': 0, 'rejected': 0, 'error': 0, 'unmatched': 0, 'resumed': 0}
+
+    def tasks() -> Iterator[Tuple[Take, Optional[AnalysisJob]]]:
+        for take in takes:
+            if take.take in checkpoint.done:
+                counts['resumed'] += 1
+                continue
+            reference = catalog.lookup(take.sound_id) if take.sound_id else None
+            job = None if reference is None else AnalysisJob(
+                reference.sound_id, reference.path, reference.stat, b'', analysis_profile
+            )
+            yield take, job
+
+    pending: List[Dict] = []
+
+    def commit():
+        if pending:
+            writer.write(pending)
+            checkpoint.add([row['take'] for row in pending])
+            pending.clear()
+
+    started = time.perf_counter()
+    last_log = started
+    scored = 0
+    pool = None
+    try:
+        if workers > 0:
+            pool = multiprocessing.get_context('spawn').Pool(workers, initializer=_init_worker, initargs=initargs)
+            rows = pool.imap_unordered(rescore_take, tasks(), chunksize=4)
+        else:
+            _init_worker(*initargs)
+            rows = map(rescore_take, tasks())
+        for row in rows:
+            pending.append(row)
+            counts[row['status']] += 1
+            scored += 1
+            if len(pending) >= commit_every:
+                commit()
+            now = time.perf_counter()
+            if now - last_log >= log_every:
+                logger.info(f"Rescored {scored} takes, {scored / (now - started):.1f} files/s")
+                last_log = now
+    finally:
+        commit()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    elapsed = time.perf_counter() - started
+    return dict(counts, takes=scored, seconds=elapsed, files_per_s=scored / elapsed if elapsed > 0 else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore stored takes against their reference prompts")
+    parser.add_argument('source', help="Directory of takes, e.g. static/uploads, or a .csv/.jsonl manifest")
+    parser.add_argument('output', help="Output file; a directory of part files for Parquet")
+    parser.add_argument('--format', choices=FORMATS, help="Output format; guessed from the output's extension")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes; 0 runs in-process")
+    parser.add_argument('--profile', choices=list(PROFILES), help="Analysis profile; the worker defaults when omitted")
+    parser.add_argument('--resample', choices=list(RESAMPLE_TYPES), default='high')
+    parser.add_argument('--long-recordings', choices=LONG_RECORDING_POLICIES, default='truncate')
+    parser.add_argument('--static-dir', default='static')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--checkpoint', help="Checkpoint file; defaults to <output>.checkpoint")
+    parser.add_argument('--restart', action='store_true', help="Discard earlier output and checkpoint and start over")
+    parser.add_argument('--commit-every', type=int, default=100, help="Rows written per checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    output_format = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if output_format not in FORMATS:
+        parser.error(f"Cannot tell the output format of {args.output}; pass --format")
+    checkpoint_path = args.checkpoint or f"{args.output.rstrip(os.sep)}.checkpoint"
+    if args.restart:
+        for path in (args.output, checkpoint_path):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.unlink(path)
+
+    # Each worker process runs single-threaded; parallelism comes from the processes
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(variable, '1')
+
+    checkpoint = Checkpoint(checkpoint_path)
+    if checkpoint.done:
+        logger.info(f"Resuming: {len(checkpoint.done)} takes already scored")
+    writer = open_writer(args.output, output_format)
+    try:
+        stats = rescore(
+            find_takes(args.source),
+            writer,
+            checkpoint,
+            ReferenceCatalog(args.static_dir),
+            workers=args.workers,
+            profile=args.profile,
+            initargs=(args.cache_dir, 16000, 5.0, args.resample, args.long_recordings),
+            commit_every=args.commit_every
+        )
+    finally:
+        writer.close()
+        checkpoint.close()
+
+    print(
+        f"Rescored {stats['takes']} takes in {stats['seconds']:.1f}s ({stats['files_per_s']:.1f} files/s): "
+        f"{stats['ok']} scored, {stats['rejected']} rejected, {stats['error']} failed, "
+        f"{stats['unmatched']} without a reference, {stats['resumed']} already done"
+    )
+
+
+if __name__ == '__main__':
+    main()
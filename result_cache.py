@@ -0,0 +1,121 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+from threading import Lock, get_ident
+import hashlib
+import json
+import logging
+import os
+import time
+
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisResultCache:
+    """
+    Assessments of recordings that were already scored, keyed by content.
+
+    The key hashes the uploaded bytes, the sound_id, the reference file's
+    mtime and size and the analysis parameters, so resubmitting the same
+    take against the same prompt returns the stored assessment, while an
+    edited prompt or changed parameters never do. Entries live in a bounded
+    in-memory LRU and expire after `ttl` seconds. With `cache_dir` set they
+    are also written there as JSON, so they survive restarts and are shared
+    by every process using the directory.
+    """
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(data: bytes, sound_id: str, reference_stat: os.stat_result, params: Dict) -> str:
+        """Content address of one submission."""
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(data).digest())
+        digest.update(json.dumps(
+            [sound_id, reference_stat.st_mtime_ns, reference_stat.st_size, params], sort_keys=True
+        ).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """The stored assessment for `key`, or None; counts a hit or a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.cache_dir:
+            entry = self._load(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        metrics.increment('speech_result_cache_total', result='miss' if entry is None else 'hit')
+        return None if entry is None else entry[1]
+
+    def put(self, key: str, assessment: Dict):
+        """Store a successful assessment."""
+        entry = (time.time(), assessment)
+        self._remember(key, entry)
+        if self.cache_dir:
+            self._save(key, entry)
+
+    def _remember(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load(self, key: str, now: float) -> Optional[tuple]:
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                os.unlink(path)
+                return None
+            with open(path) as file:
+                return os.path.getmtime(path), json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cached analysis {path}: {str(e)}")
+            return None
+
+    def _save(self, key: str, entry: tuple):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}-{get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as file:
+                json.dump(entry[1], file)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not persist cached analysis {key}: {str(e)}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'disk': bool(self.cache_dir),
+                'hits': self._hits,
+                'misses': self._misses
+            }
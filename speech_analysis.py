@@ -1,8 +1,285 @@
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List, Sequence, Tuple, Union
+from functools import cached_property
+from threading import local
 import numpy as np
 import librosa
 from pathlib import Path
 import logging
+import math
+
+from instrumentation import metrics
+from audio_ingest import SILENCE_PEAK, decode_bytes
+from alignment import banded_dtw
+from pitch import f0_contour, voiced_semitones
+
+
+FEATURE_NAMES = ('pitch', 'contrast', 'onset', 'rms', 'mfcc')
+
+# A recording given as a file path, its encoded bytes or decoded samples at the analysis rate
+AudioSource = Union[str, Path, bytes, np.ndarray]
+
+# Bump whenever feature extraction changes so persisted features are recomputed
+FEATURE_VERSION = 4
+DEFAULT_N_FFT = 2048
+DEFAULT_HOP_LENGTH = 512
+# Sakoe-Chiba band radius, in seconds, for aligning patient frames to the reference
+DEFAULT_DTW_BAND = 0.5
+# Frames more than this many dB below the loudest frame count as silence
+VAD_TOP_DB = 40.0
+# Less voiced audio than this is treated as no speech at all (a click, a bump)
+MIN_VOICED_SECONDS = 0.1
+
+# Weight of each metric in the overall assessment
+DEFAULT_WEIGHTS = {
+    'pitch_stability': 0.25,
+    'articulation_clarity': 0.25,
+    'rhythm_timing': 0.2,
+    'volume_consistency': 0.15,
+    'phonation_quality': 0.15
+}
+
+# Largest difference between a metric scored by CorrelationKernel and the
+# same metric from np.corrcoef over float64 copies of the features
+SCORE_TOLERANCE = 1e-4
+
+# Fewer frames voiced in both signals than this leave no contour to compare
+MIN_PITCH_FRAMES = 3
+
+# Feature each metric correlates between the reference and the patient signal
+METRIC_FEATURES = {
+    'pitch_stability': 'pitch',
+    'articulation_clarity': 'contrast',
+    'rhythm_timing': 'onset',
+    'volume_consistency': 'rms',
+    'phonation_quality': 'mfcc'
+}
+
+
+def _source_name(source: AudioSource) -> str:
+    if isinstance(source, np.ndarray):
+        return f"<{len(source)} samples>"
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes>"
+    return str(source)
+
+
+def _count_nan(metric: str, score: float):
+    if np.isnan(score):
+        metrics.increment('speech_nan_fallbacks_total', metric=metric)
+
+
+class AudioLoadError(Exception):
+    """Raised by a strict load when audio cannot be decoded or is empty."""
+
+
+class SilentRecording(AudioLoadError):
+    """Raised by a strict load when a recording contains no speech."""
+
+
+def voiced_region(
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    top_db: float = VAD_TOP_DB,
+    frame_length: int = DEFAULT_N_FFT,
+    hop_length: int = DEFAULT_HOP_LENGTH
+) -> Optional[Tuple[int, int, float]]:
+    """
+    Energy-based voice activity detection.
+
+    Frames whose RMS is within `top_db` of the loudest frame are voiced.
+    Returns the first and last voiced sample (end exclusive) and the voiced
+    duration in seconds, or None when the signal holds no speech: it is
+    empty, below SILENCE_PEAK, or voiced for less than MIN_VOICED_SECONDS.
+    """
+    if len(audio) == 0 or np.max(np.abs(audio)) < SILENCE_PEAK:
+        return None
+    intervals = librosa.effects.split(audio, top_db=top_db, frame_length=frame_length, hop_length=hop_length)
+    voiced = float(np.sum(intervals[:, 1] - intervals[:, 0])) / sample_rate if len(intervals) else 0.0
+    if voiced < MIN_VOICED_SECONDS:
+        return None
+    return int(intervals[0, 0]), int(intervals[-1, 1]), voiced
+
+
+def batch_correlation(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of each row of `x` with the same row of `y`.
+
+    Equivalent to calling np.corrcoef(x[i], y[i])[0, 1] for every row, but
+    computed for the whole (N, D) stack at once. Rows with zero variance give NaN.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    numerator = np.einsum('ij,ij->i', x, y)
+    denominator = np.sqrt(np.einsum('ij,ij->i', x, x) * np.einsum('ij,ij->i', y, y))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.clip(numerator / denominator, -1.0, 1.0)
+
+
+class CorrelationKernel:
+    """
+    Pearson correlation of two features with their frames paired, in reused float32 scratch.
+
+    Both features are gathered straight into scratch buffers, along the DTW
+    path or over their common length, then centred in place and reduced
+    with three dot products. The buffers grow to the largest feature seen
+    and are reused by every later call, so scoring allocates nothing in
+    proportion to the features. Means are accumulated in float64, which
+    keeps scores within SCORE_TOLERANCE of np.corrcoef in float64.
+
+    A kernel must not be shared between threads; use correlation_kernel().
+    """
+    def __init__(self):
+        self._ref = np.empty(0, dtype=np.float32)
+        self._comp = np.empty(0, dtype=np.float32)
+
+    def _scratch(self, shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        size = math.prod(shape)
+        if size > self._ref.size:
+            self._ref = np.empty(size, dtype=np.float32)
+            self._comp = np.empty(size, dtype=np.float32)
+        return self._ref[:size].reshape(shape), self._comp[:size].reshape(shape)
+
+    def correlate(
+        self,
+        ref: np.ndarray,
+        comp: np.ndarray,
+        ref_frames: Optional[np.ndarray] = None,
+        comp_frames: Optional[np.ndarray] = None
+    ) -> float:
+        """
+        Correlation of `ref` and `comp` over their last axis, NaN if either is constant.
+
+        Frames are paired by the index arrays when given, with indices past
+        the end clipped to the last frame, or else truncated to the shorter feature.
+        """
+        if ref_frames is None:
+            length = min(ref.shape[-1], comp.shape[-1])
+            ref_scratch, comp_scratch = self._scratch(ref.shape[:-1] + (length,))
+            np.copyto(ref_scratch, ref[..., :length], casting='same_kind')
+            np.copyto(comp_scratch, comp[..., :length], casting='same_kind')
+        else:
+            ref_scratch, comp_scratch = self._scratch(ref.shape[:-1] + (len(ref_frames),))
+            np.take(np.asarray(ref, dtype=np.float32), ref_frames, axis=-1, out=ref_scratch, mode='clip')
+            np.take(np.asarray(comp, dtype=np.float32), comp_frames, axis=-1, out=comp_scratch, mode='clip')
+        return self._pearson(ref_scratch.reshape(-1), comp_scratch.reshape(-1))
+
+    @staticmethod
+    def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+        # Centred in place, so the dot products don't lose precision to a large mean
+        x -= float(x.sum(dtype=np.float64)) / x.size
+        y -= float(y.sum(dtype=np.float64)) / y.size
+        denominator = math.sqrt(float(np.dot(x, x)) * float(np.dot(y, y)))
+        if denominator == 0.0 or not math.isfinite(denominator):
+            return math.nan
+        return max(-1.0, min(1.0, float(np.dot(x, y)) / denominator))
+
+
+_kernels = local()
+
+
+def correlation_kernel() -> CorrelationKernel:
+    """This thread's correlation kernel, created on first use."""
+    kernel = getattr(_kernels, 'kernel', None)
+    if kernel is None:
+        kernel = _kernels.kernel = CorrelationKernel()
+    return kernel
+
+
+class SpeechFeatures:
+    """
+    Feature set for one preprocessed signal.
+
+    The STFT is computed once and the magnitude, power and log-mel spectrograms
+    derived from it are shared by every feature that needs them. Each feature is
+    evaluated lazily, so callers only pay for what they use. The parameters match
+    the librosa defaults the metric methods have always used, so the values are
+    identical to calling the librosa feature functions on the signal directly.
+    """
+    def __init__(
+        self,
+        audio: np.ndarray,
+        sample_rate: int = 16000,
+        n_fft: int = DEFAULT_N_FFT,
+        hop_length: int = DEFAULT_HOP_LENGTH,
+        voiced_seconds: Optional[float] = None
+    ):
+        # Features are computed and kept in float32, which librosa preserves
+        self.audio = None if audio is None else np.asarray(audio, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        # Speech found by voice activity detection, when the signal went through it
+        self.voiced_seconds = voiced_seconds
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        sample_rate: int = 16000,
+        n_fft: int = DEFAULT_N_FFT,
+        hop_length: int = DEFAULT_HOP_LENGTH
+    ) -> "SpeechFeatures":
+        """Rebuild a feature set from precomputed feature matrices."""
+        features = cls(None, sample_rate, n_fft, hop_length)
+        for name in FEATURE_NAMES:
+            if name in arrays:
+                features.__dict__[name] = np.asarray(arrays[name], dtype=np.float32)
+        return features
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Compute every feature used for scoring and return them by name."""
+        return {name: getattr(self, name) for name in FEATURE_NAMES}
+
+    @cached_property
+    @metrics.timed('stft')
+    def magnitude(self) -> np.ndarray:
+        """Magnitude spectrogram shared by all spectral features."""
+        return np.abs(librosa.stft(self.audio, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    @cached_property
+    @metrics.timed('log_mel')
+    def log_mel(self) -> np.ndarray:
+        """Log-power mel spectrogram shared by onset strength and MFCCs."""
+        mel = librosa.feature.melspectrogram(S=self.magnitude ** 2, sr=self.sample_rate, n_fft=self.n_fft)
+        return librosa.power_to_db(mel)
+
+    @cached_property
+    def pitch(self) -> np.ndarray:
+        """Fundamental frequency contour, one value per STFT frame and 0 Hz where unvoiced."""
+        return f0_contour(self.audio, self.sample_rate, self.n_fft, self.hop_length)
+
+    @property
+    def voicing(self) -> np.ndarray:
+        """Which frames of the pitch contour are voiced."""
+        return self.pitch > 0
+
+    @cached_property
+    @metrics.timed('spectral_contrast')
+    def contrast(self) -> np.ndarray:
+        # librosa returns contrast in float64 whatever its input
+        contrast = librosa.feature.spectral_contrast(S=self.magnitude, sr=self.sample_rate, n_fft=self.n_fft)
+        return contrast.astype(np.float32)
+
+    @cached_property
+    @metrics.timed('onset_strength')
+    def onset(self) -> np.ndarray:
+        return librosa.onset.onset_strength(
+            S=self.log_mel, sr=self.sample_rate, n_fft=self.n_fft, hop_length=self.hop_length
+        )
+
+    @cached_property
+    @metrics.timed('rms')
+    def rms(self) -> np.ndarray:
+        # RMS is framed in the time domain; deriving it from the STFT would change its values
+        return librosa.feature.rms(y=self.audio, frame_length=self.n_fft, hop_length=self.hop_length)
+
+    @cached_property
+    @metrics.timed('mfcc')
+    def mfcc(self) -> np.ndarray:
+        return librosa.feature.mfcc(S=self.log_mel, sr=self.sample_rate)
+
 
 class SpeechAnalysis:
     """
@@ -11,78 +288,205 @@ class SpeechAnalysis:
     """
     def __init__(
         self,
-        reference_path: str,
-        compare_path: str,
+        reference_path: AudioSource,
+        compare_path: Optional[AudioSource],
         sample_rate: int = 16000,
         weights: Optional[Dict[str, float]] = None,
         verbose: bool = True,
-        sample_duration: float = 5.0
+        sample_duration: float = 5.0,
+        reference_features: Optional[SpeechFeatures] = None,
+        compare_features: Optional[SpeechFeatures] = None,
+        align: bool = True,
+        dtw_band: float = DEFAULT_DTW_BAND,
+        trim: bool = True,
+        strict: bool = False,
+        n_fft: int = DEFAULT_N_FFT,
+        hop_length: int = DEFAULT_HOP_LENGTH,
+        metrics: Optional[Sequence[str]] = None
     ):
-        self.reference_path = Path(reference_path)
-        self.compare_path = Path(compare_path)
+        self.reference_path = Path(reference_path) if isinstance(reference_path, str) else reference_path
+        self.compare_path = Path(compare_path) if isinstance(compare_path, str) else compare_path
         self.sample_rate = sample_rate
         self.verbose = verbose
         self.sample_duration = sample_duration
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        # Metrics scored by clinical_speech_assessment, in METRIC_FEATURES order
+        self.metrics = [metric for metric in METRIC_FEATURES if metrics is None or metric in metrics]
+        if metrics is not None and len(self.metrics) != len(metrics):
+            raise ValueError(f"Unknown metrics: {', '.join(sorted(set(metrics) - set(METRIC_FEATURES)))}")
         
-        self.weights = weights or {
-            'pitch_stability': 0.25,
-            'articulation_clarity': 0.25,
-            'rhythm_timing': 0.2,
-            'volume_consistency': 0.15,
-            'phonation_quality': 0.15
-        }
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        if weights is None and metrics is not None:
+            # The overall assessment is spread over the metrics actually scored
+            total = sum(DEFAULT_WEIGHTS[metric] for metric in self.metrics)
+            self.weights = {metric: DEFAULT_WEIGHTS[metric] / total for metric in self.metrics}
         
         self.logger = self._setup_logger()
+        self._reference_features = reference_features
+        self._compare_features = compare_features
+        self.align = align
+        self.dtw_band = dtw_band
+        self.trim = trim
+        # Raise AudioLoadError instead of scoring silence for an unusable recording
+        self.strict = strict
+        self._alignment: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def reference_features(self) -> SpeechFeatures:
+        """Features of the reference signal, decoded once per analysis unless supplied."""
+        if self._reference_features is None:
+            self._reference_features = self._load_features(self.reference_path)
+        return self._reference_features
+
+    @property
+    def compare_features(self) -> SpeechFeatures:
+        """Features of the patient signal, decoded once per analysis unless supplied."""
+        if self._compare_features is None:
+            self._compare_features = self._load_features(self.compare_path)
+        return self._compare_features
+
+    def _load_features(self, source: AudioSource) -> SpeechFeatures:
+        audio, voiced_seconds = self._load(source, self.strict)
+        return SpeechFeatures(audio, self.sample_rate, self.n_fft, self.hop_length, voiced_seconds=voiced_seconds)
+
+    @property
+    def alignment(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reference and patient frame indices paired by DTW over their MFCCs.
+
+        Computed once and shared by every metric, so a patient who starts
+        late or speaks more slowly is compared against the matching part of
+        the reference rather than frame by frame from the start.
+        """
+        if self._alignment is None:
+            ref = self.reference_features
+            comp = self.compare_features
+            radius = math.ceil(self.dtw_band * ref.sample_rate / ref.hop_length)
+            self._alignment = banded_dtw(ref.mfcc, comp.mfcc, radius)
+        return self._alignment
+
+    def _paired(self, feature: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A feature of both signals with their frames paired up.
+
+        Frames are paired along the DTW alignment, or with align=False by
+        truncating both signals to the shorter one.
+        """
+        ref = getattr(self.reference_features, feature)
+        comp = getattr(self.compare_features, feature)
+        if not self.align:
+            min_length = min(ref.shape[-1], comp.shape[-1])
+            return ref[..., :min_length], comp[..., :min_length]
+        ref_frames, comp_frames = self.alignment
+        return (
+            ref[..., np.minimum(ref_frames, ref.shape[-1] - 1)],
+            comp[..., np.minimum(comp_frames, comp.shape[-1] - 1)]
+        )
+
+    def _correlation(self, feature: str) -> float:
+        """Correlation of a feature between both signals, frames paired as by _paired(), without copying it."""
+        ref = getattr(self.reference_features, feature)
+        comp = getattr(self.compare_features, feature)
+        if not self.align:
+            return correlation_kernel().correlate(ref, comp)
+        return correlation_kernel().correlate(ref, comp, *self.alignment)
         
     def _setup_logger(self):
         """Configure logging for the analysis process."""
         logging.basicConfig(level=logging.INFO if self.verbose else logging.WARNING)
         return logging.getLogger("SpeechAnalysis")
 
-    def load_and_preprocess(self, audio_path: Path) -> np.ndarray:
-        """Load and preprocess audio file with speech-specific filtering."""
+    @metrics.timed('load_and_preprocess')
+    def load_and_preprocess(self, audio_path: AudioSource, strict: bool = False) -> np.ndarray:
+        """
+        Load and preprocess audio file with speech-specific filtering.
+
+        `audio_path` may also be the file's bytes, decoded in memory, or an
+        array of samples already at `sample_rate`. Leading and trailing
+        silence is cropped unless trimming is off. Unreadable, empty or
+        silent files fall back to silence, unless `strict` is set, in which
+        case AudioLoadError (SilentRecording for silence) is raised instead.
+        """
+        return self._load(audio_path, strict)[0]
+
+    def _load(self, audio_path: AudioSource, strict: bool) -> Tuple[np.ndarray, Optional[float]]:
+        """Decoded, trimmed and preprocessed samples, and the voiced duration when trimming."""
+        name = _source_name(audio_path)
         try:
             # Load audio file with proper error handling
             try:
-                audio, sr = librosa.load(str(audio_path), sr=self.sample_rate, duration=self.sample_duration)
+                if isinstance(audio_path, np.ndarray):
+                    audio = np.asarray(audio_path, dtype=np.float32)[:int(self.sample_rate * self.sample_duration)]
+                elif isinstance(audio_path, (bytes, bytearray, memoryview)):
+                    audio = decode_bytes(audio_path, self.sample_rate, self.sample_duration)
+                else:
+                    audio, sr = librosa.load(str(audio_path), sr=self.sample_rate, duration=self.sample_duration)
             except Exception as e:
-                self.logger.error(f"Error loading audio file {audio_path}: {str(e)}")
-                return np.zeros(int(self.sample_rate * self.sample_duration))
+                self.logger.error(f"Error loading audio file {name}: {str(e)}")
+                if strict:
+                    raise AudioLoadError(f"Could not decode {name}: {str(e)}") from e
+                metrics.increment('speech_zero_fill_total', reason='decode_error')
+                return np.zeros(int(self.sample_rate * self.sample_duration)), 0.0
 
             # Handle empty or invalid audio
             if len(audio) == 0:
-                self.logger.warning(f"Empty audio file: {audio_path}")
-                return np.zeros(int(self.sample_rate * self.sample_duration))
+                self.logger.warning(f"Empty audio file: {name}")
+                if strict:
+                    raise AudioLoadError(f"Empty audio file: {name}")
+                metrics.increment('speech_zero_fill_total', reason='empty')
+                return np.zeros(int(self.sample_rate * self.sample_duration)), 0.0
 
-            # Apply pre-emphasis filter
-            pre_emphasis = 0.97
-            audio = np.append(audio[0], audio[1:] - pre_emphasis * audio[:-1])
+            voiced_seconds = None
+            if self.trim:
+                region = voiced_region(audio, self.sample_rate)
+                if region is None:
+                    self.logger.warning(f"No speech detected in {name}")
+                    if strict:
+                        raise SilentRecording(f"No speech detected in {name}")
+                    metrics.increment('speech_zero_fill_total', reason='silent')
+                    return np.zeros(int(self.sample_rate * self.sample_duration)), 0.0
+                start, end, voiced_seconds = region
+                # Crop to the speech so no feature extraction is spent on silence
+                audio = audio[start:end]
 
-            # Normalize audio
-            audio = librosa.util.normalize(audio)
-
-            return audio
+            return self.preprocess(audio), voiced_seconds
+        except AudioLoadError:
+            raise
         except Exception as e:
-            self.logger.error(f"Error loading audio file {audio_path}: {str(e)}")
-            return np.zeros(int(self.sample_rate * self.sample_duration))
+            self.logger.error(f"Error loading audio file {name}: {str(e)}")
+            if strict:
+                raise AudioLoadError(f"Could not preprocess {name}: {str(e)}") from e
+            metrics.increment('speech_zero_fill_total', reason='preprocess_error')
+            return np.zeros(int(self.sample_rate * self.sample_duration)), 0.0
+
+    @staticmethod
+    def preprocess(audio: np.ndarray) -> np.ndarray:
+        """Apply the speech pre-emphasis filter and peak-normalize a decoded signal."""
+        # Apply pre-emphasis filter
+        pre_emphasis = 0.97
+        audio = np.append(audio[0], audio[1:] - pre_emphasis * audio[:-1])
 
+        # Normalize audio
+        return librosa.util.normalize(audio)
+
+    def _voiced_pitch(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Paired pitch contours in semitones, over the frames voiced in both signals."""
+        return voiced_semitones(*self._paired('pitch'))
+
+    @metrics.timed('pitch_stability')
     def pitch_stability(self) -> float:
         """Analyze stability of pitch over time."""
         try:
-            ref_audio = self.load_and_preprocess(self.reference_path)
-            comp_audio = self.load_and_preprocess(self.compare_path)
-            
-            # Calculate pitch
-            ref_pitch, _ = librosa.piptrack(y=ref_audio, sr=self.sample_rate)
-            comp_pitch, _ = librosa.piptrack(y=comp_audio, sr=self.sample_rate)
-            
-            # Ensure same length for comparison
-            min_length = min(ref_pitch.shape[1], comp_pitch.shape[1])
-            ref_pitch = ref_pitch[:, :min_length]
-            comp_pitch = comp_pitch[:, :min_length]
+            # Follow the intonation contour where both speakers are voiced
+            ref_pitch, comp_pitch = self._voiced_pitch()
             
             # Compare pitch stability
-            pitch_score = np.corrcoef(ref_pitch.flatten(), comp_pitch.flatten())[0,1]
+            if len(ref_pitch) < MIN_PITCH_FRAMES:
+                pitch_score = np.nan
+            else:
+                pitch_score = correlation_kernel().correlate(ref_pitch, comp_pitch)
+            _count_nan('pitch_stability', pitch_score)
             
             # Handle NaN and ensure value is in [0, 1] range
             if np.isnan(pitch_score):
@@ -91,71 +495,44 @@ class SpeechAnalysis:
             
         except Exception as e:
             self.logger.error(f"Error in pitch stability analysis: {str(e)}")
+            metrics.increment('speech_errors_total', stage='pitch_stability')
             return 0.0
 
+    @metrics.timed('articulation_clarity')
     def articulation_clarity(self) -> float:
         """Measure clarity of articulation using spectral contrast."""
         try:
-            ref_audio = self.load_and_preprocess(self.reference_path)
-            comp_audio = self.load_and_preprocess(self.compare_path)
-            
-            # Calculate spectral contrast
-            contrast_ref = librosa.feature.spectral_contrast(y=ref_audio, sr=self.sample_rate)
-            contrast_comp = librosa.feature.spectral_contrast(y=comp_audio, sr=self.sample_rate)
-            
-            # Ensure same length for comparison
-            min_length = min(contrast_ref.shape[1], contrast_comp.shape[1])
-            contrast_ref = contrast_ref[:, :min_length]
-            contrast_comp = contrast_comp[:, :min_length]
-            
-            # Compare articulation clarity
-            clarity_score = np.corrcoef(contrast_ref.flatten(), contrast_comp.flatten())[0,1]
+            # Compare spectral contrast, paired frame by frame
+            clarity_score = self._correlation('contrast')
+            _count_nan('articulation_clarity', clarity_score)
             return max(0.0, min(1.0, clarity_score))
             
         except Exception as e:
             self.logger.error(f"Error in articulation clarity analysis: {str(e)}")
+            metrics.increment('speech_errors_total', stage='articulation_clarity')
             return 0.0
 
+    @metrics.timed('rhythm_timing')
     def rhythm_timing(self) -> float:
         """Analyze speech rhythm and timing patterns."""
         try:
-            ref_audio = self.load_and_preprocess(self.reference_path)
-            comp_audio = self.load_and_preprocess(self.compare_path)
-            
-            # Extract onset strength envelopes
-            onset_env_ref = librosa.onset.onset_strength(y=ref_audio, sr=self.sample_rate)
-            onset_env_comp = librosa.onset.onset_strength(y=comp_audio, sr=self.sample_rate)
-            
-            # Ensure same length for comparison
-            min_length = min(len(onset_env_ref), len(onset_env_comp))
-            onset_env_ref = onset_env_ref[:min_length]
-            onset_env_comp = onset_env_comp[:min_length]
-            
-            # Calculate rhythm similarity
-            rhythm_score = np.corrcoef(onset_env_ref, onset_env_comp)[0,1]
+            # Compare onset strength envelopes, paired frame by frame
+            rhythm_score = self._correlation('onset')
+            _count_nan('rhythm_timing', rhythm_score)
             return max(0.0, min(1.0, rhythm_score))
             
         except Exception as e:
             self.logger.error(f"Error in rhythm timing analysis: {str(e)}")
+            metrics.increment('speech_errors_total', stage='rhythm_timing')
             return 0.0
 
+    @metrics.timed('volume_consistency')
     def volume_consistency(self) -> float:
         """Analyze consistency in volume/amplitude."""
         try:
-            ref_audio = self.load_and_preprocess(self.reference_path)
-            comp_audio = self.load_and_preprocess(self.compare_path)
-            
-            # Calculate RMS energy
-            rms_ref = librosa.feature.rms(y=ref_audio)
-            rms_comp = librosa.feature.rms(y=comp_audio)
-            
-            # Ensure same length for comparison
-            min_length = min(rms_ref.shape[1], rms_comp.shape[1])
-            rms_ref = rms_ref[:, :min_length]
-            rms_comp = rms_comp[:, :min_length]
-            
-            # Compare volume consistency
-            volume_score = np.corrcoef(rms_ref.flatten(), rms_comp.flatten())[0,1]
+            # Compare RMS energy, paired frame by frame
+            volume_score = self._correlation('rms')
+            _count_nan('volume_consistency', volume_score)
             
             # Handle NaN and ensure value is in [0, 1] range
             if np.isnan(volume_score):
@@ -164,25 +541,16 @@ class SpeechAnalysis:
             
         except Exception as e:
             self.logger.error(f"Error in volume consistency analysis: {str(e)}")
+            metrics.increment('speech_errors_total', stage='volume_consistency')
             return 0.0
 
+    @metrics.timed('phonation_quality')
     def phonation_quality(self) -> float:
         """Analyze voice quality metrics."""
         try:
-            ref_audio = self.load_and_preprocess(self.reference_path)
-            comp_audio = self.load_and_preprocess(self.compare_path)
-            
-            # Calculate MFCCs
-            mfcc_ref = librosa.feature.mfcc(y=ref_audio, sr=self.sample_rate)
-            mfcc_comp = librosa.feature.mfcc(y=comp_audio, sr=self.sample_rate)
-            
-            # Ensure same length for comparison
-            min_length = min(mfcc_ref.shape[1], mfcc_comp.shape[1])
-            mfcc_ref = mfcc_ref[:, :min_length]
-            mfcc_comp = mfcc_comp[:, :min_length]
-            
-            # Compare phonation quality
-            phonation_score = np.corrcoef(mfcc_ref.flatten(), mfcc_comp.flatten())[0,1]
+            # Compare MFCCs, paired frame by frame
+            phonation_score = self._correlation('mfcc')
+            _count_nan('phonation_quality', phonation_score)
             
             # Handle NaN and ensure value is in [0, 1] range
             if np.isnan(phonation_score):
@@ -191,48 +559,35 @@ class SpeechAnalysis:
             
         except Exception as e:
             self.logger.error(f"Error in phonation quality analysis: {str(e)}")
+            metrics.increment('speech_errors_total', stage='phonation_quality')
             return 0.0
 
-    def clinical_speech_assessment(self) -> Dict[str, float]:
+    @metrics.timed('clinical_speech_assessment')
+    def clinical_speech_assessment(
+        self,
+        progress: Optional[Callable[[str, float], None]] = None
+    ) -> Dict[str, float]:
         """
         Perform a comprehensive clinical assessment of speech patterns.
         Returns a dictionary of assessment metrics.
+
+        Only the analyzer's `metrics` are scored. If given, `progress` is
+        called with each metric's name and score as soon as that metric is
+        finished.
         """
         try:
             # Calculate individual metrics with fallback values
-            pitch_stability = self.pitch_stability()
-            articulation_clarity = self.articulation_clarity()
-            rhythm_timing = self.rhythm_timing()
-            volume_consistency = self.volume_consistency()
-            phonation_quality = self.phonation_quality()
-
-            # Replace any NaN or None values with 0.0
-            metrics = {
-                'pitch_stability': pitch_stability if isinstance(pitch_stability, (int, float)) and not np.isnan(pitch_stability) else 0.0,
-                'articulation_clarity': articulation_clarity if isinstance(articulation_clarity, (int, float)) and not np.isnan(articulation_clarity) else 0.0,
-                'rhythm_timing': rhythm_timing if isinstance(rhythm_timing, (int, float)) and not np.isnan(rhythm_timing) else 0.0,
-                'volume_consistency': volume_consistency if isinstance(volume_consistency, (int, float)) and not np.isnan(volume_consistency) else 0.0,
-                'phonation_quality': phonation_quality if isinstance(phonation_quality, (int, float)) and not np.isnan(phonation_quality) else 0.0
-            }
-
-            # Calculate weighted overall assessment
-            weighted_sum = sum(
-                metrics[metric] * weight 
-                for metric, weight in self.weights.items()
-                if metric in metrics
-            )
-            
-            # Add overall assessment to results
-            metrics['overall_assessment'] = max(0.0, min(1.0, weighted_sum))
+            scores = {}
+            for metric in self.metrics:
+                scores[metric] = getattr(self, metric)()
+                if progress is not None:
+                    progress(metric, scores[metric])
 
-            # Ensure all values are within [0, 1] range
-            for key in metrics:
-                metrics[key] = max(0.0, min(1.0, float(metrics[key])))
-
-            return metrics
+            return self._assessment_from_scores(scores)
 
         except Exception as e:
             self.logger.error(f"Error in clinical speech assessment: {str(e)}")
+            metrics.increment('speech_errors_total', stage='clinical_speech_assessment')
             # Return default values if analysis fails
             return {
                 'pitch_stability': 0.0,
@@ -243,6 +598,83 @@ class SpeechAnalysis:
                 'overall_assessment': 0.0
             }
 
+    def _assessment_from_scores(self, scores: Dict[str, float]) -> Dict[str, float]:
+        """Sanitize metric scores and add the weighted overall assessment."""
+        # Replace any NaN or None values with 0.0
+        metrics = {
+            metric: score if isinstance(score, (int, float)) and not np.isnan(score) else 0.0
+            for metric, score in scores.items()
+        }
+
+        # Calculate weighted overall assessment
+        weighted_sum = sum(
+            metrics[metric] * weight 
+            for metric, weight in self.weights.items()
+            if metric in metrics
+        )
+        
+        # Add overall assessment to results
+        metrics['overall_assessment'] = max(0.0, min(1.0, weighted_sum))
+
+        # Ensure all values are within [0, 1] range
+        for key in metrics:
+            metrics[key] = max(0.0, min(1.0, float(metrics[key])))
+
+        return metrics
+
+    @staticmethod
+    def _bound_score(metric: str, score: float) -> float:
+        """Clip a raw correlation exactly as the matching metric method does."""
+        _count_nan(metric, score)
+        # articulation_clarity and rhythm_timing clip without a NaN check
+        if metric in ('articulation_clarity', 'rhythm_timing'):
+            return max(0.0, min(1.0, score))
+        if np.isnan(score):
+            return 0.0
+        return max(0.0, min(1.0, float(score)))
+
+    @classmethod
+    @metrics.timed('batch_assessment')
+    def batch_assessment(cls, analyzers: List["SpeechAnalysis"]) -> List[Dict[str, float]]:
+        """
+        Assess several reference/patient pairs together.
+
+        Features are paired frame by frame and flattened as in the per-metric methods,
+        grouped by length, and each group is correlated with a single
+        batch_correlation call. Scores match clinical_speech_assessment within
+        SCORE_TOLERANCE.
+        """
+        scores: List[Dict[str, float]] = [{} for _ in analyzers]
+        for metric, feature in METRIC_FEATURES.items():
+            groups: Dict[int, List[Tuple[int, np.ndarray, np.ndarray]]] = {}
+            for i, analyzer in enumerate(analyzers):
+                if metric not in analyzer.metrics:
+                    continue
+                try:
+                    if metric == 'pitch_stability':
+                        ref, comp = analyzer._voiced_pitch()
+                        if ref.size < MIN_PITCH_FRAMES:
+                            scores[i][metric] = cls._bound_score(metric, np.nan)
+                            continue
+                    else:
+                        ref, comp = analyzer._paired(feature)
+                    ref = ref.reshape(-1)
+                    comp = comp.reshape(-1)
+                    groups.setdefault(ref.size, []).append((i, ref, comp))
+                except Exception as e:
+                    analyzer.logger.error(f"Error in {metric.replace('_', ' ')} analysis: {str(e)}")
+                    scores[i][metric] = 0.0
+
+            for items in groups.values():
+                correlations = batch_correlation(
+                    np.stack([ref for _, ref, _ in items]),
+                    np.stack([comp for _, _, comp in items])
+                )
+                for (i, _, _), correlation in zip(items, correlations):
+                    scores[i][metric] = cls._bound_score(metric, correlation)
+
+        return [analyzer._assessment_from_scores(item) for analyzer, item in zip(analyzers, scores)]
+
     def generate_report(self, assessment_results: Dict[str, float]) -> str:
         """Generate a clinical report from the speech analysis results."""
         try:
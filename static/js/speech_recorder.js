@@ -30,7 +30,8 @@ class SpeechRecorder {
             };
             
             this.mediaRecorder.onstop = () => {
-                const audioBlob = new Blob(this.audioChunks, { type: 'audio/wav' });
+                // MediaRecorder produces webm or ogg, not WAV; the server sniffs the real format
+                const audioBlob = new Blob(this.audioChunks, { type: this.mediaRecorder.mimeType || 'audio/webm' });
                 const audioUrl = URL.createObjectURL(audioBlob);
                 const audio = document.createElement('audio');
                 audio.src = audioUrl;
@@ -44,6 +45,7 @@ class SpeechRecorder {
             
             this.audioChunks = [];
             this.mediaRecorder.start();
+            this.startLiveScoring(stream);
             this.startButton.disabled = true;
             this.stopButton.disabled = false;
             this.statusDiv.textContent = 'Recording...';
@@ -56,11 +58,77 @@ class SpeechRecorder {
 
     stopRecording() {
         this.mediaRecorder.stop();
+        this.stopLiveScoring();
         this.startButton.disabled = false;
         this.stopButton.disabled = true;
         this.statusDiv.textContent = 'Recording stopped';
     }
 
+    startLiveScoring(stream) {
+        // Stream raw 16 kHz PCM to /stream for live scores; recording works the same without it
+        if (!window.WebSocket || !window.AudioContext) {
+            return;
+        }
+        let context;
+        try {
+            context = new AudioContext({ sampleRate: 16000 });
+        } catch (err) {
+            return;
+        }
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${protocol}://${window.location.host}/stream`);
+        const source = context.createMediaStreamSource(stream);
+        const processor = context.createScriptProcessor(4096, 1, 1);
+        const live = { context, socket, source, processor, ready: false, pending: [] };
+
+        processor.onaudioprocess = (event) => {
+            const samples = new Float32Array(event.inputBuffer.getChannelData(0)).buffer;
+            if (live.ready) {
+                socket.send(samples);
+            } else {
+                live.pending.push(samples);
+            }
+        };
+        source.connect(processor);
+        processor.connect(context.destination);
+
+        socket.onopen = () => socket.send(JSON.stringify({ sound_id: this.soundId, sample_rate: context.sampleRate }));
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.event === 'ready') {
+                live.ready = true;
+                live.pending.forEach(samples => socket.send(samples));
+                live.pending = [];
+            } else if (message.event === 'partial') {
+                const score = ((message.results.overall_assessment || 0) * 100).toFixed(0);
+                this.statusDiv.textContent = `Recording... live score ${score}%`;
+            } else if (message.event === 'result') {
+                this.showResults(message);
+                socket.close();
+            } else {
+                socket.close();
+            }
+        };
+        this.live = live;
+    }
+
+    stopLiveScoring() {
+        if (!this.live) {
+            return;
+        }
+        const { context, socket, source, processor, ready } = this.live;
+        source.disconnect();
+        processor.disconnect();
+        context.close();
+        if (ready && socket.readyState === WebSocket.OPEN) {
+            // The final score arrives as a 'result' message
+            socket.send(JSON.stringify({ event: 'end' }));
+        } else {
+            socket.close();
+        }
+        this.live = null;
+    }
+
     async analyzeSpeech() {
         if (!this.recordedBlob) {
             this.statusDiv.textContent = 'No recording available for analysis';
@@ -70,6 +138,7 @@ class SpeechRecorder {
         const formData = new FormData();
         formData.append('audio', this.recordedBlob);
         formData.append('sound_id', this.soundId);
+        formData.append('async', '1');
 
         try {
             const response = await fetch('/analyze_speech', {
@@ -77,32 +146,132 @@ class SpeechRecorder {
                 body: formData
             });
 
-            const results = await response.json();
-            
-            if (results.status === 'success') {
-                // Extract metrics from the results.results object
-                const metrics = results.results || {};
-                
-                this.resultsDiv.classList.remove('hidden');
-                this.resultsContent.innerHTML = this.formatResults({
-                    pitch_stability: metrics.pitch_stability || 0,
-                    articulation_clarity: metrics.articulation_clarity || 0,
-                    rhythm_timing: metrics.rhythm_timing || 0,
-                    volume_consistency: metrics.volume_consistency || 0,
-                    phonation_quality: metrics.phonation_quality || 0,
-                    overall_assessment: metrics.overall_assessment || 0,
-                    feedback: results.feedback || 'No feedback available',
-                    suggestions: results.suggestions || []
-                });
-            } else {
-                this.resultsContent.innerHTML = `<p class="text-red-600">Error: ${results.message}</p>`;
+            let results = await response.json();
+            if (results.status === 'accepted') {
+                results = await this.followAnalysis(results);
             }
+            this.showResults(results);
         } catch (err) {
             console.error('Error analyzing speech:', err);
             this.resultsContent.innerHTML = '<p class="text-red-600">Error analyzing speech. Please try again.</p>';
         }
     }
 
+    showResults(results) {
+        if (results.status === 'success') {
+            // Extract metrics from the results.results object
+            const metrics = results.results || {};
+            
+            this.resultsDiv.classList.remove('hidden');
+            this.resultsContent.innerHTML = this.formatResults({
+                pitch_stability: metrics.pitch_stability || 0,
+                articulation_clarity: metrics.articulation_clarity || 0,
+                rhythm_timing: metrics.rhythm_timing || 0,
+                volume_consistency: metrics.volume_consistency || 0,
+                phonation_quality: metrics.phonation_quality || 0,
+                overall_assessment: metrics.overall_assessment || 0,
+                feedback: results.feedback || 'No feedback available',
+                suggestions: results.suggestions || []
+            });
+        } else {
+            this.resultsContent.innerHTML = `<p class="text-red-600">Error: ${results.message}</p>`;
+        }
+    }
+
+    followAnalysis(job) {
+        // Wait for an async analysis, showing per-metric progress as it arrives
+        const showProgress = (state) => {
+            this.statusDiv.textContent = `Analyzing... (${state.completed_metrics}/${state.total_metrics} metrics)`;
+        };
+
+        return new Promise((resolve) => {
+            let failures = 0;
+            const poll = async () => {
+                let state;
+                try {
+                    state = await (await fetch(job.poll_url)).json();
+                } catch (err) {
+                    // Retry transient network errors a few times before giving up
+                    console.error('Error polling analysis:', err);
+                    if (++failures >= 5) {
+                        resolve({ status: 'error', message: 'Lost contact with the server. Please try again.' });
+                    } else {
+                        setTimeout(poll, 1000);
+                    }
+                    return;
+                }
+                failures = 0;
+                if (state.status === 'success' || state.status === 'error') {
+                    resolve(state);
+                } else {
+                    showProgress(state);
+                    setTimeout(poll, 1000);
+                }
+            };
+
+            if (!window.EventSource) {
+                poll();
+                return;
+            }
+
+            const events = new EventSource(job.events_url);
+            events.addEventListener('progress', (event) => showProgress(JSON.parse(event.data)));
+            events.addEventListener('result', (event) => {
+                events.close();
+                resolve(JSON.parse(event.data));
+            });
+            events.onerror = () => {
+                // Fall back to polling if the stream drops
+                events.close();
+                poll();
+            };
+        });
+    }
+
+    static async analyzeBatch(recorders) {
+        // Score several recordings in one round-trip; results come back in the same order
+        const pending = recorders.filter(recorder => recorder.recordedBlob);
+        if (pending.length === 0) {
+            return [];
+        }
+        const formData = new FormData();
+        pending.forEach(recorder => {
+            formData.append('audio', recorder.recordedBlob);
+            formData.append('sound_id', recorder.soundId);
+        });
+
+        const response = await fetch('/analyze_speech_batch', {
+            method: 'POST',
+            body: formData
+        });
+        const results = await response.json();
+        if (results.status !== 'success') {
+            throw new Error(results.message || 'Batch analysis failed');
+        }
+        return pending.map((recorder, index) => ({ recorder, result: results.items[index] }));
+    }
+
+    static bindAnalyzeAll(button, recorders) {
+        // Score every recorded item on the page with one batch request
+        if (!button) {
+            return;
+        }
+        button.addEventListener('click', async () => {
+            button.disabled = true;
+            try {
+                const scored = await SpeechRecorder.analyzeBatch(recorders);
+                scored.forEach(({ recorder, result }) => recorder.showResults(result));
+            } catch (err) {
+                console.error('Error analyzing recordings:', err);
+                recorders.filter(recorder => recorder.recordedBlob).forEach(recorder => {
+                    recorder.resultsContent.innerHTML = '<p class="text-red-600">Error analyzing speech. Please try again.</p>';
+                });
+            } finally {
+                button.disabled = false;
+            }
+        });
+    }
+
     formatResults(results) {
         // Add null checks and default values
         const formatMetric = (value) => ((value || 0) * 100).toFixed(1);
@@ -0,0 +1,186 @@
+from typing import Dict, List, Optional
+import logging
+import numpy as np
+import librosa
+
+from speech_analysis import (
+    SpeechAnalysis, SpeechFeatures, DEFAULT_N_FFT, DEFAULT_HOP_LENGTH
+)
+from pitch import centred_window, yin_frames
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingScorer:
+    """
+    Scores a recording against a reference while it is still being captured.
+
+    Samples are appended as they arrive. Every complete STFT frame is
+    computed once, and the pitch, spectral contrast, log-mel, onset, RMS
+    and MFCC columns derived from it are kept as rolling state. Partial
+    scores run the SpeechAnalysis metric methods on the frames seen so far.
+    Until the take ends its peak level is unknown, so partial scores skip
+    peak normalization and the 80 dB log-mel floor. They are estimates.
+
+    finish() hands the buffered take to SpeechAnalysis, which trims and
+    preprocesses it exactly as load_and_preprocess does and runs
+    clinical_speech_assessment on it. The final result is identical to
+    scoring the same samples through the batch path, and it takes one
+    feature pass over at most `sample_duration` seconds of audio.
+    """
+    def __init__(
+        self,
+        reference_features: SpeechFeatures,
+        reference_path: str,
+        sample_rate: int = 16000,
+        sample_duration: float = 5.0,
+        weights: Optional[Dict[str, float]] = None,
+        update_interval: float = 0.25,
+        n_fft: int = DEFAULT_N_FFT,
+        hop_length: int = DEFAULT_HOP_LENGTH
+    ):
+        self.reference_features = reference_features
+        self.reference_path = reference_path
+        self.sample_rate = sample_rate
+        self.sample_duration = sample_duration
+        self.weights = weights
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.max_samples = int(sample_rate * sample_duration)
+        self.update_samples = max(1, int(sample_rate * update_interval))
+
+        self._raw = np.zeros(self.max_samples, dtype=np.float32)
+        self._received = 0
+        self._scored_at = 0
+        # Pre-emphasized signal behind n_fft // 2 zeros, matching the centered STFT's padding
+        self._pad = n_fft // 2
+        self._emphasized = np.zeros(self._pad + self.max_samples + n_fft, dtype=np.float32)
+        self._window = librosa.filters.get_window('hann', n_fft, fftbins=True).astype(np.float32)
+        self._mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft)
+        self._frames = 0
+        self._columns: Dict[str, List[np.ndarray]] = {
+            'pitch': [], 'contrast': [], 'log_mel': [], 'rms': [], 'onset_diff': []
+        }
+
+    @property
+    def seconds(self) -> float:
+        """Duration of audio received so far, capped at the analysis window."""
+        return self._received / self.sample_rate
+
+    def append(self, samples: np.ndarray) -> Optional[Dict[str, float]]:
+        """
+        Add captured samples; returns partial scores once enough new audio has arrived.
+
+        Samples beyond `sample_duration` are ignored, as librosa.load ignores
+        them in the batch path.
+        """
+        samples = np.asarray(samples, dtype=np.float32)[:self.max_samples - self._received]
+        if len(samples) == 0:
+            return None
+        start = self._received
+        self._raw[start:start + len(samples)] = samples
+        self._received += len(samples)
+
+        # Pre-emphasis only looks one sample back, so it can run on each block
+        previous = self._raw[start - 1] if start > 0 else None
+        emphasized = np.empty_like(samples)
+        emphasized[1:] = samples[1:] - 0.97 * samples[:-1]
+        emphasized[0] = samples[0] if previous is None else samples[0] - 0.97 * previous
+        self._emphasized[self._pad + start:self._pad + self._received] = emphasized
+
+        self._extend_frames()
+        if self._received - self._scored_at < self.update_samples and self._received < self.max_samples:
+            return None
+        self._scored_at = self._received
+        return self.partial_scores()
+
+    def _extend_frames(self):
+        # A centered frame is complete once the samples up to its right edge have arrived
+        if self._received < self.n_fft - self._pad:
+            return
+        total = (self._received - (self.n_fft - self._pad)) // self.hop_length + 1
+        if total <= self._frames:
+            return
+        segment = self._emphasized[self._frames * self.hop_length:(total - 1) * self.hop_length + self.n_fft]
+        frames = librosa.util.frame(segment, frame_length=self.n_fft, hop_length=self.hop_length)
+        magnitude = np.abs(np.fft.rfft(frames * self._window[:, np.newaxis], axis=0))
+
+        # YIN only needs each frame's samples, so the contour grows one value per frame
+        yin_input, window = centred_window(frames)
+        pitches = yin_frames(yin_input, self.sample_rate, window)
+        contrast = librosa.feature.spectral_contrast(S=magnitude, sr=self.sample_rate, n_fft=self.n_fft)
+        log_mel = librosa.power_to_db(self._mel_basis @ magnitude ** 2, top_db=None)
+        rms = np.sqrt(np.mean(frames ** 2, axis=0, keepdims=True))
+
+        # Onset strength is the mean positive log-mel rise from the previous frame
+        previous = self._columns['log_mel'][-1][:, -1:] if self._columns['log_mel'] else log_mel[:, :1]
+        rises = np.diff(np.concatenate([previous, log_mel], axis=1), axis=1)
+        onset_diff = np.mean(np.maximum(0.0, rises), axis=0)
+        if self._frames == 0:
+            onset_diff = onset_diff[1:]
+
+        for name, value in (('pitch', pitches), ('contrast', contrast), ('log_mel', log_mel),
+                            ('rms', rms), ('onset_diff', onset_diff)):
+            self._columns[name].append(value)
+        self._frames = total
+
+    def partial_features(self) -> Optional[SpeechFeatures]:
+        """Features of the frames completed so far, or None before the first frame."""
+        if self._frames == 0:
+            return None
+        log_mel = np.concatenate(self._columns['log_mel'], axis=1)
+        # onset_strength pads lag + n_fft // (2 * hop_length) zero frames in front
+        lead = 1 + self.n_fft // (2 * self.hop_length)
+        onset = np.concatenate([np.zeros(lead, dtype=log_mel.dtype)] + self._columns['onset_diff'])[:self._frames]
+        return SpeechFeatures.from_arrays({
+            'pitch': np.concatenate(self._columns['pitch']),
+            'contrast': np.concatenate(self._columns['contrast'], axis=1),
+            'onset': onset,
+            'rms': np.concatenate(self._columns['rms'], axis=1),
+            'mfcc': librosa.feature.mfcc(S=log_mel, sr=self.sample_rate)
+        }, self.sample_rate, self.n_fft, self.hop_length)
+
+    def partial_scores(self) -> Optional[Dict[str, float]]:
+        """Estimated scores for the audio received so far."""
+        features = self.partial_features()
+        if features is None:
+            return None
+        # The take so far only covers the start of the reference, so partial
+        # scores compare it frame by frame instead of aligning it end to end
+        return self._analyzer(features, align=False).clinical_speech_assessment()
+
+    def finish(self, strict: bool = False) -> Dict:
+        """
+        Score the complete take through the batch metric path.
+
+        With `strict` set, an empty or silent take raises AudioLoadError
+        instead of being scored.
+        """
+        analyzer = self._analyzer(None, compare=self._raw[:self._received], strict=strict)
+        voiced_seconds = analyzer.compare_features.voiced_seconds
+        results = analyzer.clinical_speech_assessment()
+        return {
+            'results': results,
+            'suggestions': analyzer.get_improvement_suggestions(results),
+            'voiced_seconds': voiced_seconds
+        }
+
+    def _analyzer(
+        self,
+        compare_features: Optional[SpeechFeatures],
+        compare: Optional[np.ndarray] = None,
+        align: bool = True,
+        strict: bool = False
+    ) -> SpeechAnalysis:
+        return SpeechAnalysis(
+            reference_path=self.reference_path,
+            compare_path=compare,
+            sample_rate=self.sample_rate,
+            weights=self.weights,
+            verbose=False,
+            sample_duration=self.sample_duration,
+            reference_features=self.reference_features,
+            compare_features=compare_features,
+            align=align,
+            strict=strict
+        )
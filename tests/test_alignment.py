@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import librosa
+import numpy as np
+import pytest
+
+from alignment import banded_dtw
+from speech_analysis import SpeechAnalysis
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = str(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3')
+
+
+@pytest.mark.parametrize('n, m', [(50, 50), (40, 70), (70, 40)])
+def test_wide_band_matches_full_dtw(n, m):
+    rng = np.random.default_rng(n + m)
+    reference, compare = rng.standard_normal((20, n)), rng.standard_normal((20, m))
+
+    ref_frames, comp_frames = banded_dtw(reference, compare, radius=max(n, m))
+
+    cost = np.sqrt(((reference[:, ref_frames] - compare[:, comp_frames]) ** 2).sum(axis=0)).sum()
+    full, _ = librosa.sequence.dtw(reference, compare, metric='euclidean')
+    assert cost == pytest.approx(full[-1, -1])
+
+
+def test_narrow_band_path_is_monotonic_and_complete():
+    rng = np.random.default_rng(0)
+    ref_frames, comp_frames = banded_dtw(rng.standard_normal((13, 157)), rng.standard_normal((13, 120)), radius=8)
+
+    assert (ref_frames[0], comp_frames[0]) == (0, 0)
+    assert (ref_frames[-1], comp_frames[-1]) == (156, 119)
+    steps = np.stack([np.diff(ref_frames), np.diff(comp_frames)])
+    assert steps.min() >= 0 and steps.max() <= 1 and steps.sum(axis=0).min() >= 1
+    assert np.abs(ref_frames * 119 / 156 - comp_frames).max() <= 8 + 1
+
+
+def test_alignment_forgives_a_late_start():
+    audio, _ = librosa.load(PROMPT, sr=16000)
+    late = np.concatenate([np.zeros(int(0.3 * 16000), dtype=np.float32), audio])
+
+    # Trimming would remove the late start, so it is off to test alignment alone
+    aligned = SpeechAnalysis(PROMPT, late, verbose=False, trim=False).clinical_speech_assessment()
+    truncated = SpeechAnalysis(PROMPT, late, verbose=False, align=False, trim=False).clinical_speech_assessment()
+
+    assert aligned['overall_assessment'] > 0.8
+    assert aligned['overall_assessment'] > truncated['overall_assessment'] + 0.3
@@ -0,0 +1,33 @@
+import threading
+import time
+
+import pytest
+
+from analysis_executor import AnalysisExecutor, ExecutorBusy
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = AnalysisExecutor(workers=1, max_pending=1, backend='thread', cache_dir=str(tmp_path))
+    yield executor
+    executor.shutdown()
+
+
+def test_release_runs_after_worker_and_frees_slot(executor):
+    gate = threading.Event()
+    released = []
+    future = executor.submit(gate.wait, release=lambda: released.append(True))
+
+    with pytest.raises(ExecutorBusy):
+        executor.submit(time.sleep, 0, release=lambda: released.append('rejected'))
+    assert released == ['rejected']
+
+    gate.set()
+    future.result(timeout=5)
+    assert released == ['rejected', True]
+    assert executor.stats()['queue_depth'] == 0
+
+
+def test_wait_p95_is_nearest_rank(executor):
+    executor._waits.extend(float(i) for i in range(1, 21))
+    assert executor.stats()['wait_p95'] == 19.0
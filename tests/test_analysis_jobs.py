@@ -0,0 +1,42 @@
+import time
+
+from analysis_jobs import AnalysisJobStore
+from analysis_profiles import AnalysisProfile
+
+
+def test_finished_jobs_expire_on_read():
+    jobs = AnalysisJobStore(ttl=0.05)
+    job_id = jobs.create('p_pat')
+    jobs.fail(job_id, 'boom')
+    assert jobs.get(job_id)['status'] == 'error'
+
+    time.sleep(0.1)
+    assert jobs.get(job_id) is None
+    assert jobs.wait(job_id, 0, timeout=0.01) is None
+
+
+def test_timeout_counts_from_start_not_from_queueing():
+    jobs = AnalysisJobStore(timeout=0.05)
+    job_id = jobs.create('p_pat')
+    time.sleep(0.1)
+    assert jobs.get(job_id)['status'] == 'queued'
+
+    jobs.started(job_id)
+    assert jobs.get(job_id)['status'] == 'running'
+    time.sleep(0.1)
+    assert jobs.get(job_id)['status'] == 'error'
+
+
+def test_subset_profile_job_completes_with_its_own_metrics():
+    profile = AnalysisProfile('subset', 16000, 1024, 512, metrics=('pitch_stability', 'rhythm_timing'))
+    jobs = AnalysisJobStore()
+    job_id = jobs.create('p_pat', len(profile.metrics))
+    jobs.metric_done(job_id, 'pitch_stability', 0.5)
+    assert jobs.get(job_id)['total_metrics'] == 2
+
+    # Skipped metrics are left out of the payload, as analysis_payload does
+    jobs.succeed(job_id, {'results': {'pitch_stability': 0.5, 'rhythm_timing': 0.7, 'overall_assessment': 0.6}})
+    job = jobs.get(job_id)
+    assert job['status'] == 'success'
+    assert job['progress'] == {'pitch_stability': 0.5, 'rhythm_timing': 0.7}
+    assert job['completed_metrics'] == job['total_metrics'] == 2
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from analysis_profiles import DEFAULT_PROFILE, PROFILES, get_profile, load_figures, parse_profile_map
+from speech_analysis import DEFAULT_WEIGHTS, SpeechAnalysis
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = str(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3')
+
+
+def test_get_profile_defaults_and_rejects_unknown_names():
+    assert get_profile(None) is PROFILES[DEFAULT_PROFILE]
+    assert get_profile('') is PROFILES[DEFAULT_PROFILE]
+    assert get_profile('fast').name == 'fast'
+    with pytest.raises(ValueError):
+        get_profile('turbo')
+
+
+def test_parse_profile_map():
+    assert parse_profile_map('') == {}
+    assert parse_profile_map(' tongue=fast , sentence=clinical,') == {'tongue': 'fast', 'sentence': 'clinical'}
+    with pytest.raises(ValueError):
+        parse_profile_map('tongue')
+    with pytest.raises(ValueError):
+        parse_profile_map('tongue=turbo')
+
+
+def test_standard_profile_scores_like_the_defaults():
+    default = SpeechAnalysis(PROMPT, PROMPT, verbose=False).clinical_speech_assessment()
+    standard = SpeechAnalysis(
+        PROMPT, PROMPT, verbose=False, **PROFILES['standard'].analysis_kwargs()
+    ).clinical_speech_assessment()
+    assert standard == default
+
+
+@pytest.mark.parametrize('name', sorted(PROFILES))
+def test_every_profile_scores_a_take_against_itself(name):
+    profile = PROFILES[name]
+    analyzer = SpeechAnalysis(PROMPT, PROMPT, verbose=False, **profile.analysis_kwargs())
+    results = analyzer.clinical_speech_assessment()
+    assert set(results) == set(profile.metrics) | {'overall_assessment'}
+    assert results['overall_assessment'] > 0.9
+    features = analyzer.compare_features
+    frames = 1 + len(features.audio) // profile.hop_length
+    assert features.pitch.shape == (frames,)
+    assert features.mfcc.shape[-1] == frames
+
+
+def test_metric_subset_spreads_the_weights_over_the_scored_metrics():
+    metrics = ('rhythm_timing', 'volume_consistency')
+    analyzer = SpeechAnalysis(PROMPT, PROMPT, verbose=False, metrics=metrics)
+    total = DEFAULT_WEIGHTS['rhythm_timing'] + DEFAULT_WEIGHTS['volume_consistency']
+    assert analyzer.weights == pytest.approx({metric: DEFAULT_WEIGHTS[metric] / total for metric in metrics})
+
+    results = analyzer.clinical_speech_assessment()
+    assert set(results) == set(metrics) | {'overall_assessment'}
+    [batch] = SpeechAnalysis.batch_assessment([SpeechAnalysis(PROMPT, PROMPT, verbose=False, metrics=metrics)])
+    assert batch == pytest.approx(results)
+
+    with pytest.raises(ValueError):
+        SpeechAnalysis(PROMPT, PROMPT, verbose=False, metrics=('loudness',))
+
+
+def test_load_figures_tolerates_missing_and_broken_files(tmp_path):
+    assert load_figures(str(tmp_path / 'missing.json')) == {}
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{')
+    assert load_figures(str(broken)) == {}
+    published = tmp_path / 'profiles.json'
+    published.write_text('{"meta": {}, "profiles": {"fast": {"p50_ms": 5.0}}}')
+    assert load_figures(str(published)) == {'fast': {'p50_ms': 5.0}}
@@ -0,0 +1,100 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import app as app_module
+
+ROOT = Path(__file__).resolve().parent.parent
+TAKE = ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3'
+OTHER_TAKE = ROOT / 'static' / 'articulation_audio' / 'p_pat.mp3'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv('ANALYSIS_BACKEND', 'thread')
+    monkeypatch.setenv('PROMPT_AUDIO_PRERENDER', '0')
+    monkeypatch.setenv('INTENTS_RELOAD_INTERVAL', '0')
+    monkeypatch.setenv('RESULT_CACHE_ENTRIES', '0')
+    monkeypatch.setenv('PROGRESS_DB', str(tmp_path / 'progress.sqlite3'))
+    app = app_module.create_app()
+    yield app.test_client()
+    app_module.analysis_executor.shutdown()
+    app_module.reference_catalog.stop_polling()
+    app_module.progress_store.close()
+
+
+def sound_id():
+    return app_module.reference_catalog.entries()[0].sound_id
+
+
+def analyze(client, **form):
+    with open(TAKE, 'rb') as file:
+        return client.post('/analyze_speech', data=dict(form, audio=(file, 'take.mp3'), sound_id=sound_id()))
+
+
+def test_anonymous_takes_are_not_recorded(client):
+    response = analyze(client)
+    assert response.status_code == 200
+
+    app_module.progress_store.flush()
+    assert app_module.progress_store.history('') == []
+    assert app_module.progress_store.stats()['written'] == 0
+
+
+def test_patient_takes_are_recorded(client):
+    response = analyze(client, patient_id='p1', session_id='s1')
+    assert response.status_code == 200
+
+    app_module.progress_store.flush()
+    history = app_module.progress_store.history('p1')
+    assert [row['sound_id'] for row in history] == [sound_id()]
+    assert history[0]['overall_assessment'] == pytest.approx(response.get_json()['results']['overall_assessment'])
+
+
+def silent_wav():
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(16000, dtype=np.float32), 16000, format='WAV')
+    return buffer.getvalue()
+
+
+def test_batch_scores_each_item_and_reports_per_item_errors(client, monkeypatch):
+    submitted = []
+    submit_many = app_module.analysis_executor.submit_many
+    monkeypatch.setattr(
+        app_module.analysis_executor, 'submit_many',
+        lambda fn, calls: submitted.append([len(args[0]) for args, _, _ in calls]) or submit_many(fn, calls)
+    )
+    items = [
+        (TAKE.read_bytes(), 'b_ball'),
+        (OTHER_TAKE.read_bytes(), 'r_red'),
+        (silent_wav(), 'b_ball'),
+        (TAKE.read_bytes(), 'no_such_prompt'),
+        (OTHER_TAKE.read_bytes(), 'b_ball')
+    ]
+    response = client.post('/analyze_speech_batch', data={
+        'audio': [(io.BytesIO(data), f'take{position}.wav') for position, (data, _) in enumerate(items)],
+        'sound_id': [sound_id for _, sound_id in items]
+    })
+
+    assert response.status_code == 200
+    results = response.get_json()['items']
+    assert [item['sound_id'] for item in results] == [sound_id for _, sound_id in items]
+    assert [item['status'] for item in results] == ['success', 'success', 'error', 'error', 'success']
+    assert results[2]['message'] == 'No speech detected in the recording'
+    assert results[3]['message'] == 'Reference audio not found'
+    for item in (results[0], results[1], results[4]):
+        assert 0.0 <= item['results']['overall_assessment'] <= 1.0
+    # One worker job per prompt, in order of first appearance
+    assert submitted == [[3, 1]]
+
+
+def test_batch_needs_a_sound_id_per_recording(client):
+    response = client.post('/analyze_speech_batch', data={
+        'audio': [(io.BytesIO(TAKE.read_bytes()), 'take.mp3')],
+        'sound_id': []
+    })
+    assert response.status_code == 400
@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import librosa
+import numpy as np
+import pytest
+
+from audio_capture import Endpointer, FakeInputDevice, LiveCapture, RingBuffer
+from speech_analysis import SpeechAnalysis, voiced_region
+from utils import AudioHandler
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = str(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3')
+TAKE = str(ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3')
+
+# Background noise can move each edge of the voiced region by a frame
+HOP_SECONDS = 512 / 16000
+
+
+def voiced_seconds(audio):
+    start, end, _ = voiced_region(audio)
+    return (end - start) / 16000
+
+
+@pytest.fixture(scope='module')
+def take():
+    audio, _ = librosa.load(TAKE, sr=16000, duration=5.0)
+    return audio
+
+
+def session(*parts, noise=1e-4, seed=0):
+    """Takes separated by seconds of quiet background noise"""
+    rng = np.random.default_rng(seed)
+    signal = np.concatenate([
+        np.zeros(int(part * 16000), dtype=np.float32) if np.isscalar(part) else part for part in parts
+    ])
+    return signal + rng.normal(0, noise, len(signal)).astype(np.float32)
+
+
+def test_ring_buffer_wraps_and_counts_overruns():
+    ring = RingBuffer(8)
+    assert ring.write(np.arange(6, dtype=np.float32)) == 6
+    np.testing.assert_array_equal(ring.read(4), [0, 1, 2, 3])
+    # Wraps past the end of the storage
+    assert ring.write(np.arange(6, 12, dtype=np.float32)) == 6
+    assert len(ring) == 8
+    # Full: the newest samples are dropped rather than blocking the producer
+    assert ring.write(np.ones(3, dtype=np.float32)) == 0
+    assert ring.overruns == 3
+    np.testing.assert_array_equal(ring.read(), np.arange(4, 12))
+    assert len(ring.read()) == 0
+
+
+def test_endpointer_splits_utterances_at_silence(take):
+    signal = session(1.0, take, 1.0, take, 1.0)
+    endpointer = Endpointer(16000)
+    utterances = []
+    for start in range(0, len(signal), 1000):
+        utterances += endpointer.process(signal[start:start + 1000])
+
+    assert len(utterances) == 2
+    assert endpointer.flush() is None
+    for utterance in utterances:
+        # All of the speech, with no more than the pre-roll and hangover around it
+        assert voiced_region(utterance)[2] == pytest.approx(voiced_region(take)[2], abs=2 * HOP_SECONDS)
+        assert len(utterance) <= voiced_seconds(take) * 16000 + 0.9 * 16000
+
+
+def test_endpointer_ignores_steady_background_noise():
+    endpointer = Endpointer(16000)
+    assert endpointer.process(session(3.0, noise=0.01)) == []
+    assert not endpointer.in_utterance
+
+
+def test_endpointer_cuts_utterances_at_max_length():
+    tone = 0.3 * np.sin(2 * np.pi * 220 * np.arange(5 * 16000) / 16000).astype(np.float32)
+    endpointer = Endpointer(16000, max_seconds=2.0)
+    utterances = endpointer.process(session(0.5, tone))
+    assert [len(utterance) for utterance in utterances] == [2 * 16000, 2 * 16000]
+    assert len(endpointer.flush()) < 2 * 16000
+
+
+def test_captured_utterance_goes_to_analysis_as_samples(take):
+    signal = session(0.5, take, 1.0)
+    device = FakeInputDevice(signal, realtime=False)
+    with LiveCapture(device) as capture:
+        utterances = list(capture.utterances(timeout=10))
+
+    assert len(utterances) == 1
+    assert capture.stats()['dropped_samples'] == 0
+    # Captured without loss: a contiguous stretch of the input
+    start = int(np.flatnonzero(signal == utterances[0][0])[0])
+    np.testing.assert_array_equal(utterances[0], signal[start:start + len(utterances[0])])
+    # Scored straight from memory and trimmed like an upload
+    analysis = SpeechAnalysis(PROMPT, utterances[0], verbose=False)
+    results = analysis.clinical_speech_assessment()
+    assert analysis.compare_features.voiced_seconds == voiced_region(signal)[2]
+    assert 0.0 <= results['overall_assessment'] <= 1.0
+
+
+def test_utterance_in_progress_is_returned_when_input_ends(take):
+    device = FakeInputDevice(session(0.3, take), realtime=False)
+    with LiveCapture(device) as capture:
+        utterances = list(capture.utterances(timeout=10))
+    assert len(utterances) == 1
+
+
+def test_record_utterance_from_fake_device(take):
+    device = FakeInputDevice(session(0.2, take[:8000], 0.8), realtime=True)
+    utterance = AudioHandler().record_utterance(timeout=5, device=device)
+    assert utterance is not None and utterance.dtype == np.float32
+    assert len(utterance) >= 8000
@@ -0,0 +1,115 @@
+import io
+from pathlib import Path
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+import audio_ingest
+from audio_ingest import DecodedAudioCache, RecordingTooLong, _ffmpeg_command, ingest, sniff_format
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_RATE = 16000
+
+
+@pytest.fixture(autouse=True)
+def fresh_decode_cache(monkeypatch):
+    # Every test starts without takes decoded by an earlier one
+    monkeypatch.setattr(audio_ingest, 'decoded_audio', DecodedAudioCache())
+
+
+def encode(seconds, sample_rate=22050, format='WAV'):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    buffer = io.BytesIO()
+    sf.write(buffer, (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), sample_rate, format=format)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('format, expected', [('WAV', 'wav'), ('FLAC', 'flac'), ('OGG', 'ogg/vorbis')])
+def test_sniffs_container_from_magic_bytes(format, expected):
+    assert sniff_format(encode(0.5, format=format)) == expected
+
+
+def test_sniffs_browser_and_compressed_containers():
+    with open(ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3', 'rb') as file:
+        assert sniff_format(file.read()) == 'mp3'
+    assert sniff_format(b'\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\x82\x84webm') == 'webm'
+    assert sniff_format(b'\x00\x00\x00\x1cftypisom') == 'mp4'
+    assert sniff_format(b'not audio') == 'unknown'
+
+
+def test_high_quality_tier_matches_librosa_load(tmp_path):
+    data = encode(1.0)
+    path = tmp_path / 'take.wav'
+    path.write_bytes(data)
+
+    audio, info = ingest(data, SAMPLE_RATE)
+    np.testing.assert_array_equal(audio, librosa.load(path, sr=SAMPLE_RATE)[0])
+    assert info == {'format': 'wav', 'resample': 'high', 'decoder': 'soundfile', 'native_rate': 22050,
+                    'resampled': True, 'truncated': False}
+
+    fast, info = ingest(data, SAMPLE_RATE, resample='fast')
+    assert len(fast) == len(audio)
+    assert info['resample'] == 'fast'
+
+
+@pytest.mark.parametrize('resample, resampler', [
+    ('fast', 'resampler=swr'),
+    ('high', 'resampler=soxr:precision=20'),
+    ('precise', 'resampler=soxr:precision=28')
+])
+def test_ffmpeg_pipe_uses_the_resampling_tier(resample, resampler):
+    command = _ffmpeg_command(SAMPLE_RATE, 5.0, resample)
+    assert command[command.index('-af') + 1] == f"aresample={SAMPLE_RATE}:{resampler}"
+
+
+def test_long_recordings_are_truncated_or_rejected():
+    data = encode(3.0)
+
+    audio, info = ingest(data, SAMPLE_RATE, max_duration=2.0)
+    assert len(audio) == 2 * SAMPLE_RATE
+    assert info['truncated']
+
+    with pytest.raises(RecordingTooLong):
+        ingest(data, SAMPLE_RATE, max_duration=2.0, long_recordings='reject')
+    assert not ingest(data, SAMPLE_RATE, max_duration=3.0, long_recordings='reject')[1]['truncated']
+
+
+def test_repeat_decodes_come_from_the_shared_cache():
+    data = encode(3.0)
+
+    # A 2-second window keeps only the start of the take
+    first, info = ingest(data, SAMPLE_RATE, max_duration=2.0)
+    assert info['decoder'] == 'soundfile'
+    again, info = ingest(data, SAMPLE_RATE, max_duration=1.0)
+    assert info['decoder'] == 'cache' and info['truncated']
+    np.testing.assert_array_equal(again, first[:SAMPLE_RATE])
+    with pytest.raises(RecordingTooLong):
+        ingest(data, SAMPLE_RATE, max_duration=2.0, long_recordings='reject')
+    # A longer window, or the whole take, needs a real decode
+    assert ingest(data, SAMPLE_RATE)[1]['decoder'] == 'soundfile'
+    assert ingest(data, SAMPLE_RATE)[1]['decoder'] == 'cache'
+    # Other rates and tiers are decoded separately
+    assert ingest(data, 22050)[1]['decoder'] == 'soundfile'
+
+
+def test_worker_decodes_are_forwarded_to_the_parent_cache():
+    worker, parent = DecodedAudioCache(), DecodedAudioCache()
+    worker._forward = True
+    worker.put(('a', SAMPLE_RATE, 'high'), np.zeros(10, dtype=np.float32), True, {'format': 'wav'})
+    worker.put(('b', SAMPLE_RATE, 'high'), np.zeros(10, dtype=np.float32), False, {'format': 'wav'})
+
+    # Only whole recordings are of use to /transcribe in the parent
+    parent.merge(worker.drain())
+    assert parent.get(('a', SAMPLE_RATE, 'high'))[1]
+    assert parent.get(('b', SAMPLE_RATE, 'high')) is None
+    assert worker.drain() == []
+
+
+def test_cache_drops_least_recently_used_past_its_size():
+    cache = DecodedAudioCache(max_bytes=100)
+    for name in 'abc':
+        cache.put(name, np.zeros(10, dtype=np.float32), True, {})
+    assert cache.get('a') is None and cache.get('c') is not None
+    assert not cache.get('c')[0].flags.writeable
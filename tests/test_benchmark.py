@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from benchmark import SIGNALS, compare, percentile, profile_summary, synthesize
+
+
+def test_signals_are_deterministic_and_bounded():
+    for kind in SIGNALS:
+        audio = synthesize(kind, 0.5)
+        assert len(audio) == 8000
+        assert np.max(np.abs(audio)) <= 1.0
+        assert np.array_equal(audio, synthesize(kind, 0.5))
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([float(i) for i in range(1, 21)], 0.95) == 19.0
+    assert percentile([3.0], 0.5) == 3.0
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = {'results': {'features': {'tone_1s': {'p50': 0.010, 'alloc_peak_kb': 100.0}}}}
+    slower = {'results': {'features': {'tone_1s': {'p50': 0.013, 'alloc_peak_kb': 100.0},
+                                       'tone_5s': {'p50': 1.0, 'alloc_peak_kb': 1.0}}}}
+
+    assert compare(baseline, slower, threshold=0.5) == []
+    assert len(compare(baseline, slower, threshold=0.25)) == 1
+
+
+def test_profile_summary_measures_agreement_with_clinical():
+    timings = {
+        'profile_fast': {'a': {'p50': 0.002, 'p95': 0.003}, 'b': {'p50': 0.004, 'p95': 0.006}},
+        'profile_clinical': {'a': {'p50': 0.010, 'p95': 0.012}, 'b': {'p50': 0.020, 'p95': 0.030}}
+    }
+    overall = {'fast': {'a': 0.5, 'b': 0.9}, 'clinical': {'a': 0.6, 'b': 0.6}}
+
+    summary = profile_summary(timings, overall)
+
+    assert summary['clinical']['agreement_max_abs_diff'] == 0.0
+    assert summary['fast']['agreement_mean_abs_diff'] == pytest.approx(0.2)
+    assert summary['fast']['agreement_max_abs_diff'] == pytest.approx(0.3)
+    assert summary['fast']['p50_ms'] == pytest.approx(2.0)
+    assert summary['fast']['max_p95_ms'] == pytest.approx(6.0)
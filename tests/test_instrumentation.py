@@ -0,0 +1,42 @@
+from instrumentation import MetricsRegistry, STAGE_SECONDS, profile_call
+
+
+def test_render_emits_cumulative_histogram_and_counters():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe(STAGE_SECONDS, 0.05, stage='stft')
+    registry.observe(STAGE_SECONDS, 0.5, stage='stft')
+    registry.observe(STAGE_SECONDS, 5.0, stage='stft')
+    registry.increment('speech_errors_total', stage='rms')
+
+    lines = registry.render().splitlines()
+    assert f'# TYPE {STAGE_SECONDS} histogram' in lines
+    assert f'{STAGE_SECONDS}_bucket{{stage="stft",le="0.1"}} 1' in lines
+    assert f'{STAGE_SECONDS}_bucket{{stage="stft",le="1.0"}} 2' in lines
+    assert f'{STAGE_SECONDS}_bucket{{stage="stft",le="+Inf"}} 3' in lines
+    assert f'{STAGE_SECONDS}_count{{stage="stft"}} 3' in lines
+    assert 'speech_errors_total{stage="rms"} 1' in lines
+
+
+def test_forwarded_observations_merge_into_another_registry():
+    worker, parent = MetricsRegistry(), MetricsRegistry()
+    worker._forward = True
+
+    @worker.timed('mfcc')
+    def work():
+        return 42
+
+    assert work() == 42
+    worker.increment('speech_nan_fallbacks_total', metric='rhythm_timing')
+    assert worker.render() == '\n'
+
+    parent.merge(worker.drain())
+    assert worker.drain() == []
+    rendered = parent.render()
+    assert f'{STAGE_SECONDS}_count{{stage="mfcc"}} 1' in rendered
+    assert 'speech_nan_fallbacks_total{metric="rhythm_timing"} 1' in rendered
+
+
+def test_profile_call_returns_result_and_report():
+    result, report = profile_call(sorted, [3, 1, 2])
+    assert result == [1, 2, 3]
+    assert 'cumulative' in report
@@ -0,0 +1,60 @@
+import json
+import os
+import random
+
+from benchmark import linear_match
+from intent_matcher import IntentMatcher, KeywordAutomaton
+
+EXERCISE_TYPES = ['breathing', 'articulation', 'speech_sounds']
+
+
+def write_intents(path, names, mtime_ns=None):
+    intents = {'intents': [{'intent': name, 'responses': [f"re {name}"]} for name in names]}
+    path.write_text(json.dumps(intents))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return intents
+
+
+def test_automaton_returns_first_keyword_in_priority_order():
+    automaton = KeywordAutomaton(['she', 'he', 'hers', 'his'])
+    assert automaton.first('ushers') == 0
+    assert automaton.first('this') == 3
+    assert automaton.first('xyz') is None
+    assert KeywordAutomaton(['abc', '']).first('xyz') == 1
+
+
+def test_matches_like_the_linear_scans(tmp_path):
+    rng = random.Random(0)
+    names = ['hey', 'help', 'thanks', 'bye', 'ex', 'art'] + [
+        ''.join(rng.choice('abehrst ') for _ in range(rng.randint(1, 4))) for _ in range(200)
+    ] + ['default']
+    path = tmp_path / 'intents.json'
+    intents = write_intents(path, names)
+    matcher = IntentMatcher(str(path), EXERCISE_TYPES)
+
+    messages = ['show me exercises', 'breathing please', 'hey there', 'speech_sounds and articulation', 'zzz']
+    messages += [''.join(rng.choice('abehrst xyz') for _ in range(rng.randint(0, 30))) for _ in range(500)]
+    for message in messages:
+        assert matcher.match(message) == linear_match(message, EXERCISE_TYPES, intents), message
+
+
+def test_reloads_when_the_file_changes_and_keeps_intents_on_errors(tmp_path):
+    path = tmp_path / 'intents.json'
+    write_intents(path, ['hey', 'default'], mtime_ns=1_000_000_000)
+    matcher = IntentMatcher(str(path), EXERCISE_TYPES)
+    reloaded = []
+    matcher.on_reload = reloaded.append
+    assert matcher.match('howdy') is None
+    assert not matcher.reload()
+
+    write_intents(path, ['howdy', 'default'], mtime_ns=2_000_000_000)
+    assert matcher.reload()
+    assert matcher.match('howdy')[1]['intent'] == 'howdy'
+    assert matcher.fallback()['intent'] == 'default'
+    assert len(reloaded) == 1
+
+    path.write_text('{"intents": [')
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    assert not matcher.reload()
+    assert matcher.match('howdy')[1]['intent'] == 'howdy'
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import librosa
+import numpy as np
+
+from pitch import f0_contour
+from speech_analysis import SpeechAnalysis, SpeechFeatures
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_RATE = 16000
+
+
+def tone(frequency, seconds=1.0):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * frequency * t) + 0.1 * np.sin(4 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_tracks_voice_range_tones_with_one_value_per_stft_frame():
+    for frequency in (80.0, 150.0, 300.0, 450.0):
+        contour = f0_contour(tone(frequency), SAMPLE_RATE)
+        assert contour.shape == (1 + SAMPLE_RATE // 512,)
+        np.testing.assert_allclose(contour[2:-2], frequency, rtol=0.005)
+
+
+def test_noise_and_silence_are_unvoiced():
+    noise = np.random.default_rng(0).standard_normal(SAMPLE_RATE).astype(np.float32) * 0.1
+    assert not np.any(f0_contour(noise, SAMPLE_RATE))
+    assert not np.any(f0_contour(np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE))
+
+
+def test_speech_contour_agrees_with_librosa_yin():
+    audio, _ = librosa.load(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3', sr=SAMPLE_RATE, duration=5.0)
+    contour = f0_contour(audio, SAMPLE_RATE)
+    expected = librosa.yin(audio, fmin=60, fmax=500, sr=SAMPLE_RATE, frame_length=2048)
+    voiced = contour > 0
+    assert voiced.sum() >= 5
+    np.testing.assert_allclose(contour[voiced], expected[voiced], rtol=0.03)
+
+
+def test_pitch_stability_follows_the_contour_not_the_register(tmp_path):
+    t = np.arange(SAMPLE_RATE * 2) / SAMPLE_RATE
+
+    def glide(base, direction):
+        frequency = base * 2 ** (direction * t / 2)
+        return (0.3 * np.sin(2 * np.pi * np.cumsum(frequency) / SAMPLE_RATE)).astype(np.float32)
+
+    adult_rising = SpeechFeatures(glide(110, 1), SAMPLE_RATE)
+    child_rising = SpeechFeatures(glide(200, 1), SAMPLE_RATE)
+    child_falling = SpeechFeatures(glide(400, -1), SAMPLE_RATE)
+
+    def score(compare):
+        return SpeechAnalysis(None, None, verbose=False, align=False,
+                              reference_features=adult_rising, compare_features=compare).pitch_stability()
+
+    assert score(child_rising) > 0.95
+    assert score(child_falling) == 0.0
+    assert adult_rising.pitch.nbytes < 1024
+
+
+def test_short_frames_still_reach_the_lowest_pitch():
+    # Half of a 1024-sample frame is shorter than the 60 Hz period plus the window
+    contour = f0_contour(tone(80.0), SAMPLE_RATE, frame_length=1024, hop_length=1024)
+    assert contour.shape == (1 + SAMPLE_RATE // 1024,)
+    np.testing.assert_allclose(contour[2:-2], 80.0, rtol=0.005)
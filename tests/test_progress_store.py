@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from progress_store import METRICS, ProgressStore
+
+DAY = 86400
+NOW = 1_700_000_000.0
+
+
+def scores(value):
+    return {metric: value for metric in METRICS}
+
+
+def test_history_is_per_patient_newest_first(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.sqlite3'))
+    store.record('pat-1', 's1', 'c_cat', scores(0.5), recorded_at=NOW - 2 * DAY)
+    store.record('pat-1', 's2', 'p_pat', scores(0.6), recorded_at=NOW - DAY)
+    store.record('pat-1', 's2', 'c_cat', scores(0.7), recorded_at=NOW)
+    store.record('pat-2', 's9', 'c_cat', scores(0.1), recorded_at=NOW)
+    store.flush()
+
+    history = store.history('pat-1')
+    assert [row['session_id'] for row in history] == ['s2', 's2', 's1']
+    assert [row['articulation_clarity'] for row in store.history('pat-1', sound_id='c_cat')] == [0.7, 0.5]
+    assert len(store.history('pat-1', since=NOW - DAY - 1)) == 2
+    assert store.stats()['written'] == 4
+    store.close()
+
+
+def test_trend_reads_daily_aggregates(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.sqlite3'), batch_size=3)
+    for day, values in ((40, [0.9]), (3, [0.2, 0.4]), (0, [0.6])):
+        for value in values:
+            store.record('pat-1', None, 'c_cat', dict(scores(value), rhythm_timing=None), recorded_at=NOW - day * DAY)
+    store.record('pat-1', None, 'p_pat', scores(1.0), recorded_at=NOW)
+    store.flush()
+
+    trend = store.trend('pat-1', 'articulation_clarity', days=30, sound_id='c_cat', now=NOW)
+    assert trend['count'] == 3
+    assert trend['mean'] == pytest.approx(0.4)
+    assert (trend['min'], trend['max']) == (0.2, 0.6)
+    assert [day['count'] for day in trend['daily']] == [2, 1]
+    assert trend['daily'][0]['mean'] == pytest.approx(0.3)
+
+    assert store.trend('pat-1', 'articulation_clarity', days=30, now=NOW)['count'] == 4
+    assert store.trend('pat-1', 'rhythm_timing', days=30, sound_id='c_cat', now=NOW)['count'] == 0
+    with pytest.raises(ValueError):
+        store.trend('pat-1', 'loudness')
+    store.close()
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    store = ProgressStore(str(tmp_path / 'progress.sqlite3'), max_pending=1, flush_interval=1.0)
+    started = time.perf_counter()
+    accepted = [store.record('pat-1', None, 'c_cat', scores(0.5)) for _ in range(50)]
+    assert time.perf_counter() - started < 0.5
+    assert not all(accepted)
+    store.flush()
+    assert store.stats()['dropped'] == accepted.count(False)
+    store.close()
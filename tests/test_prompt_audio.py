@@ -0,0 +1,49 @@
+from prompt_audio import PromptAudioCache, prompt_texts
+from utils import ExerciseManager
+
+
+def test_prompts_render_once_and_are_served_by_url(tmp_path):
+    calls = []
+
+    def render(text, path):
+        calls.append(text)
+        with open(path, 'wb') as file:
+            file.write(b'RIFF' + text.encode('utf-8'))
+
+    cache = PromptAudioCache(render, cache_dir=str(tmp_path))
+    assert cache.url('Hello') is None
+    assert cache.prerender(['Hello', 'Goodbye']) == {'rendered': 2, 'cached': 0, 'failed': 0}
+    assert cache.url('Hello') == f"/prompt_audio/{PromptAudioCache.name('Hello')}"
+
+    restarted = PromptAudioCache(render, cache_dir=str(tmp_path))
+    assert restarted.prerender(['Hello', 'Goodbye']) == {'rendered': 0, 'cached': 2, 'failed': 0}
+    assert calls == ['Hello', 'Goodbye']
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(PromptAudioCache.name(t) for t in calls)
+
+
+def test_failed_renders_leave_no_file_and_no_url(tmp_path):
+    def render(text, path):
+        if text == 'broken':
+            raise RuntimeError('engine crashed')
+        open(path, 'wb').close()  # an engine that writes nothing
+
+    cache = PromptAudioCache(render, cache_dir=str(tmp_path))
+    assert cache.prerender(['broken', 'empty']) == {'rendered': 0, 'cached': 0, 'failed': 2}
+    assert cache.url('broken') is None and cache.url('empty') is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_speech_engine_stops_prerendering(tmp_path):
+    def render(text, path):
+        raise ImportError("No module named 'pyttsx3'")
+
+    cache = PromptAudioCache(render, cache_dir=str(tmp_path))
+    assert cache.prerender(['one', 'two', 'three'])['failed'] == 1
+
+
+def test_prompt_texts_cover_instructions_and_intents():
+    intents = {'intents': [{'intent': 'hey', 'responses': ['Hi!', 'Hi!']}, {'intent': 'x', 'responses': []}]}
+    texts = prompt_texts(ExerciseManager(), intents, ['Choose one:'])
+    assert texts[0] == 'Choose one:'
+    assert texts.count('Hi!') == 1
+    assert 'Name common objects in your surroundings.' in texts
@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+from reference_catalog import ReferenceCatalog
+
+FOLDERS = ['speech_audio', 'articulation_audio']
+
+
+def touch(path, content=b'ID3'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def bump_mtime(path, seconds=10):
+    # Filesystem timestamps can be coarse; move the mtime on so a rescan is certain
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    touch(tmp_path / 'speech_audio' / 's_sun.mp3')
+    touch(tmp_path / 'articulation_audio' / 's_sun.mp3')
+    touch(tmp_path / 'articulation_audio' / 'p_pat.mp3')
+    touch(tmp_path / 'articulation_audio' / 'notes.txt')
+    return tmp_path
+
+
+def test_index_prefers_earlier_folders_and_skips_other_files(static_dir):
+    catalog = ReferenceCatalog(str(static_dir), FOLDERS, expected={})
+
+    assert sorted(entry.sound_id for entry in catalog.entries()) == ['p_pat', 's_sun']
+    assert catalog.lookup('s_sun').folder == 'speech_audio'
+    assert catalog.lookup('p_pat').exercise_type == 'articulation'
+    assert catalog.lookup('notes') is None
+    assert catalog.lookup('unknown') is None
+    assert catalog.health()['duplicates'] == {'s_sun': [
+        str(static_dir / 'speech_audio' / 's_sun.mp3'),
+        str(static_dir / 'articulation_audio' / 's_sun.mp3')
+    ]}
+
+
+def test_refresh_picks_up_added_renamed_and_edited_prompts(static_dir):
+    catalog = ReferenceCatalog(str(static_dir), FOLDERS, expected={})
+    folder = static_dir / 'articulation_audio'
+    original = catalog.lookup('p_pat')
+
+    touch(folder / 'b_ball.mp3')
+    os.rename(folder / 'p_pat.mp3', folder / 'p_pet.mp3')
+    bump_mtime(folder)
+    # Lookups only read the index until it is refreshed
+    assert catalog.lookup('b_ball') is None
+    assert catalog.lookup('p_pat') == original
+
+    assert catalog.refresh()
+    assert catalog.lookup('b_ball').path == str(folder / 'b_ball.mp3')
+    assert catalog.lookup('p_pet').path == str(folder / 'p_pet.mp3')
+    assert catalog.lookup('p_pat') is None
+    assert not catalog.refresh()
+
+    # An in-place edit leaves the folder alone but changes the file's stat
+    touch(folder / 'b_ball.mp3', b'ID3 edited')
+    assert catalog.refresh()
+    assert catalog.lookup('b_ball').stat.st_size == len(b'ID3 edited')
+
+
+def test_removing_the_preferred_copy_falls_back_to_the_next_folder(static_dir):
+    catalog = ReferenceCatalog(str(static_dir), FOLDERS, expected={})
+    os.unlink(static_dir / 'speech_audio' / 's_sun.mp3')
+    bump_mtime(static_dir / 'speech_audio')
+
+    assert catalog.refresh()
+    assert catalog.lookup('s_sun').folder == 'articulation_audio'
+
+
+def test_polling_refreshes_in_the_background(static_dir):
+    catalog = ReferenceCatalog(str(static_dir), FOLDERS, expected={})
+    catalog.start_polling(0.01)
+    try:
+        touch(static_dir / 'speech_audio' / 'r_red.mp3')
+        bump_mtime(static_dir / 'speech_audio')
+        deadline = time.monotonic() + 5
+        while catalog.lookup('r_red') is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert catalog.lookup('r_red').folder == 'speech_audio'
+    finally:
+        catalog.stop_polling()
+
+
+def test_missing_expected_prompts_degrade_health(static_dir):
+    catalog = ReferenceCatalog(str(static_dir), FOLDERS, expected={'speech_audio': ['s_sun.mp3', 'r_red.mp3']})
+    assert catalog.missing() == ['speech_audio/r_red.mp3']
+    assert catalog.health()['status'] == 'degraded'
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from reference_store import ReferenceFeatureStore
+from speech_analysis import AudioLoadError
+
+
+def test_undecodable_reference_is_not_cached(tmp_path):
+    bad = tmp_path / 'bad.mp3'
+    bad.write_bytes(b'not audio at all')
+    store = ReferenceFeatureStore(cache_dir=str(tmp_path / 'cache'))
+
+    with pytest.raises(AudioLoadError):
+        store.get('bad', str(bad))
+
+    assert os.listdir(tmp_path / 'cache') == []
+    assert store._entries == {}
+
+
+def test_key_tracks_feature_parameters(tmp_path):
+    audio = tmp_path / 'a.mp3'
+    audio.write_bytes(b'x')
+    default = ReferenceFeatureStore(cache_dir=str(tmp_path / 'cache'))
+    finer = ReferenceFeatureStore(cache_dir=str(tmp_path / 'cache'), hop_length=256)
+
+    assert default.key('a', str(audio)) != finer.key('a', str(audio))
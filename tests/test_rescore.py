@@ -0,0 +1,93 @@
+import csv
+import json
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from reference_catalog import ReferenceCatalog
+from rescore import COLUMNS, Checkpoint, RowWriter, Take, find_takes, rescore
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_RATE = 16000
+HASH = '0' * 32
+
+
+def write_takes(directory):
+    audio, _ = librosa.load(str(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3'), sr=SAMPLE_RATE)
+    (directory / '00').mkdir()
+    sf.write(str(directory / '00' / f'{HASH}-b_ball.wav'), audio, SAMPLE_RATE)
+    sf.write(str(directory / '00' / f'{"1" * 32}-b_ball.wav'), np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+    sf.write(str(directory / 'nothing_20240101_120000.wav'), audio, SAMPLE_RATE)
+    (directory / '.upload-1-2.tmp').write_bytes(b'partial')
+
+
+def test_find_takes_reads_prompts_from_stored_names_and_manifests(tmp_path):
+    write_takes(tmp_path)
+    takes = list(find_takes(str(tmp_path)))
+    assert [(take.take, take.sound_id) for take in takes] == [
+        ('nothing_20240101_120000.wav', 'nothing'),
+        (f'00/{HASH}-b_ball.wav', 'b_ball'),
+        (f'00/{"1" * 32}-b_ball.wav', 'b_ball')
+    ]
+
+    (tmp_path / 'takes.csv').write_text(f'path,sound_id\n00/{HASH}-b_ball.wav,\nnothing_20240101_120000.wav,p_pat\n')
+    (tmp_path / 'takes.jsonl').write_text(json.dumps({'path': f'00/{HASH}-b_ball.wav', 'take': 'one'}) + '\n\n')
+    from_csv = list(find_takes(str(tmp_path / 'takes.csv')))
+    assert [take.sound_id for take in from_csv] == ['b_ball', 'p_pat']
+    assert from_csv[0].path == str(tmp_path / '00' / f'{HASH}-b_ball.wav')
+    assert list(find_takes(str(tmp_path / 'takes.jsonl'))) == [
+        Take('one', str(tmp_path / '00' / f'{HASH}-b_ball.wav'), 'b_ball')
+    ]
+
+
+def test_checkpoint_ignores_a_line_cut_short(tmp_path):
+    path = tmp_path / 'run.checkpoint'
+    path.write_text('a\nb\npartial')
+    checkpoint = Checkpoint(str(path))
+    assert checkpoint.done == {'a', 'b'}
+    checkpoint.close()
+
+
+def test_csv_output_keeps_one_header_when_reopened(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    for take in ('a', 'b'):
+        writer = RowWriter(path, 'csv')
+        writer.write([{'take': take, 'status': 'ok'}])
+        writer.close()
+    with open(path) as file:
+        rows = list(csv.DictReader(file))
+    assert [row['take'] for row in rows] == ['a', 'b']
+    assert tuple(rows[0]) == COLUMNS
+
+
+def test_rescore_writes_every_take_once_and_resumes(tmp_path):
+    takes_dir = tmp_path / 'uploads'
+    takes_dir.mkdir()
+    write_takes(takes_dir)
+    catalog = ReferenceCatalog(str(ROOT / 'static'))
+    output = str(tmp_path / 'out.jsonl')
+
+    def run():
+        writer = RowWriter(output, 'jsonl')
+        checkpoint = Checkpoint(output + '.checkpoint')
+        try:
+            return rescore(find_takes(str(takes_dir)), writer, checkpoint, catalog, commit_every=2)
+        finally:
+            writer.close()
+            checkpoint.close()
+
+    stats = run()
+    assert (stats['takes'], stats['ok'], stats['rejected'], stats['unmatched']) == (3, 1, 1, 1)
+    with open(output) as file:
+        rows = {row['take']: row for row in map(json.loads, file)}
+    scored = rows[f'00/{HASH}-b_ball.wav']
+    assert scored['status'] == 'ok' and scored['overall_assessment'] > 0.9
+    assert rows[f'00/{"1" * 32}-b_ball.wav']['status'] == 'rejected'
+    assert rows['nothing_20240101_120000.wav']['status'] == 'unmatched'
+
+    again = run()
+    assert again['takes'] == 0 and again['resumed'] == 3
+    with open(output) as file:
+        assert len(file.readlines()) == 3
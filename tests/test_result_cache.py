@@ -0,0 +1,45 @@
+import os
+import time
+
+from result_cache import AnalysisResultCache
+
+PARAMS = {'sample_rate': 16000, 'sample_duration': 5.0}
+
+
+def reference_stat(tmp_path, content=b'prompt'):
+    path = tmp_path / 'prompt.wav'
+    path.write_bytes(content)
+    return os.stat(path)
+
+
+def test_key_covers_recording_reference_and_parameters(tmp_path):
+    stat = reference_stat(tmp_path)
+    key = AnalysisResultCache.key(b'take', 'p_pat', stat, PARAMS)
+
+    assert key == AnalysisResultCache.key(b'take', 'p_pat', stat, dict(PARAMS))
+    assert key != AnalysisResultCache.key(b'take!', 'p_pat', stat, PARAMS)
+    assert key != AnalysisResultCache.key(b'take', 'b_ball', stat, PARAMS)
+    assert key != AnalysisResultCache.key(b'take', 'p_pat', stat, dict(PARAMS, sample_duration=3.0))
+    assert key != AnalysisResultCache.key(b'take', 'p_pat', reference_stat(tmp_path, b'edited prompt'), PARAMS)
+
+
+def test_lru_and_ttl_eviction_with_hit_counts():
+    cache = AnalysisResultCache(max_entries=2, ttl=0.05)
+    cache.put('a', {'results': 1})
+    cache.put('b', {'results': 2})
+    assert cache.get('a') == {'results': 1}
+    cache.put('c', {'results': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('c') == {'results': 3}
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 2
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    AnalysisResultCache(cache_dir=str(tmp_path)).put('ab12', {'results': {'overall_assessment': 0.5}})
+
+    cache = AnalysisResultCache(cache_dir=str(tmp_path))
+    assert cache.get('ab12') == {'results': {'overall_assessment': 0.5}}
+    assert AnalysisResultCache(cache_dir=str(tmp_path), ttl=0.0).get('ab12') is None
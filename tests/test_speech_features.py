@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import numpy as np
+import librosa
+import pytest
+import soundfile as sf
+
+from pitch import f0_contour
+from speech_analysis import (
+    METRIC_FEATURES, SCORE_TOLERANCE, CorrelationKernel, SilentRecording, SpeechAnalysis, SpeechFeatures, voiced_region
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_RATE = 16000
+PROMPT = str(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3')
+
+
+def baseline_scores(analyzer):
+    """Score each metric the way SpeechAnalysis did before features were shared."""
+    ref_audio = analyzer.load_and_preprocess(analyzer.reference_path)
+    comp_audio = analyzer.load_and_preprocess(analyzer.compare_path)
+    sr = analyzer.sample_rate
+
+    def correlate(ref, comp):
+        min_length = min(ref.shape[-1], comp.shape[-1])
+        return np.corrcoef(ref[..., :min_length].flatten(), comp[..., :min_length].flatten())[0, 1]
+
+    def bounded(score):
+        return 0.0 if np.isnan(score) else max(0.0, min(1.0, float(score)))
+
+    def intonation(ref, comp):
+        # Semitone contours over the frames voiced in both
+        min_length = min(len(ref), len(comp))
+        ref, comp = ref[:min_length], comp[:min_length]
+        both = (ref > 0) & (comp > 0)
+        return np.corrcoef(12 * np.log2(ref[both]), 12 * np.log2(comp[both]))[0, 1]
+
+    return {
+        'pitch_stability': bounded(intonation(f0_contour(ref_audio, sr), f0_contour(comp_audio, sr))),
+        'articulation_clarity': max(0.0, min(1.0, correlate(
+            librosa.feature.spectral_contrast(y=ref_audio, sr=sr),
+            librosa.feature.spectral_contrast(y=comp_audio, sr=sr)))),
+        'rhythm_timing': max(0.0, min(1.0, correlate(
+            librosa.onset.onset_strength(y=ref_audio, sr=sr),
+            librosa.onset.onset_strength(y=comp_audio, sr=sr)))),
+        'volume_consistency': bounded(correlate(
+            librosa.feature.rms(y=ref_audio), librosa.feature.rms(y=comp_audio))),
+        'phonation_quality': bounded(correlate(
+            librosa.feature.mfcc(y=ref_audio, sr=sr), librosa.feature.mfcc(y=comp_audio, sr=sr))),
+    }
+
+
+@pytest.fixture
+def chirp_path(tmp_path):
+    t = np.arange(int(SAMPLE_RATE * 3.2)) / SAMPLE_RATE
+    path = tmp_path / 'chirp.wav'
+    sf.write(path, (0.3 * np.sin(2 * np.pi * (200 + 80 * t) * t)).astype(np.float32), SAMPLE_RATE)
+    return str(path)
+
+
+@pytest.mark.parametrize('compare', ['chirp', 'prompt'])
+def test_shared_features_score_identically_to_per_method_path(chirp_path, compare):
+    compare_path = chirp_path if compare == 'chirp' else str(ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3')
+    analyzer = SpeechAnalysis(PROMPT, compare_path, verbose=False, align=False)
+
+    expected = baseline_scores(SpeechAnalysis(PROMPT, compare_path, verbose=False))
+    actual = {metric: getattr(analyzer, metric)() for metric in expected}
+
+    # Scores come from float32 features and scratch buffers rather than float64 np.corrcoef
+    assert actual == pytest.approx(expected, abs=SCORE_TOLERANCE)
+
+
+def test_shared_features_match_direct_librosa_calls(chirp_path):
+    audio = SpeechAnalysis(chirp_path, chirp_path, verbose=False).load_and_preprocess(chirp_path)
+    features = SpeechFeatures(audio, SAMPLE_RATE)
+
+    np.testing.assert_array_equal(features.pitch, f0_contour(audio, SAMPLE_RATE))
+    # Contrast is the only feature librosa computes in float64; it is stored in float32
+    np.testing.assert_allclose(features.contrast, librosa.feature.spectral_contrast(y=audio, sr=SAMPLE_RATE), rtol=1e-6)
+    np.testing.assert_array_equal(features.onset, librosa.onset.onset_strength(y=audio, sr=SAMPLE_RATE))
+    np.testing.assert_array_equal(features.rms, librosa.feature.rms(y=audio))
+    np.testing.assert_array_equal(features.mfcc, librosa.feature.mfcc(y=audio, sr=SAMPLE_RATE))
+
+
+@pytest.mark.parametrize('compare', ['chirp', 'prompt'])
+def test_in_memory_sources_score_like_files(chirp_path, compare):
+    compare_path = chirp_path if compare == 'chirp' else str(ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3')
+    expected = SpeechAnalysis(PROMPT, compare_path, verbose=False).clinical_speech_assessment()
+
+    with open(compare_path, 'rb') as file:
+        data = file.read()
+    decoded, _ = librosa.load(compare_path, sr=SAMPLE_RATE)
+    for source in (data, decoded):
+        assert SpeechAnalysis(PROMPT, source, verbose=False).clinical_speech_assessment() == expected
+
+
+def test_trim_crops_to_the_voiced_region():
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    padded = np.concatenate([np.zeros(SAMPLE_RATE, dtype=np.float32), tone, np.zeros(SAMPLE_RATE, dtype=np.float32)])
+
+    start, end, voiced = voiced_region(padded, SAMPLE_RATE)
+    # Boundaries are accurate to one analysis frame
+    assert abs(start - SAMPLE_RATE) <= 2048 and abs(end - 2 * SAMPLE_RATE) <= 2048
+    assert voiced == pytest.approx(1.0, abs=2 * 2048 / SAMPLE_RATE)
+
+    features = SpeechAnalysis(PROMPT, padded, verbose=False).compare_features
+    assert features.voiced_seconds == voiced
+    assert len(features.audio) == end - start
+
+
+def test_silent_takes_are_rejected_when_strict():
+    silence = np.zeros(2 * SAMPLE_RATE, dtype=np.float32)
+    assert voiced_region(silence, SAMPLE_RATE) is None
+    with pytest.raises(SilentRecording):
+        SpeechAnalysis(PROMPT, silence, verbose=False, strict=True).compare_features
+    assert SpeechAnalysis(PROMPT, silence, verbose=False).compare_features.voiced_seconds == 0.0
+
+
+def test_correlation_kernel_matches_corrcoef_and_reuses_its_scratch():
+    rng = np.random.default_rng(0)
+    # An offset much larger than the spread, like MFCC energy rows
+    ref = (300 + rng.standard_normal((20, 160))).astype(np.float32)
+    comp = (ref[:, :150] + 0.5 * rng.standard_normal((20, 150))).astype(np.float32)
+    kernel = CorrelationKernel()
+
+    ref_frames = np.minimum(np.arange(200) // 2, 159)
+    comp_frames = np.arange(200) * 3 // 4 + 10
+    paired = np.corrcoef(ref[:, ref_frames].ravel(), comp[:, np.minimum(comp_frames, 149)].ravel())[0, 1]
+    assert kernel.correlate(ref, comp, ref_frames, comp_frames) == pytest.approx(paired, abs=SCORE_TOLERANCE)
+    scratch = kernel._ref
+
+    # Smaller features reuse the same buffers
+    expected = np.corrcoef(ref[:, :150].astype(np.float64).ravel(), comp.astype(np.float64).ravel())[0, 1]
+    assert kernel.correlate(ref, comp) == pytest.approx(expected, abs=SCORE_TOLERANCE)
+    assert kernel.correlate(ref[0], comp[0]) == pytest.approx(
+        np.corrcoef(ref[0, :150], comp[0])[0, 1], abs=SCORE_TOLERANCE
+    )
+    assert kernel._ref is scratch
+    # Inputs are never modified by centring
+    assert ref.mean() > 299
+
+    assert np.isnan(kernel.correlate(np.ones(50, dtype=np.float32), comp[0]))
+
+
+@pytest.mark.parametrize('compare', ['chirp', 'prompt'])
+def test_aligned_scores_stay_within_tolerance_of_corrcoef(chirp_path, compare):
+    compare_path = chirp_path if compare == 'chirp' else str(ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3')
+    analyzer = SpeechAnalysis(PROMPT, compare_path, verbose=False)
+    results = analyzer.clinical_speech_assessment()
+
+    for metric, feature in METRIC_FEATURES.items():
+        if metric == 'pitch_stability':
+            ref, comp = analyzer._voiced_pitch()
+        else:
+            ref, comp = analyzer._paired(feature)
+        score = np.corrcoef(ref.astype(np.float64).ravel(), comp.astype(np.float64).ravel())[0, 1]
+        assert results[metric] == pytest.approx(max(0.0, min(1.0, score)), abs=SCORE_TOLERANCE)
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import librosa
+import numpy as np
+import pytest
+
+from speech_analysis import SpeechAnalysis, SpeechFeatures
+from streaming_analysis import StreamingScorer
+
+ROOT = Path(__file__).resolve().parent.parent
+PROMPT = str(ROOT / 'static' / 'articulation_audio' / 'b_ball.mp3')
+TAKE = str(ROOT / 'static' / 'articulation_audio' / 'c_cat.mp3')
+
+
+@pytest.fixture
+def scorer_and_take():
+    batch = SpeechAnalysis(PROMPT, TAKE, verbose=False)
+    take, _ = librosa.load(TAKE, sr=16000, duration=5.0)
+    return StreamingScorer(batch.reference_features, PROMPT), take, batch
+
+
+def test_final_scores_match_batch_path(scorer_and_take):
+    scorer, take, batch = scorer_and_take
+    partials = [scorer.append(take[i:i + 1000]) for i in range(0, len(take), 1000)]
+
+    assert any(partial is not None for partial in partials)
+    assert scorer.finish()['results'] == batch.clinical_speech_assessment()
+
+
+def test_rolling_frames_line_up_with_full_signal(scorer_and_take):
+    scorer, take, _ = scorer_and_take
+    for i in range(0, len(take), 777):
+        scorer.append(take[i:i + 777])
+
+    partial = scorer.partial_features()
+    full = SpeechFeatures(SpeechAnalysis.preprocess(take))
+    frames = partial.rms.shape[1]
+    # Frame-local features are exact up to the unknown peak level
+    assert np.corrcoef(partial.rms.ravel(), full.rms[:, :frames].ravel())[0, 1] > 0.999
+    # YIN is scale-invariant, so the pitch contour is exact
+    np.testing.assert_allclose(partial.pitch, full.pitch[:frames], rtol=1e-4)
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from transcription import SAMPLE_RATE, TranscriptionEngine, decode_audio, split_chunks
+
+
+def tone_bursts(seconds_on, seconds_off, count):
+    t = np.arange(int(seconds_on * SAMPLE_RATE)) / SAMPLE_RATE
+    burst = 0.5 * np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    gap = np.zeros(int(seconds_off * SAMPLE_RATE), dtype=np.float32)
+    return np.concatenate([gap] + [np.concatenate([burst, gap]) for _ in range(count)])
+
+
+def test_chunks_are_cut_at_silences_and_bounded():
+    audio = tone_bursts(1.0, 0.5, 4)
+    chunks = split_chunks(audio, max_samples=int(3.0 * SAMPLE_RATE))
+
+    assert len(chunks) == 2
+    assert all(len(chunk) <= 3.0 * SAMPLE_RATE for chunk in chunks)
+    assert split_chunks(np.zeros(SAMPLE_RATE, dtype=np.float32)) == []
+
+
+def test_chunks_from_several_uploads_share_a_batch_and_repeats_hit_the_cache(monkeypatch):
+    engine = TranscriptionEngine(batch_window=0.5)
+    batches = []
+    monkeypatch.setattr(engine, '_load_model', lambda: None)
+    monkeypatch.setattr(
+        engine, '_decode_batch',
+        lambda model, chunks: batches.append(len(chunks)) or [f"chunk {len(c)}" for c in chunks]
+    )
+    uploads = []
+    for count in (1, 2):
+        buffer = io.BytesIO()
+        sf.write(buffer, tone_bursts(1.0, 0.5, count), SAMPLE_RATE, format='WAV')
+        uploads.append(buffer.getvalue())
+
+    first = engine.transcribe_many(uploads, timeout=10)
+    again = engine.transcribe(uploads[1], timeout=10)
+
+    assert batches == [2]
+    assert [result['cached'] for result in first] == [False, False]
+    assert again['cached'] and again['text'] == first[1]['text']
+
+
+def test_transcription_reuses_the_decode_from_scoring(monkeypatch):
+    import audio_ingest
+
+    buffer = io.BytesIO()
+    sf.write(buffer, tone_bursts(1.0, 0.5, 2), SAMPLE_RATE, format='WAV')
+    data = buffer.getvalue()
+    # Scoring decodes the take within its 5-second window
+    scored, _ = audio_ingest.ingest(data, SAMPLE_RATE, max_duration=5.0)
+
+    monkeypatch.setattr(audio_ingest, '_soundfile_decode', lambda *args: pytest.fail("decoded twice"))
+    np.testing.assert_array_equal(decode_audio(data), scored)
@@ -0,0 +1,45 @@
+import io
+import os
+
+import pytest
+
+from upload_store import UploadStore, UploadTooLarge
+
+
+def test_takes_are_content_addressed_and_sharded(tmp_path):
+    store = UploadStore(str(tmp_path))
+    name = store.save(io.BytesIO(b'take one'), 'sun')
+    again = store.save(io.BytesIO(b'take one'), 'sun')
+    other = store.save(io.BytesIO(b'take two'), '../sun')
+
+    assert name == again and name != other
+    assert name.endswith('-sun.wav') and '..' not in other
+    assert store.path(name) == os.path.join(str(tmp_path), name[:2], name)
+    with open(store.path(name), 'rb') as file:
+        assert file.read() == b'take one'
+    assert store.path('../../etc/passwd') is None
+    assert store.stats()['files'] == 2
+
+
+def test_oversized_takes_are_rejected_without_leftovers(tmp_path):
+    store = UploadStore(str(tmp_path), max_file_bytes=100 * 1024)
+    with pytest.raises(UploadTooLarge):
+        store.save(io.BytesIO(b'x' * (200 * 1024)), 'sun')
+    assert os.listdir(tmp_path) == []
+    assert store.stats()['bytes'] == 0
+
+
+def test_quota_and_retention_evict_the_oldest_takes(tmp_path):
+    store = UploadStore(str(tmp_path), quota_bytes=25, retention=None)
+    names = [store.save(io.BytesIO(bytes([i]) * 10), 'w') for i in range(3)]
+    assert not os.path.exists(store.path(names[0]))
+    assert all(os.path.exists(store.path(name)) for name in names[1:])
+    assert store.stats()['bytes'] == 20
+
+    # A restarted store finds the takes on disk, oldest first
+    os.utime(store.path(names[1]), (1, 1))
+    reopened = UploadStore(str(tmp_path), retention=3600)
+    assert reopened.stats()['files'] == 2
+    reopened.save(io.BytesIO(b'new take'), 'w')
+    assert not os.path.exists(store.path(names[1]))
+    assert reopened.stats()['files'] == 2 and reopened.stats()['evicted'] == 1
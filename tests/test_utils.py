@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import ModelRegistry
+
+
+def test_concurrent_gets_load_each_model_once():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        # Slow enough that every caller arrives while the first load is running
+        time.sleep(0.05)
+        return object()
+
+    registry = ModelRegistry(loader)
+    with ThreadPoolExecutor(8) as pool:
+        models = list(pool.map(lambda _: registry.get('base'), range(8)))
+
+    assert loads == ['base']
+    assert all(model is models[0] for model in models)
+    assert registry.is_loaded('base') and not registry.is_loaded('tiny')
+    registry.get('tiny')
+    assert loads == ['base', 'tiny']
+
+
+def test_failed_load_is_retried_not_cached():
+    attempts = []
+
+    def loader(name):
+        attempts.append(name)
+        if len(attempts) == 1:
+            raise RuntimeError("download interrupted")
+        return 'model'
+
+    registry = ModelRegistry(loader)
+    with pytest.raises(RuntimeError):
+        registry.get('base')
+    assert not registry.is_loaded('base')
+
+    assert registry.get('base') == 'model'
+    assert registry.get('base') == 'model'
+    assert attempts == ['base', 'base']
+
+
+def test_warm_up_loads_in_the_background():
+    registry = ModelRegistry(lambda name: name.upper())
+    registry.warm_up('base').join(5)
+    assert registry.is_loaded('base')
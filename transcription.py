@@ -0,0 +1,223 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+from threading import Lock, Thread
+import logging
+import queue
+import time
+import librosa
+import numpy as np
+
+from utils import log_timing, whisper_models
+from audio_ingest import SILENCE_PEAK, audio_digest, decode_bytes
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Whisper always decodes fixed 30-second windows
+CHUNK_SAMPLES = 30 * SAMPLE_RATE
+
+
+class TranscriptionTimeout(Exception):
+    """Raised when a transcription does not finish in time."""
+
+
+def decode_audio(data: bytes, sample_rate: int = SAMPLE_RATE, digest: Optional[str] = None) -> np.ndarray:
+    """
+    Decode an uploaded recording to mono float32 at `sample_rate`.
+
+    A take the scoring pipeline already decoded in full at this rate comes
+    from audio_ingest's shared cache instead of being decoded again.
+    """
+    return decode_bytes(data, sample_rate, digest=digest)
+
+
+def split_chunks(
+    audio: np.ndarray,
+    top_db: float = 30.0,
+    max_samples: int = CHUNK_SAMPLES
+) -> List[np.ndarray]:
+    """
+    Cut a recording into voiced chunks no longer than `max_samples`.
+
+    Voiced regions come from librosa's energy-based splitter. Neighbouring
+    regions are merged while they fit in one chunk, so each chunk is cut at
+    a silence, and a single region longer than a chunk is split into chunk-sized pieces.
+    A silent recording yields no chunks, which also keeps Whisper from
+    inventing text for it.
+    """
+    # The splitter's threshold is relative to the peak, so check absolute silence first
+    if len(audio) == 0 or np.max(np.abs(audio)) < SILENCE_PEAK:
+        return []
+    chunks = []
+    start = end = None
+    for interval_start, interval_end in librosa.effects.split(audio, top_db=top_db):
+        if start is not None and interval_end - start <= max_samples:
+            end = interval_end
+            continue
+        if start is not None:
+            chunks.append(audio[start:end])
+        while interval_end - interval_start > max_samples:
+            chunks.append(audio[interval_start:interval_start + max_samples])
+            interval_start += max_samples
+        start, end = interval_start, interval_end
+    if start is not None:
+        chunks.append(audio[start:end])
+    return chunks
+
+
+class TranscriptionEngine:
+    """
+    Whisper transcription tuned for CPU-only hosts.
+
+    Recordings are split at silences into chunks of at most 30 seconds,
+    Whisper's input window. One batching thread collects the chunks of
+    concurrent requests for up to `batch_window` seconds and decodes up to
+    `max_batch` of them in a single forward pass. Transcripts are cached by
+    the SHA-256 of the uploaded bytes, so a repeated upload is neither
+    decoded nor run through the model again, and the decode itself is
+    shared with scoring through audio_ingest.decoded_audio.
+    """
+    def __init__(
+        self,
+        model_name: str = "base",
+        threads: Optional[int] = None,
+        language: Optional[str] = "en",
+        max_batch: int = 8,
+        batch_window: float = 0.05,
+        top_db: float = 30.0,
+        cache_entries: int = 256
+    ):
+        self.model_name = model_name
+        self.threads = threads
+        self.language = language
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.top_db = top_db
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._cache_lock = Lock()
+        self._chunks = queue.Queue()
+        self._thread: Optional[Thread] = None
+        self._thread_lock = Lock()
+
+    def transcribe(self, data: bytes, timeout: Optional[float] = None) -> Dict:
+        """Transcribe one uploaded recording."""
+        return self.transcribe_many([data], timeout)[0]
+
+    def transcribe_many(self, uploads: List[bytes], timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Transcribe several uploaded recordings, batching all their chunks together.
+
+        Each result holds the transcript text, the digest of the upload, the
+        number of voiced chunks and whether it came from the cache.
+        """
+        results: List[Optional[Dict]] = [None] * len(uploads)
+        pending = []
+        for position, data in enumerate(uploads):
+            digest = audio_digest(data)
+            cached = self._cached(digest)
+            if cached is not None:
+                results[position] = dict(cached, cached=True)
+                continue
+            chunks = split_chunks(decode_audio(data, digest=digest), self.top_db)
+            pending.append((position, digest, self._submit(chunks)))
+
+        futures = [future for _, _, chunk_futures in pending for future in chunk_futures]
+        _, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            raise TranscriptionTimeout(f"Transcription did not finish within {timeout}s")
+
+        for position, digest, chunk_futures in pending:
+            texts = [future.result() for future in chunk_futures]
+            result = {
+                'text': ' '.join(text for text in texts if text),
+                'digest': digest,
+                'chunks': len(chunk_futures)
+            }
+            self._remember(digest, result)
+            results[position] = dict(result, cached=False)
+        return results
+
+    def _cached(self, digest: str) -> Optional[Dict]:
+        with self._cache_lock:
+            result = self._cache.get(digest)
+            if result is not None:
+                self._cache.move_to_end(digest)
+            return result
+
+    def _remember(self, digest: str, result: Dict):
+        with self._cache_lock:
+            self._cache[digest] = result
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _submit(self, chunks: List[np.ndarray]) -> List[Future]:
+        self._ensure_thread()
+        futures = []
+        for chunk in chunks:
+            future = Future()
+            self._chunks.put((chunk, future))
+            futures.append(future)
+        return futures
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _load_model(self):
+        import torch
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        return whisper_models.get(self.model_name)
+
+    def _run(self):
+        model = None
+        while True:
+            batch = [self._chunks.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._chunks.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Chunks of requests that already timed out were cancelled
+            batch = [(chunk, future) for chunk, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            chunks = [chunk for chunk, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                if model is None:
+                    model = self._load_model()
+                texts = self._decode_batch(model, chunks)
+            except Exception as e:
+                logger.error(f"Error in batched transcription: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, text in zip(futures, texts):
+                future.set_result(text)
+
+    def _decode_batch(self, model, chunks: List[np.ndarray]) -> List[str]:
+        import torch
+        import whisper
+        started = time.perf_counter()
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(chunk), n_mels=model.dims.n_mels)
+            for chunk in chunks
+        ]).to(model.device)
+        options = whisper.DecodingOptions(language=self.language, without_timestamps=True, fp16=False)
+        with torch.inference_mode():
+            results = whisper.decode(model, mels, options)
+        log_timing('transcribe_batch', time.perf_counter() - started, chunks=len(chunks))
+        return [result.text.strip() for result in results]
@@ -0,0 +1,156 @@
+from typing import BinaryIO, Dict, Optional
+from collections import OrderedDict
+from threading import Lock, get_ident
+import hashlib
+import logging
+import os
+import re
+import time
+
+from werkzeug.utils import secure_filename
+
+# Stored takes are named <content hash>-<word>.wav and live under
+# <root>/<first two hash characters>/
+STORED_NAME = re.compile(r'^([0-9a-f]{32})-[A-Za-z0-9_.-]*\.wav$')
+
+# Takes saved before the store existed were named <word>_<YYYYmmdd_HHMMSS>.wav
+LEGACY_NAME = re.compile(r'^(.+)_\d{8}_\d{6}\.wav$')
+
+CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def stored_word(name: str) -> Optional[str]:
+    """The word a take was saved under, from either naming scheme, or None."""
+    if STORED_NAME.match(name):
+        return name[33:-len('.wav')]
+    match = LEGACY_NAME.match(name)
+    return match.group(1) if match else None
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the store's per-file limit."""
+
+
+class UploadStore:
+    """
+    Recordings submitted through /submit_audio, sharded by content hash.
+
+    A take is streamed to disk in chunks while it is hashed, and the write is
+    abandoned as soon as it passes `max_file_bytes`. The file is named after
+    its hash and the practised word, so two takes can never overwrite each
+    other and resubmitting the same take stores it once. Files go into one
+    directory per hash prefix, keeping every directory small.
+
+    The store keeps an in-memory index of its files, oldest first. After each
+    save it deletes takes older than `retention` seconds, then the oldest
+    takes until the total size is within `quota_bytes`. Either limit can be
+    None to turn it off.
+    """
+    def __init__(
+        self,
+        root: str = os.path.join('static', 'uploads'),
+        max_file_bytes: int = 20 * 1024 * 1024,
+        quota_bytes: Optional[int] = 1024 * 1024 * 1024,
+        retention: Optional[float] = 30 * 24 * 3600
+    ):
+        self.root = os.path.abspath(root)
+        self.max_file_bytes = max_file_bytes
+        self.quota_bytes = quota_bytes
+        self.retention = retention
+        # name -> (mtime, size), ordered oldest first
+        self._files: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total = 0
+        self._evicted = 0
+        self._lock = Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        files = []
+        for shard in os.listdir(self.root):
+            shard_path = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_path):
+                continue
+            for name in os.listdir(shard_path):
+                if STORED_NAME.match(name):
+                    stat = os.stat(os.path.join(shard_path, name))
+                    files.append((stat.st_mtime, name, stat.st_size))
+        for mtime, name, size in sorted(files):
+            self._files[name] = (mtime, size)
+            self._total += size
+        logger.info(f"Upload store has {len(self._files)} takes, {self._total / 1e6:.1f} MB")
+
+    def path(self, name: str) -> Optional[str]:
+        """Where a stored take lives, or None if `name` isn't a stored take's name."""
+        match = STORED_NAME.match(name)
+        if not match:
+            return None
+        return os.path.join(self.root, match.group(1)[:2], name)
+
+    def save(self, stream: BinaryIO, word: str = 'unknown') -> str:
+        """Stream a take to disk and return its name; raises UploadTooLarge past the limit."""
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.root, f".upload-{os.getpid()}-{get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as file:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        raise UploadTooLarge(f"Recording is larger than {self.max_file_bytes} bytes")
+                    digest.update(chunk)
+                    file.write(chunk)
+            name = f"{digest.hexdigest()[:32]}-{secure_filename(word) or 'unknown'}.wav"
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        now = time.time()
+        with self._lock:
+            previous = self._files.pop(name, None)
+            if previous is not None:
+                self._total -= previous[1]
+            self._files[name] = (now, size)
+            self._total += size
+        self._evict(now, keep=name)
+        return name
+
+    def _evict(self, now: float, keep: str):
+        """Delete expired takes, then the oldest ones until the store fits its quota."""
+        doomed = []
+        with self._lock:
+            while self._files:
+                name, (mtime, size) = next(iter(self._files.items()))
+                expired = self.retention is not None and now - mtime > self.retention
+                over_quota = self.quota_bytes is not None and self._total > self.quota_bytes
+                if name == keep or not (expired or over_quota):
+                    break
+                del self._files[name]
+                self._total -= size
+                self._evicted += 1
+                doomed.append(name)
+        for name in doomed:
+            try:
+                os.unlink(self.path(name))
+            except FileNotFoundError:
+                pass
+        if doomed:
+            logger.info(f"Evicted {len(doomed)} stored takes")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': self._total,
+                'quota_bytes': self.quota_bytes,
+                'retention': self.retention,
+                'evicted': self._evicted
+            }
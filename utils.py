@@ -1,95 +1,190 @@
-import whisper
-import torch
-import sounddevice as sd
 import numpy as np
-import pyttsx3
 from scipy.io.wavfile import write
-from threading import Thread, Event
-from queue import Queue
+from threading import Thread, Event, Lock
+from queue import Empty, Queue
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def log_timing(stage, seconds, **fields):
+    """Log a startup or loading duration as a structured JSON record"""
+    logger.info(json.dumps(dict({'event': 'timing', 'stage': stage, 'seconds': round(seconds, 4)}, **fields)))
+
+
+def load_whisper_model(name):
+    import whisper
+    return whisper.load_model(name)
+
+
+class ModelRegistry:
+    """Loads each Whisper model at most once per process and shares it; a failed load is retried on the next call"""
+    def __init__(self, loader=load_whisper_model):
+        self._loader = loader
+        self._models = {}
+        self._lock = Lock()
+
+    def get(self, name="base"):
+        """Return the named model, loading it on first use"""
+        with self._lock:
+            if name not in self._models:
+                started = time.perf_counter()
+                self._models[name] = self._loader(name)
+                log_timing('whisper_load', time.perf_counter() - started, model=name)
+            return self._models[name]
+
+    def is_loaded(self, name="base"):
+        return name in self._models
+
+    def warm_up(self, name="base"):
+        """Load a model in a background thread so the first transcription doesn't wait"""
+        thread = Thread(target=self.get, args=(name,), daemon=True)
+        thread.start()
+        return thread
+
+
+whisper_models = ModelRegistry()
+
+
+# Text-to-speech voice settings, shared by spoken and pre-rendered prompts
+TTS_RATE = 150
+TTS_VOLUME = 1.0
+
+
+class SpeechRequest:
+    """One utterance for the TTS worker: spoken aloud, or rendered to `path`"""
+    def __init__(self, text, path=None):
+        self.text = text
+        self.path = path
+        self.done = Event()
+        self.error = None
+
 
 class AudioHandler:
-    def __init__(self):
-        self.model = whisper.load_model("base")
+    def __init__(self, model_name="base"):
+        self.model_name = model_name
         self.engine = None
         self.sample_rate = 16000
         self.is_speaking = Event()
         self.queue = Queue()
         self.speech_thread = None
-        self.initialize_engine()
-        self.start_speech_thread()
+        self._thread_lock = Lock()
+
+    @property
+    def model(self):
+        """Whisper model, loaded on first use and shared across the process"""
+        return whisper_models.get(self.model_name)
 
     def initialize_engine(self):
-        """Initialize the text-to-speech engine"""
-        try:
-            self.engine = pyttsx3.init()
-            # Configure the engine
-            self.engine.setProperty('rate', 150)    # Speed of speech
-            self.engine.setProperty('volume', 1.0)  # Volume level
-            
-            # Test if the engine works
-            voices = self.engine.getProperty('voices')
-            if voices:
-                self.engine.setProperty('voice', voices[0].id)  # Set the first available voice
-            
-            # Try a test speech
-            print("Initializing text-to-speech engine...")
-            self.engine.say("Text to speech engine initialized")
-            self.engine.runAndWait()
-        except Exception as e:
-            print(f"Error initializing speech engine: {e}")
+        """Create the text-to-speech engine; the speech thread keeps it for every later request"""
+        started = time.perf_counter()
+        import pyttsx3
+        engine = pyttsx3.init()
+        # Configure the engine
+        engine.setProperty('rate', TTS_RATE)      # Speed of speech
+        engine.setProperty('volume', TTS_VOLUME)  # Volume level
+        voices = engine.getProperty('voices')
+        if voices:
+            engine.setProperty('voice', voices[0].id)  # Set the first available voice
+        self.engine = engine
+        log_timing('tts_init', time.perf_counter() - started)
+        return engine
+
+    def _discard_engine(self):
+        """Drop a failed engine so the next request starts a fresh one"""
+        engine, self.engine = self.engine, None
+        if engine is not None:
+            try:
+                engine.stop()
+            except Exception:
+                pass
 
     def start_speech_thread(self):
         """Start the speech processing thread"""
-        if self.speech_thread is None or not self.speech_thread.is_alive():
-            self.speech_thread = Thread(target=self._process_speech_queue, daemon=True)
-            self.speech_thread.start()
+        with self._thread_lock:
+            if self.speech_thread is None or not self.speech_thread.is_alive():
+                self.speech_thread = Thread(target=self._process_speech_queue, daemon=True)
+                self.speech_thread.start()
 
     def _process_speech_queue(self):
-        """Process speech requests from the queue"""
+        """Speak or render queued requests with one long-lived engine"""
         while True:
-            text = self.queue.get()
-            if text is None:
+            speech = self.queue.get()
+            if speech is None:
+                self.queue.task_done()
                 break
-                
             try:
-                self.is_speaking.set()
-                
-                # Reinitialize the engine for each new speech request
-                if self.engine is not None:
-                    self.engine.stop()
-                self.initialize_engine()
-                
-                self.engine.say(text)
-                self.engine.runAndWait()
-                
+                if speech.path is None:
+                    self.is_speaking.set()
+                self._run(speech)
             except Exception as e:
-                print(f"Error in speech processing: {e}")
-                
+                speech.error = e
+                logger.error(f"Error in speech processing: {str(e)}")
             finally:
                 self.is_speaking.clear()
+                speech.done.set()
                 self.queue.task_done()
 
+    def _run(self, speech):
+        """Run one request, restarting the engine once if it fails"""
+        for attempt in (1, 2):
+            try:
+                engine = self.engine or self.initialize_engine()
+                if speech.path is None:
+                    engine.say(speech.text)
+                else:
+                    engine.save_to_file(speech.text, speech.path)
+                engine.runAndWait()
+                return
+            except ImportError:
+                raise
+            except Exception as e:
+                self._discard_engine()
+                if attempt == 2:
+                    raise
+                logger.warning(f"Speech engine failed, restarting it: {str(e)}")
+
     def speak(self, text):
-        """Add text to the speech queue"""
+        """Add text to the speech queue, replacing anything not yet spoken"""
         if text:
-            print(f"Adding to speech queue: {text}")  # Debug print
-            # Clear any pending items in the queue
+            logger.debug(f"Adding to speech queue: {text}")
+            # Drop pending utterances, but keep pending renders
+            pending = []
             while not self.queue.empty():
                 try:
-                    self.queue.get_nowait()
+                    pending.append(self.queue.get_nowait())
                     self.queue.task_done()
-                except:
+                except Empty:
                     break
+            for speech in pending:
+                if speech is None or speech.path is not None:
+                    self.queue.put(speech)
+                else:
+                    speech.done.set()
             
             # Add new text to queue
-            self.queue.put(text)
+            self.queue.put(SpeechRequest(text))
             
             # Ensure speech thread is running
             self.start_speech_thread()
 
+    def render_to_file(self, text, path, timeout=60):
+        """Synthesize text into an audio file with the speech thread's engine"""
+        speech = SpeechRequest(text, path)
+        self.queue.put(speech)
+        self.start_speech_thread()
+        if not speech.done.wait(timeout):
+            raise TimeoutError(f"Rendering speech took longer than {timeout}s")
+        if speech.error is not None:
+            raise speech.error
+        return path
+
     def record_audio(self, duration=5, filename="temp_recording.wav"):
-        """Record audio for a specified duration"""
-        print("Recording...")
+        """Record audio for a specified duration; with no filename, return the samples instead of writing a WAV"""
+        import sounddevice as sd
+        logger.info(f"Recording {duration}s of audio")
         recording = sd.rec(
             int(duration * self.sample_rate),
             samplerate=self.sample_rate,
@@ -97,11 +192,28 @@ class AudioHandler:
             dtype=np.float32
         )
         sd.wait()
+        logger.info("Recording finished")
+        if filename is None:
+            return recording[:, 0]
         audio_int16 = (recording * 32767).astype(np.int16)
         write(filename, self.sample_rate, audio_int16)
-        print("Recording finished!")
         return filename
 
+    def capture(self, device=None, **kwargs):
+        """
+        Continuous capture from the server's microphone, split into utterances.
+
+        Pass a FakeInputDevice to capture from an array or file instead.
+        Extra arguments go to LiveCapture.
+        """
+        from audio_capture import LiveCapture, SoundDeviceInput
+        return LiveCapture(device or SoundDeviceInput(self.sample_rate), self.sample_rate, **kwargs)
+
+    def record_utterance(self, timeout=10, device=None):
+        """Wait for the next spoken utterance and return its samples, or None if nobody spoke"""
+        with self.capture(device) as capture:
+            return capture.next_utterance(timeout)
+
     def transcribe_audio(self, audio_file):
         """Transcribe audio using Whisper"""
         try:
@@ -115,11 +227,7 @@ class AudioHandler:
         """Cleanup when the object is destroyed"""
         if self.queue is not None:
             self.queue.put(None)  # Signal the thread to exit
-        if self.engine is not None:
-            try:
-                self.engine.stop()
-            except:
-                pass
+        self._discard_engine()
 class ExerciseManager:
     def __init__(self):
         self.exercises = {